@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+
+"""
+Measure runtime and peak RSS of bin/collapse_mirtop.py on synthetic mirtop isomir
+tables with 100, 500 and 1000 samples, against the former collapse_mirtop.r.
+
+The R version needs `Rscript` with data.table on the PATH and is skipped otherwise.
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+
+LEGACY_SCRIPT = r"""
+library(data.table)
+args = commandArgs(trailingOnly=TRUE)
+input <- as.character(args[1:length(args)])
+df = read.delim(input[1], sep = "\t")
+counts = as.data.table(df[!duplicated(df[["UID"]]),c(3, 13:ncol(df))])
+mirna = counts[, lapply(.SD, sum), by = miRNA]
+write.table(mirna, file.path(dirname(input[1]), "mirna.tsv"), quote=FALSE, sep="\t", row.names=FALSE)
+"""
+
+ANNOTATION_COLUMNS = [
+    "UID",
+    "Read",
+    "miRNA",
+    "Variant",
+    "iso_5p",
+    "iso_3p",
+    "iso_add3p",
+    "iso_add5p",
+    "iso_snv",
+    "iso_snv_seed",
+    "iso_snv_central",
+    "iso_snv_central_offset",
+]
+
+
+def write_table(path, n_samples, n_isomirs, n_mirnas, seed=0):
+    """
+    Write an isomir table where every miRNA has several isomiRs and a share of
+    UIDs is repeated, as mirtop does for reads assigned to several hairpins.
+    """
+    rng = random.Random(seed)
+    with open(path, "w") as fh:
+        fh.write("\t".join(ANNOTATION_COLUMNS + [f"sample_{i}" for i in range(n_samples)]) + "\n")
+        for i in range(n_isomirs):
+            uid = f"iso-22-{rng.randrange(int(n_isomirs * 0.9)):010d}"
+            mirna = f"hsa-miR-{rng.randrange(n_mirnas)}"
+            annotation = [uid, "TGAGGTAGTAGGTTGTATAGTT", mirna, "iso_3p:-1", "0", "-1", "0", "0", "0", "0", "0", "0"]
+            counts = [str(int(rng.expovariate(0.05))) if rng.random() < 0.3 else "0" for _ in range(n_samples)]
+            fh.write("\t".join(annotation + counts) + "\n")
+
+
+def measure(cmd, cwd):
+    """Run `cmd` and return wall time in seconds and peak RSS in MiB of that process."""
+    start = time.monotonic()
+    proc = subprocess.Popen(cmd, cwd=cwd)
+    _, status, usage = os.wait4(proc.pid, 0)
+    seconds = time.monotonic() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+    return seconds, usage.ru_maxrss / 1024
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, nargs="+", default=[100, 500, 1000])
+    parser.add_argument("--isomirs", type=int, default=50000, help="Rows per table (default 50000).")
+    parser.add_argument("--mirnas", type=int, default=2000, help="Distinct miRNAs per table (default 2000).")
+    args = parser.parse_args(argv)
+
+    have_r = shutil.which("Rscript") is not None
+    report = {"isomirs": args.isomirs, "mirnas": args.mirnas, "runs": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        (tmp / "legacy.r").write_text(LEGACY_SCRIPT)
+        for n_samples in args.samples:
+            run_dir = tmp / str(n_samples)
+            run_dir.mkdir()
+            table = run_dir / "mirtop.tsv"
+            write_table(table, n_samples, args.isomirs, args.mirnas)
+            run = {"samples": n_samples, "input_bytes": table.stat().st_size}
+
+            seconds, rss = measure(
+                [sys.executable, str(REPO / "bin" / "collapse_mirtop.py"), str(table), "-o", "native.tsv"],
+                run_dir,
+            )
+            run.update(native_seconds=seconds, native_peak_rss_mib=rss)
+
+            if have_r:
+                seconds, rss = measure(["Rscript", str(tmp / "legacy.r"), str(table)], run_dir)
+                run.update(legacy_seconds=seconds, legacy_peak_rss_mib=rss)
+                run["identical_output"] = (run_dir / "native.tsv").read_bytes() == (run_dir / "mirna.tsv").read_bytes()
+            report["runs"].append(run)
+            table.unlink()
+
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
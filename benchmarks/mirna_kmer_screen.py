@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+
+"""
+Compare the tile pre-screen of bin/mirna_kmer_screen.py followed by BLAT on the candidates
+against the former BLAT-only BLAT_MIRNA on the whole contamination database.
+
+Both paths need `blat` on the PATH. Without it, only the pre-screen is timed.
+"""
+
+import argparse
+import gzip
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+
+BIOTYPE_FILTERS = {
+    "cdna": """awk '/^>/ { x=index($6, "transcript_biotype:miRNA") } { if(!x) print }' "$CONTAMINANTS" > subset.fa""",
+    "ncrna": (
+        """awk '/^>/ { x=(index($6, "transcript_biotype:rRNA") || index($6, "transcript_biotype:miRNA")) } """
+        """{ if(!x) print }' "$CONTAMINANTS" > subset.fa"""
+    ),
+    "other": """ln -sf "$CONTAMINANTS" subset.fa""",
+}
+BIOTYPES = {"cdna": ["miRNA"], "ncrna": ["rRNA", "miRNA"], "other": []}
+
+BLAT_FILTER = r"""
+blat -out=blast8 "$MIRNA" "$QUERY" /dev/stdout | awk 'BEGIN{FS="\t"}{if($11 < 1e-5)print $1;}' | uniq > mirnahit.txt
+awk 'BEGIN { while((getline<"mirnahit.txt")>0) l[">"$1]=1 } /^>/ {x = l[$1]} {if(!x) print }' subset.fa > filtered.fa
+"""
+
+
+def fetch(source, dest):
+    if source.startswith("http://") or source.startswith("https://"):
+        urllib.request.urlretrieve(source, dest.with_suffix(".download"))
+        source = dest.with_suffix(".download")
+    with open(source, "rb") as fh:
+        gzipped = fh.read(2) == b"\x1f\x8b"
+    # BLAT and awk need plain FASTA.
+    with gzip.open(source, "rb") if gzipped else open(source, "rb") as fin, open(dest, "wb") as fout:
+        shutil.copyfileobj(fin, fout)
+    return dest
+
+
+def timed(cmd, cwd, env=None):
+    start = time.monotonic()
+    subprocess.run(cmd, cwd=cwd, check=True, env=env)
+    return time.monotonic() - start
+
+
+def count_records(path):
+    with open(path, "rb") as fh:
+        return sum(1 for line in fh if line.startswith(b">"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hairpin", default="https://mirbase.org/download/hairpin.fa")
+    parser.add_argument(
+        "--contaminants",
+        default="https://ftp.ensembl.org/pub/current_fasta/homo_sapiens/cdna/Homo_sapiens.GRCh38.cdna.all.fa.gz",
+    )
+    parser.add_argument("--db-type", choices=sorted(BIOTYPE_FILTERS), default="cdna")
+    parser.add_argument("--repeats", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    report = {"db_type": args.db_type, "repeats": args.repeats}
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        hairpin = fetch(args.hairpin, tmp / "hairpin.fa")
+        contaminants = fetch(args.contaminants, tmp / "contaminants.fa")
+        report["contaminant_records"] = count_records(contaminants)
+
+        legacy_dir, screened_dir = tmp / "legacy", tmp / "screened"
+        legacy_dir.mkdir()
+        screened_dir.mkdir()
+        env = {"PATH": f"{REPO / 'bin'}:{os.environ.get('PATH', '')}", "MIRNA": str(hairpin)}
+
+        screen = [
+            sys.executable,
+            str(REPO / "bin" / "mirna_kmer_screen.py"),
+            "--mirna",
+            str(hairpin),
+            "--contaminants",
+            str(contaminants),
+            "--candidates",
+            "candidates.fa",
+        ]
+        if BIOTYPES[args.db_type]:
+            screen += ["--subset", "subset.fa"]
+            for biotype in BIOTYPES[args.db_type]:
+                screen += ["--exclude-biotype", biotype]
+        else:
+            (screened_dir / "subset.fa").symlink_to(contaminants)
+        report["screen_seconds"] = min(timed(screen, screened_dir) for _ in range(args.repeats))
+        report["candidate_records"] = count_records(screened_dir / "candidates.fa")
+
+        if not shutil.which("blat"):
+            report["legacy_seconds"] = None
+            json.dump(report, sys.stdout, indent=2)
+            print()
+            return 0
+
+        subset = BIOTYPE_FILTERS[args.db_type] + "\n"
+        legacy = subset + BLAT_FILTER.replace('"$QUERY"', "subset.fa")
+        (legacy_dir / "legacy.sh").write_text("set -euo pipefail\n" + legacy)
+        report["legacy_seconds"] = min(
+            timed(["bash", "legacy.sh"], legacy_dir, {**env, "CONTAMINANTS": str(contaminants)})
+            for _ in range(args.repeats)
+        )
+
+        (screened_dir / "blat.sh").write_text("set -euo pipefail\n" + BLAT_FILTER.replace('"$QUERY"', "candidates.fa"))
+        report["screened_blat_seconds"] = min(
+            timed(["bash", "blat.sh"], screened_dir, env) for _ in range(args.repeats)
+        )
+        report["screened_seconds"] = report["screen_seconds"] + report["screened_blat_seconds"]
+        report["speedup"] = report["legacy_seconds"] / report["screened_seconds"]
+        report["identical_output"] = (legacy_dir / "filtered.fa").read_bytes() == (
+            screened_dir / "filtered.fa"
+        ).read_bytes()
+        report["filtered_records"] = count_records(screened_dir / "filtered.fa")
+
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
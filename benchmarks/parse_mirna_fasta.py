@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+"""
+Compare bin/parse_mirna_fasta.py against the former sed / seqkit / fasta_formatter chain
+of PARSE_FASTA_MIRNA and FORMAT_FASTA_MIRNA on full miRBase.
+
+The legacy chain needs `seqkit` and `fasta_formatter` on the PATH and is skipped otherwise.
+"""
+
+import argparse
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+
+LEGACY_CHAIN = r"""
+set -euo pipefail
+FASTA="$1"
+sed 's/&gt;/>/g' $FASTA | sed 's#<br>#\n#g' | sed 's#</p>##g' | sed 's#<p>##g' | sed -e :a -e '/^\n*$/{$d;N;};/\n$/ba' > ${FASTA}_html_cleaned.fa
+sed '#^[^>]#s#[^AUGCaugc]#N#g' ${FASTA}_html_cleaned.fa > ${FASTA}_parsed.fa
+sed -i 's#\s.*##' ${FASTA}_parsed.fa
+seqkit grep -r --pattern ".*$2-.*" ${FASTA}_parsed.fa > ${FASTA}_sps.fa
+seqkit seq --rna2dna ${FASTA}_sps.fa > ${FASTA}_igenome.fa
+fasta_formatter -w 0 -i ${FASTA}_igenome.fa -o ${FASTA}_igenome.fa_idx.fa
+"""
+
+
+def fetch(source, dest):
+    if source.startswith("http://") or source.startswith("https://"):
+        urllib.request.urlretrieve(source, dest)
+    else:
+        shutil.copy(source, dest)
+    return dest
+
+
+def timed(cmd, cwd):
+    start = time.monotonic()
+    subprocess.run(cmd, cwd=cwd, check=True)
+    return time.monotonic() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mature", default="https://mirbase.org/download/mature.fa")
+    parser.add_argument("--hairpin", default="https://mirbase.org/download/hairpin.fa")
+    parser.add_argument("--species", default="hsa")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    report = {"species": args.species, "repeats": args.repeats}
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        mature = fetch(args.mature, tmp / "mature.fa")
+        hairpin = fetch(args.hairpin, tmp / "hairpin.fa")
+        report["input_bytes"] = mature.stat().st_size + hairpin.stat().st_size
+
+        native = []
+        for _ in range(args.repeats):
+            native.append(
+                timed(
+                    [
+                        sys.executable,
+                        str(REPO / "bin" / "parse_mirna_fasta.py"),
+                        "--species",
+                        args.species,
+                        "-i",
+                        str(mature),
+                        "-o",
+                        str(tmp / "mature_idx.fa"),
+                        "-i",
+                        str(hairpin),
+                        "-o",
+                        str(tmp / "hairpin_idx.fa"),
+                    ],
+                    tmp,
+                )
+            )
+        report["native_seconds"] = min(native)
+
+        if shutil.which("seqkit") and shutil.which("fasta_formatter"):
+            (tmp / "legacy.sh").write_text(LEGACY_CHAIN)
+            legacy = []
+            for _ in range(args.repeats):
+                legacy.append(sum(timed(["bash", "legacy.sh", f.name, args.species], tmp) for f in (mature, hairpin)))
+            report["legacy_seconds"] = min(legacy)
+            report["speedup"] = report["legacy_seconds"] / report["native_seconds"]
+            report["identical_output"] = all(
+                (tmp / f"{name}.fa_igenome.fa_idx.fa").read_bytes() == (tmp / f"{name}_idx.fa").read_bytes()
+                for name in ("mature", "hairpin")
+            )
+        else:
+            report["legacy_seconds"] = None
+
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+
+"""
+Run the pipeline with -profile benchmark on synthetic datasets of 1, 10 and 100 samples
+and report the wall time, peak RSS and bytes written of every process from the Nextflow trace.
+
+Needs `nextflow` on the PATH, and a software profile such as docker given with --profile.
+With --baseline, processes that got slower or larger than a previous report by more than
+--tolerance are listed under "regressions" and the exit status is 1.
+"""
+
+import argparse
+import csv
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from synthetic_smrnaseq import write_dataset
+
+REPO = Path(__file__).resolve().parent.parent
+
+# Subworkflows summed up in the report
+SUBWORKFLOWS = ["CONTAMINANT_FILTER", "MIRNA_QUANT", "GENOME_QUANT"]
+
+MIB = 1024**2
+
+# Metrics compared with --baseline, and the smallest baseline value worth comparing
+METRICS = [
+    ("realtime_seconds", 1.0),
+    ("peak_rss_mib", 16.0),
+    ("written_mib", 1.0),
+]
+
+
+def number(value):
+    """Raw trace values are integers, or '-' where the platform does not provide them."""
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def read_trace(path):
+    """Per-process totals of the completed or cached tasks of a raw Nextflow trace."""
+    processes = defaultdict(lambda: {"tasks": 0, "realtime_seconds": 0.0, "peak_rss_mib": 0.0, "written_mib": 0.0})
+    with open(path, newline="") as fh:
+        for task in csv.DictReader(fh, delimiter="\t"):
+            if task["status"] not in ("COMPLETED", "CACHED"):
+                continue
+            process = processes[task["process"]]
+            process["tasks"] += 1
+            process["realtime_seconds"] += (number(task["realtime"]) or 0) / 1000
+            process["peak_rss_mib"] = max(process["peak_rss_mib"], (number(task["peak_rss"]) or 0) / MIB)
+            process["written_mib"] += (number(task["wchar"]) or 0) / MIB
+    return dict(sorted(processes.items()))
+
+
+def summarize(processes):
+    subworkflows = {}
+    for name in SUBWORKFLOWS:
+        members = [stats for process, stats in processes.items() if name in process.split(":")[:-1]]
+        subworkflows[name] = {
+            "tasks": sum(stats["tasks"] for stats in members),
+            "realtime_seconds": sum(stats["realtime_seconds"] for stats in members),
+            "peak_rss_mib": max((stats["peak_rss_mib"] for stats in members), default=0.0),
+            "written_mib": sum(stats["written_mib"] for stats in members),
+        }
+    return subworkflows
+
+
+def run_pipeline(nextflow, profile, samplesheet, rundir):
+    cmd = [
+        nextflow,
+        "run",
+        str(REPO),
+        "-profile",
+        f"benchmark,{profile}" if profile else "benchmark",
+        "--input",
+        str(samplesheet),
+        "--outdir",
+        str(rundir / "results"),
+        "-work-dir",
+        str(rundir / "work"),
+        "-with-trace",
+        str(rundir / "trace.txt"),
+    ]
+    start = time.monotonic()
+    subprocess.run(cmd, cwd=rundir, check=True)
+    return time.monotonic() - start
+
+
+def compare(report, baseline, tolerance):
+    """Metrics of processes and subworkflows that grew by more than `tolerance` times over the baseline."""
+    regressions = []
+    for samples, run in report["runs"].items():
+        previous = baseline.get("runs", {}).get(samples)
+        if previous is None:
+            continue
+        for level in ("subworkflows", "processes"):
+            for name, stats in run[level].items():
+                before = previous[level].get(name)
+                if before is None:
+                    continue
+                for metric, floor in METRICS:
+                    if before[metric] >= floor and stats[metric] > before[metric] * tolerance:
+                        regressions.append(
+                            {
+                                "samples": samples,
+                                "name": name,
+                                "metric": metric,
+                                "baseline": before[metric],
+                                "current": stats[metric],
+                                "ratio": stats[metric] / before[metric],
+                            }
+                        )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--reads", type=int, default=100000, help="Reads per sample (default 100000).")
+    parser.add_argument("--profile", default="docker", help="Software profile added to 'benchmark' (default docker).")
+    parser.add_argument("--nextflow", default="nextflow")
+    parser.add_argument(
+        "--workdir",
+        type=Path,
+        help="Keep data, work and results here instead of a temporary directory.",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", type=Path, help="A previous report to compare with.")
+    parser.add_argument("--tolerance", type=float, default=1.25)
+    parser.add_argument("--output", type=Path, help="Also write the report to this file.")
+    args = parser.parse_args(argv)
+
+    if not shutil.which(args.nextflow):
+        print(f"{args.nextflow} was not found on the PATH", file=sys.stderr)
+        return 2
+
+    report = {"profile": args.profile, "reads_per_sample": args.reads, "seed": args.seed, "runs": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = (args.workdir or Path(tmp)).resolve()
+        for n_samples in args.samples:
+            rundir = workdir / f"samples_{n_samples}"
+            rundir.mkdir(parents=True, exist_ok=True)
+            samplesheet = write_dataset(rundir / "data", n_samples, args.reads, args.seed)
+            wall_seconds = run_pipeline(args.nextflow, args.profile, samplesheet, rundir)
+            processes = read_trace(rundir / "trace.txt")
+            report["runs"][str(n_samples)] = {
+                "wall_seconds": wall_seconds,
+                "tasks": sum(stats["tasks"] for stats in processes.values()),
+                "subworkflows": summarize(processes),
+                "processes": processes,
+            }
+
+    status = 0
+    if args.baseline:
+        report["regressions"] = compare(report, json.loads(args.baseline.read_text()), args.tolerance)
+        status = 1 if report["regressions"] else 0
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
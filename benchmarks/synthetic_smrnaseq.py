@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+
+"""
+Write synthetic small RNA-seq samples and a samplesheet for -profile benchmark.
+
+Reads are drawn from the miniature miRBase-style reference in benchmarks/data/mini_mirbase:
+mature miRNAs with isomiR variants, other hairpin fragments, rRNA, tRNA, cDNA and genome
+fragments, and random sequence. Every insert is followed by the Illumina small RNA
+adapter and filler up to the read length. miRNA abundances are shared between samples
+up to a per-sample noise, as for replicates, and the output only depends on the seed.
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import math
+import random
+import sys
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+DATA = REPO / "benchmarks" / "data" / "mini_mirbase"
+
+# Adapter of the illumina protocol
+ADAPTER = "TGGAATTCTCGGGTGCCAAGG"
+READ_LENGTH = 50
+SPECIES = "hsa"
+
+# Share of reads of every origin
+COMPOSITION = {
+    "mature": 0.62,
+    "hairpin": 0.06,
+    "rrna": 0.1,
+    "trna": 0.07,
+    "cdna": 0.05,
+    "genome": 0.05,
+    "random": 0.05,
+}
+FRAGMENTS = 2000
+
+
+def read_fasta(path):
+    records, name = {}, None
+    with open(path) as fh:
+        for line in fh:
+            line = line.strip()
+            if line.startswith(">"):
+                name = line[1:].split()[0]
+                records[name] = []
+            elif name is not None:
+                records[name].append(line.upper().replace("U", "T"))
+    return {name: "".join(lines) for name, lines in records.items()}
+
+
+def random_sequence(rng, length):
+    return "".join(rng.choices("ACGT", k=length))
+
+
+def fragments(rng, sequences, n, min_length=18, max_length=32):
+    sequences = [seq for seq in sequences if len(seq) >= max_length]
+    pool = []
+    for _ in range(n):
+        seq = rng.choice(sequences)
+        length = rng.randint(min_length, max_length)
+        start = rng.randrange(len(seq) - length + 1)
+        pool.append(seq[start : start + length])
+    return pool
+
+
+def isomirs(mature, hairpins):
+    """
+    The canonical sequence and templated 5'/3' variants of every mature miRNA of the
+    species, with a non-templated 3' A, grouped by miRNA.
+    """
+    variants = {}
+    for name, seq in mature.items():
+        if not name.startswith(f"{SPECIES}-"):
+            continue
+        hairpin = hairpins.get(name.rsplit("-", 1)[0].replace("-miR-", "-mir-"), "")
+        start = hairpin.find(seq)
+        forms = [(seq, 20.0)]
+        if start > 0:
+            end = start + len(seq)
+            for shift5 in (-1, 0, 1):
+                for shift3 in (-2, -1, 1, 2):
+                    forms.append((hairpin[start + shift5 : end + shift3], 2.0 if shift5 == 0 else 0.5))
+        forms.append((seq + "A", 1.0))
+        variants[name] = forms
+    return variants
+
+
+def build_pools(seed):
+    rng = random.Random(seed)
+    mature = read_fasta(DATA / "mature.fa")
+    hairpins = read_fasta(DATA / "hairpin.fa")
+    pools = {
+        "hairpin": fragments(rng, [seq for name, seq in hairpins.items() if name.startswith(f"{SPECIES}-")], FRAGMENTS),
+        "rrna": fragments(rng, read_fasta(DATA / "rrna.fa").values(), FRAGMENTS),
+        "trna": fragments(rng, read_fasta(DATA / "trna.fa").values(), FRAGMENTS),
+        "cdna": fragments(rng, read_fasta(DATA / "cdna.fa").values(), FRAGMENTS),
+        "genome": fragments(rng, read_fasta(DATA / "genome.fa").values(), FRAGMENTS),
+        "random": [random_sequence(rng, rng.randint(18, 32)) for _ in range(FRAGMENTS)],
+    }
+    variants = isomirs(mature, hairpins)
+    # Expression of every miRNA in a reference sample, spanning several orders of magnitude
+    expression = {name: math.exp(rng.gauss(0, 2)) for name in sorted(variants)}
+    return pools, variants, expression
+
+
+def to_read(rng, insert):
+    read = insert + ADAPTER
+    return read + random_sequence(rng, READ_LENGTH - len(read)) if len(read) < READ_LENGTH else read[:READ_LENGTH]
+
+
+def write_sample(path, name, n_reads, pools, variants, expression, seed):
+    rng = random.Random(seed)
+    inserts, weights = [], []
+    for origin, share in COMPOSITION.items():
+        if origin == "mature":
+            noisy = {mirna: level * math.exp(rng.gauss(0, 0.3)) for mirna, level in expression.items()}
+            total = sum(noisy.values())
+            for mirna, forms in variants.items():
+                form_total = sum(weight for _, weight in forms)
+                for seq, weight in forms:
+                    inserts.append(seq)
+                    weights.append(share * noisy[mirna] / total * weight / form_total)
+        else:
+            inserts += pools[origin]
+            weights += [share / len(pools[origin])] * len(pools[origin])
+    # The filler after the adapter is fixed per insert so that identical molecules give identical reads
+    reads = [to_read(rng, insert) for insert in inserts]
+    quality = "I" * READ_LENGTH
+    with open(path, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=1, mtime=0) as fh:
+        for i, read in enumerate(rng.choices(reads, weights=weights, k=n_reads)):
+            fh.write(f"@{name}:{i + 1}\n{read}\n+\n{quality}\n".encode())
+
+
+def write_dataset(outdir, n_samples, n_reads, seed=0):
+    """Write `n_samples` FASTQ files of `n_reads` reads and their samplesheet, and return the samplesheet."""
+    outdir = Path(outdir)
+    outdir.mkdir(parents=True, exist_ok=True)
+    pools, variants, expression = build_pools(seed)
+    samplesheet = outdir / "samplesheet.csv"
+    with open(samplesheet, "w", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(["sample", "fastq_1", "fastq_2"])
+        for i in range(n_samples):
+            name = f"SYNTHETIC_{i + 1:03d}"
+            fastq = outdir / f"{name}.fastq.gz"
+            write_sample(fastq, name, n_reads, pools, variants, expression, seed=f"{seed}:{i}")
+            writer.writerow([name, str(fastq.resolve()), ""])
+    return samplesheet
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--outdir", required=True, type=Path)
+    parser.add_argument("--samples", type=int, default=10)
+    parser.add_argument("--reads", type=int, default=100000, help="Reads per sample (default 100000).")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    samplesheet = write_dataset(args.outdir, args.samples, args.reads, args.seed)
+    json.dump({"samplesheet": str(samplesheet), "samples": args.samples, "reads": args.reads}, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+
+"""
+Sum the isomiR counts of a mirtop isomir export per miRNA.
+
+Equivalent to the former collapse_mirtop.r: keep the first row of every
+UID, then sum column 13 onwards per miRNA (column 3), in order of first
+appearance. The table is processed in chunks so memory does not grow with
+its number of rows.
+"""
+
+import argparse
+import logging
+import re
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger()
+
+MIRNA_COLUMN = 2
+FIRST_COUNT_COLUMN = 12
+# Keep roughly this many count cells in memory per chunk.
+CHUNK_CELLS = 1 << 24
+
+R_RESERVED = {
+    "if",
+    "else",
+    "repeat",
+    "while",
+    "function",
+    "for",
+    "next",
+    "break",
+    "TRUE",
+    "FALSE",
+    "NULL",
+    "Inf",
+    "NaN",
+    "NA",
+    "NA_integer_",
+    "NA_real_",
+    "NA_character_",
+    "in",
+}
+
+
+def make_names(names):
+    """Column names as R's read.delim(check.names = TRUE) would report them."""
+    valid = []
+    for name in names:
+        name = re.sub(r"[^A-Za-z0-9._]", ".", name)
+        if not re.match(r"[A-Za-z]|\.(?![0-9])", name):
+            name = "X" + name
+        if name in R_RESERVED:
+            name += "."
+        valid.append(name)
+
+    seen = {}
+    unique = []
+    for name in valid:
+        if name in seen:
+            seen[name] += 1
+            candidate = f"{name}.{seen[name]}"
+            while candidate in seen:
+                seen[name] += 1
+                candidate = f"{name}.{seen[name]}"
+            seen[candidate] = 0
+            name = candidate
+        else:
+            seen[name] = 0
+        unique.append(name)
+    return unique
+
+
+class UidSet:
+    """
+    Set of 64 bit UID hashes. Much smaller than keeping the UID strings, and
+    lookups are done a whole chunk at a time.
+    """
+
+    def __init__(self):
+        self.seen = set()
+
+    def first_occurrences(self, uids):
+        """Mask of the UIDs in `uids` that were not seen in this or any earlier chunk."""
+        hashes = pd.util.hash_array(uids.to_numpy(dtype=object))
+        mask = ~pd.Series(hashes).duplicated().to_numpy()
+        mask &= np.fromiter((h not in self.seen for h in hashes.tolist()), dtype=bool, count=len(hashes))
+        self.seen.update(hashes[mask].tolist())
+        return mask
+
+
+class MirnaTotals:
+    """Per-miRNA count sums, kept in order of first appearance."""
+
+    def __init__(self, n_samples):
+        self.index = {}
+        self.sums = np.zeros((1024, n_samples))
+
+    def add(self, mirnas, counts):
+        codes, uniques = pd.factorize(mirnas, sort=False)
+        chunk_sums = pd.DataFrame(counts).groupby(codes, sort=True).sum().to_numpy()
+        missing = np.isnan(counts)
+        if missing.any():
+            # Like R's sum(), a missing count makes the whole sum missing.
+            chunk_sums[pd.DataFrame(missing).groupby(codes, sort=True).any().to_numpy()] = np.nan
+
+        rows = np.empty(len(uniques), dtype=np.int64)
+        for i, mirna in enumerate(uniques):
+            rows[i] = self.index.setdefault(mirna, len(self.index))
+        if len(self.index) > len(self.sums):
+            grown = np.zeros((max(2 * len(self.sums), len(self.index)), self.sums.shape[1]))
+            grown[: len(self.sums)] = self.sums
+            self.sums = grown
+        self.sums[rows] += chunk_sums
+
+    def write(self, path, header):
+        with open(path, "w") as fout:
+            fout.write("\t".join(header) + "\n")
+            for mirna, row in self.index.items():
+                values = "\t".join("NA" if np.isnan(v) else f"{v:.15g}" for v in self.sums[row])
+                fout.write(f"{mirna}\t{values}\n" if values else f"{mirna}\n")
+
+
+def collapse_mirtop(input_path, output_path, chunk_cells=CHUNK_CELLS):
+    columns = pd.read_csv(input_path, sep="\t", nrows=0).columns.tolist()
+    if "UID" not in columns or len(columns) <= MIRNA_COLUMN:
+        raise ValueError(f"{input_path} does not look like a mirtop isomir table.")
+    names = make_names(columns)
+    mirna = columns[MIRNA_COLUMN]
+    samples = columns[FIRST_COUNT_COLUMN:]
+
+    chunk_rows = max(1, chunk_cells // max(1, len(samples)))
+    reader = pd.read_csv(
+        input_path,
+        sep="\t",
+        usecols=["UID", mirna, *samples],
+        dtype={"UID": str, mirna: str, **{s: np.float64 for s in samples}},
+        keep_default_na=False,
+        na_values={s: ["NA"] for s in samples},
+        chunksize=chunk_rows,
+    )
+
+    uids = UidSet()
+    totals = MirnaTotals(len(samples))
+    rows = kept = 0
+    for chunk in reader:
+        rows += len(chunk)
+        mask = uids.first_occurrences(chunk["UID"])
+        kept += int(mask.sum())
+        totals.add(chunk[mirna].to_numpy()[mask], chunk[samples].to_numpy()[mask])
+
+    totals.write(output_path, [names[MIRNA_COLUMN], *names[FIRST_COUNT_COLUMN:]])
+    logger.info(f"{input_path}: {rows} rows, {kept} unique UIDs, {len(totals.index)} miRNAs, {len(samples)} samples")
+
+
+def parse_args(argv=None):
+    """Define and immediately parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Sum the counts of a mirtop isomir table per miRNA.",
+        epilog="Example: python collapse_mirtop.py mirtop.tsv -o mirna.tsv",
+    )
+    parser.add_argument("input", type=Path, help="mirtop export --format isomir table.")
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        help="Output table (default mirna.tsv next to the input).",
+    )
+    parser.add_argument(
+        "--chunk-cells",
+        type=int,
+        default=CHUNK_CELLS,
+        help=f"Approximate number of count cells held in memory at once (default {CHUNK_CELLS}).",
+    )
+    parser.add_argument(
+        "-l",
+        "--log-level",
+        help="The desired log level (default WARNING).",
+        choices=("CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"),
+        default="WARNING",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Coordinate argument parsing and program execution."""
+    args = parse_args(argv)
+    logging.basicConfig(level=args.log_level, format="[%(levelname)s] %(message)s")
+    if not args.input.is_file():
+        logger.error(f"The given input file {args.input} was not found!")
+        return 2
+    output = args.output or args.input.parent / "mirna.tsv"
+    collapse_mirtop(args.input, output, args.chunk_cells)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+
+"""
+Collapse the reads of a sample into unique sequences with their read counts.
+
+Besides the FASTQ used for the miRNA alignments, the collapsed reads can be
+written as the `*_collapsed.fa` FASTA that miRDeep2 expects from
+`mapper.pl -m`, so the mapper only needs to align them.
+"""
+
+import argparse
+import logging
+import re
+import sys
+from pathlib import Path
+
+from fastx_io import ParallelGzipWriter, iter_fastq, open_binary
+
+logger = logging.getLogger()
+
+COUNT_SUFFIX = re.compile(rb"_x(\d+)$")
+# mapper.pl -i -j: RNA to DNA, then drop sequences with anything but ACGTN
+MIRDEEP2_TABLE = bytes.maketrans(b"acgtunU", b"ACGTTNT")
+MIRDEEP2_INVALID = re.compile(rb"[^ACGTN]")
+
+
+def collapse(path, min_length=0, collapsed_input=False, normalize=None):
+    """
+    Count every distinct sequence in a FASTQ file. The quality string of the
+    first read with a given sequence is kept.
+
+    With `collapsed_input`, every read stands for the count in its
+    ``_x<count>`` name suffix. `normalize` maps a sequence to the one to
+    count it as, or to None to drop it.
+    """
+    uniques = {}
+    total = 0
+    with open_binary(path) as fin:
+        for name, seq, qual in iter_fastq(fin):
+            if len(seq) < min_length:
+                continue
+            if normalize is not None:
+                seq = normalize(seq)
+                if seq is None:
+                    continue
+            count = 1
+            if collapsed_input:
+                match = COUNT_SUFFIX.search(name.split()[0])
+                if match is None:
+                    raise ValueError(f"Read {name.decode()} has no _x<count> suffix")
+                count = int(match.group(1))
+            total += count
+            entry = uniques.get(seq)
+            if entry is None:
+                uniques[seq] = [count, qual]
+            else:
+                entry[0] += count
+    return total, uniques
+
+
+def mirdeep2_sequence(seq):
+    seq = seq.translate(MIRDEEP2_TABLE)
+    return None if MIRDEEP2_INVALID.search(seq) else seq
+
+
+def write_collapsed(path, uniques, threads):
+    """
+    Write unique sequences as FASTQ, most abundant first, named
+    ``seq_<rank>_x<count>`` as done by ``seqcluster collapse`` so mirtop can
+    read the counts back from alignments.
+    """
+    ranked = sorted(uniques.items(), key=lambda kv: (-kv[1][0], kv[0]))
+    with ParallelGzipWriter(path, threads=threads) as fout:
+        for rank, (seq, (count, qual)) in enumerate(ranked, start=1):
+            fout.write(b"@seq_%d_x%d\n%s\n+\n%s\n" % (rank, count, seq, qual))
+
+
+def write_mirdeep2(path, uniques):
+    """
+    Write unique sequences as FASTA the way mapper.pl collapses reads: most
+    abundant first, named ``seq_<offset>_x<count>`` where the offset is the
+    number of reads written before.
+    """
+    ranked = sorted(uniques.items(), key=lambda kv: (-kv[1][0], kv[0]))
+    offset = 0
+    with open(path, "wb", buffering=1 << 20) as fout:
+        for seq, (count, _) in ranked:
+            fout.write(b">seq_%d_x%d\n%s\n" % (offset, count, seq))
+            offset += count
+
+
+def parse_args(argv=None):
+    """Define and immediately parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Collapse reads into unique sequences named seq_<rank>_x<count>.",
+        epilog="Example: python collapse_reads.py --input s1.fastq.gz --output s1.collapsed.fastq.gz",
+    )
+    parser.add_argument(
+        "-i",
+        "--input",
+        required=True,
+        type=Path,
+        help="Input FASTQ file, optionally gzip compressed.",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        required=True,
+        type=Path,
+        help="Gzip compressed collapsed FASTQ file, or uncompressed FASTA with --format mirdeep2.",
+    )
+    parser.add_argument(
+        "--format",
+        choices=("fastq", "mirdeep2"),
+        default="fastq",
+        help="Output format (default fastq).",
+    )
+    parser.add_argument(
+        "--collapsed-input",
+        action="store_true",
+        help="The input is already collapsed, with read counts in _x<count> name suffixes.",
+    )
+    parser.add_argument(
+        "--min-length",
+        type=int,
+        default=0,
+        help="Drop reads shorter than this many nucleotides (default 0).",
+    )
+    parser.add_argument("--threads", type=int, default=1, help="Number of compression threads (default 1).")
+    parser.add_argument(
+        "-l",
+        "--log-level",
+        help="The desired log level (default WARNING).",
+        choices=("CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"),
+        default="WARNING",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Coordinate argument parsing and program execution."""
+    args = parse_args(argv)
+    logging.basicConfig(level=args.log_level, format="[%(levelname)s] %(message)s")
+    if not args.input.is_file():
+        logger.error(f"The given input file {args.input} was not found!")
+        return 2
+    if args.format == "mirdeep2":
+        total, uniques = collapse(args.input, args.min_length, args.collapsed_input, normalize=mirdeep2_sequence)
+        write_mirdeep2(args.output, uniques)
+    else:
+        total, uniques = collapse(args.input, args.min_length, args.collapsed_input)
+        write_collapsed(args.output, uniques, args.threads)
+    logger.info(f"{args.input}: collapsed {total} reads into {len(uniques)} unique sequences")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
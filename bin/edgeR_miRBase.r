@@ -11,43 +11,25 @@ library("data.table")
 library("gplots")
 library("methods")
 
-# Put mature and hairpin count files in separated file lists
+# Put mature and hairpin count matrices (from edger_count_matrix.py) in separated file lists
 filelist<-list()
-filelist[[1]]<-input[grep(".mature.sorted",input)]
-filelist[[2]]<-input[grep(".hairpin.sorted",input)]
+filelist[[1]]<-input[grep("mature_count_matrix",input)]
+filelist[[2]]<-input[grep("hairpin_count_matrix",input)]
 names(filelist)<-c("mature","hairpin")
 print(filelist)
 
 for (i in 1:2) {
     header<-names(filelist)[i]
 
-    # Prepare the combined data frame with gene ID as rownames and sample ID as colname
-    data<-do.call("cbind", lapply(filelist[[i]], fread, header=FALSE, select=c(3)))
-    unmapped<-do.call("cbind", lapply(filelist[[i]], fread, header=FALSE, select=c(4)))
-    data<-as.data.frame(data)
-    unmapped<-as.data.frame(unmapped)
-    temp <- fread(filelist[[i]][1],header=FALSE, select=c(1))
-    rownames(data)<-temp$V1
-    rownames(unmapped)<-temp$V1
-    colnames(data)<-gsub("_mature.*","",basename(filelist[[i]]))
-    colnames(unmapped)<-gsub("_mature.*","",basename(filelist[[i]]))
-
-    data<-data[rownames(data)!="*",,drop=FALSE]
-    unmapped<-unmapped[rownames(unmapped)=="*",,drop=FALSE]
-
-    # Write the summary table of unmapped reads
-    write.table(unmapped,file=paste(header,"_unmapped_read_counts.txt",sep=""),sep='\t',quote=FALSE)
-
-    # Remove genes with 0 reads in all samples
-    row_sub = apply(data, 1, function(row) all(row ==0 ))
-    # Only subset if at least one sample is remaining
-    nr_keep <- sum(row_sub)
-    if (nr_keep > 0){
-        data<-data[!row_sub,, drop=FALSE]
-    }
-    #Also check for colSums > 0, otherwise DGEList will fail if samples have entirely colSum == 0 #Fixes #134
-    drop_colsum_zero <- (colSums(data, na.rm=T) != 0) # T if colSum is not 0, F otherwise
-    data <- data[, drop_colsum_zero] # all the non-zero columns
+    # Features with gene ID as first column and one column per sample. Features
+    # and samples without any reads have already been removed.
+    counts<-fread(filelist[[i]], header=TRUE, sep="\t", check.names=FALSE)
+    data<-as.data.frame(counts[, -1, with=FALSE], check.names=FALSE)
+    rownames(data)<-counts[[1]]
+
+    # The summary table of unmapped reads lists every sample
+    unmapped<-read.table(paste(header,"_unmapped_read_counts.txt",sep=""), header=TRUE, sep="\t", check.names=FALSE)
+    nsamples<-ncol(unmapped)
 
     write.csv(t(data),file=paste(header,"_counts.csv",sep=""))
 
@@ -71,7 +53,7 @@ for (i in 1:2) {
     dataNorm_df<-as.data.frame(cpm(dataNorm))
     write.table(dataNorm_df,file=paste(header,"_normalized_CPM.txt",sep=""),sep='\t',quote=FALSE)
 
-    if (length(filelist[[1]]) > 1){ # with more than 1 sample
+    if (nsamples > 1){ # with more than 1 sample
         # Print heatmap based on normalized read counts
         pdf(paste(header,"_CPM_heatmap.pdf",sep=""))
         heatmap.2(cpm(dataNorm),col=redgreen(100),key=TRUE,scale="row",density.info="none",trace="none")
@@ -79,7 +61,7 @@ for (i in 1:2) {
     }
 
     # Make MDS plot (only perform with 3 or more samples)
-    if (length(filelist[[1]]) > 2){
+    if (nsamples > 2){
         pdf(paste(header,"_edgeR_MDS_plot.pdf",sep=""))
         MDSdata <- plotMDS(dataNorm)
         dev.off()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+
+"""
+Join samtools idxstats files of the mature and hairpin alignments into one
+compact count matrix per reference for edgeR_miRBase.r.
+
+Files are joined by feature name, so they need not list features in the same
+order. Only non-zero counts are kept while reading, and features and samples
+without any read are left out of the matrix.
+"""
+
+import argparse
+import logging
+import re
+import sys
+from array import array
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger()
+
+# Same patterns edgeR_miRBase.r used to tell mature and hairpin files apart.
+REFERENCES = {"mature": re.compile(r".mature.sorted"), "hairpin": re.compile(r".hairpin.sorted")}
+UNMAPPED = "*"
+
+
+def sample_name(path):
+    return re.sub(r"_mature.*", "", Path(path).name)
+
+
+class SparseCounts:
+    """Non-zero (feature, sample, count) triplets, with features in order of first appearance."""
+
+    def __init__(self):
+        self.features = {}
+        self.samples = []
+        self.unmapped = []
+        self.rows = array("q")
+        self.cols = array("q")
+        self.values = array("q")
+
+    def add_idxstats(self, path):
+        col = len(self.samples)
+        self.samples.append(sample_name(path))
+        unmapped = 0
+        with open(path) as fh:
+            for line in fh:
+                fields = line.rstrip("\n").split("\t")
+                if len(fields) < 4:
+                    continue
+                name = fields[0]
+                if name == UNMAPPED:
+                    unmapped = int(fields[3])
+                    continue
+                row = self.features.setdefault(name, len(self.features))
+                mapped = int(fields[2])
+                if mapped:
+                    self.rows.append(row)
+                    self.cols.append(col)
+                    self.values.append(mapped)
+        self.unmapped.append(unmapped)
+
+    def compact(self):
+        """Dense matrix restricted to features and samples with at least one read."""
+        rows = np.frombuffer(self.rows, dtype=np.int64)
+        cols = np.frombuffer(self.cols, dtype=np.int64)
+        values = np.frombuffer(self.values, dtype=np.int64)
+
+        keep_rows = np.flatnonzero(np.bincount(rows, minlength=len(self.features)))
+        keep_cols = np.flatnonzero(np.bincount(cols, minlength=len(self.samples)))
+        row_index = np.full(len(self.features), -1)
+        row_index[keep_rows] = np.arange(len(keep_rows))
+        col_index = np.full(len(self.samples), -1)
+        col_index[keep_cols] = np.arange(len(keep_cols))
+
+        matrix = np.zeros((len(keep_rows), len(keep_cols)), dtype=np.int64)
+        np.add.at(matrix, (row_index[rows], col_index[cols]), values)
+
+        names = list(self.features)
+        return [names[i] for i in keep_rows], [self.samples[i] for i in keep_cols], matrix
+
+
+def write_matrix(path, features, samples, matrix):
+    with open(path, "w") as fout:
+        fout.write("\t".join(["feature", *samples]) + "\n")
+        for name, row in zip(features, matrix):
+            fout.write("\t".join([name, *map(str, row.tolist())]) + "\n")
+
+
+def write_unmapped(path, samples, unmapped):
+    # Layout of R's write.table(quote = FALSE) with row names.
+    with open(path, "w") as fout:
+        fout.write("\t".join(samples) + "\n")
+        fout.write("\t".join([UNMAPPED, *map(str, unmapped)]) + "\n")
+
+
+def parse_args(argv=None):
+    """Define and immediately parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Build compact mature and hairpin count matrices from samtools idxstats files.",
+        epilog="Example: python edger_count_matrix.py s1_mature.sorted.idxstats s1_mature_hairpin.sorted.idxstats",
+    )
+    parser.add_argument("idxstats", nargs="+", type=Path, help="samtools idxstats files.")
+    parser.add_argument(
+        "-l",
+        "--log-level",
+        help="The desired log level (default WARNING).",
+        choices=("CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"),
+        default="WARNING",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Coordinate argument parsing and program execution."""
+    args = parse_args(argv)
+    logging.basicConfig(level=args.log_level, format="[%(levelname)s] %(message)s")
+    for reference, pattern in REFERENCES.items():
+        counts = SparseCounts()
+        for path in args.idxstats:
+            if pattern.search(str(path)):
+                counts.add_idxstats(path)
+        if not counts.samples:
+            logger.error(f"No {reference} idxstats files were given!")
+            return 2
+
+        features, samples, matrix = counts.compact()
+        write_matrix(f"{reference}_count_matrix.tsv", features, samples, matrix)
+        write_unmapped(f"{reference}_unmapped_read_counts.txt", counts.samples, counts.unmapped)
+        logger.info(
+            f"{reference}: kept {len(features)} of {len(counts.features)} features "
+            f"and {len(samples)} of {len(counts.samples)} samples"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+
+"""
+Profile the reads of a small RNA library in a single streaming pass.
+
+Reads are processed in batches with NumPy to collect the mean quality per
+position and the read length distribution. Distinct sequences are counted for
+the most abundant sequences, and reads made of (almost) nothing but adapter
+are counted as adapter dimers. Results are written as MultiQC custom content.
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+import numpy as np
+from fastx_io import iter_fastq, open_binary, write_mqc_yaml
+
+logger = logging.getLogger()
+
+BATCH_SIZE = 100_000
+# Long enough to be specific, short enough to match partial adapters at a read end.
+ADAPTER_PREFIX_LENGTH = 10
+
+
+class ReadProfile:
+    """Per-position quality, length distribution, sequence counts and adapter dimers of a set of reads."""
+
+    def __init__(self, phred_offset=33, adapter=None, max_insert=3, max_distinct=2_000_000):
+        self.phred_offset = phred_offset
+        self.adapter = adapter.upper().encode()[:ADAPTER_PREFIX_LENGTH] if adapter else None
+        self.max_insert = max_insert
+        self.max_distinct = max_distinct
+        self.quality_sum = np.zeros(0, dtype=np.float64)
+        self.lengths = np.zeros(0, dtype=np.int64)
+        self.sequences = {}
+        self.uncounted = 0
+        self.dimers = 0
+
+    @property
+    def total(self):
+        return int(self.lengths.sum())
+
+    def add_batch(self, seqs, quals):
+        lengths = np.fromiter(map(len, seqs), dtype=np.int64, count=len(seqs))
+        max_length = int(lengths.max()) if len(lengths) else 0
+        if max_length + 1 > len(self.lengths):
+            self.lengths = np.pad(self.lengths, (0, max_length + 1 - len(self.lengths)))
+            self.quality_sum = np.pad(self.quality_sum, (0, max_length - len(self.quality_sum)))
+        self.lengths[: max_length + 1] += np.bincount(lengths, minlength=max_length + 1)
+
+        # Position of every base within its read, for all reads of the batch at once.
+        qualities = np.frombuffer(b"".join(quals), dtype=np.uint8).astype(np.int64) - self.phred_offset
+        starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        positions = np.arange(len(qualities)) - starts
+        self.quality_sum[:max_length] += np.bincount(positions, weights=qualities, minlength=max_length)
+
+        counts = self.sequences
+        for seq in seqs:
+            if seq in counts:
+                counts[seq] += 1
+            elif len(counts) < self.max_distinct:
+                counts[seq] = 1
+            else:
+                self.uncounted += 1
+
+        if self.adapter is not None:
+            window = self.max_insert + len(self.adapter)
+            self.dimers += sum(
+                1 for seq in seqs if len(seq) <= self.max_insert or seq.find(self.adapter, 0, window) != -1
+            )
+
+    def add_file(self, path, batch_size=BATCH_SIZE):
+        seqs, quals = [], []
+        with open_binary(path) as fin:
+            for _, seq, qual in iter_fastq(fin):
+                seqs.append(seq.upper())
+                quals.append(qual)
+                if len(seqs) == batch_size:
+                    self.add_batch(seqs, quals)
+                    seqs, quals = [], []
+        if seqs:
+            self.add_batch(seqs, quals)
+
+    def mean_quality(self):
+        # Reads covering a position are those longer than it.
+        covering = np.cumsum(self.lengths[::-1])[::-1][1:]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = self.quality_sum / covering
+        return {position + 1: round(float(q), 2) for position, q in enumerate(mean) if covering[position]}
+
+    def length_distribution(self):
+        return {length: int(count) for length, count in enumerate(self.lengths) if count}
+
+    def top_sequences(self, n):
+        return sorted(self.sequences.items(), key=lambda kv: (-kv[1], kv[0]))[:n]
+
+    def summary(self):
+        total = self.total
+        top = self.top_sequences(1)
+        mean_length = float(np.dot(np.arange(len(self.lengths)), self.lengths) / total) if total else 0.0
+        summary = {
+            "reads": total,
+            "mean_length": round(mean_length, 2),
+            "top_sequence_percent": round(100 * top[0][1] / total, 2) if top else 0.0,
+        }
+        if not self.uncounted:
+            summary["distinct_percent"] = round(100 * len(self.sequences) / total, 2) if total else 0.0
+        if self.adapter is not None:
+            summary["adapter_dimer_percent"] = round(100 * self.dimers / total, 2) if total else 0.0
+        return summary
+
+
+def sections(sample, stage, profile):
+    """MultiQC custom content sections, with ids per stage so raw and trimmed reads get their own plots."""
+    label = f"Read profile ({stage})"
+    return {
+        "quality": {
+            "id": f"read_profile_{stage}_quality",
+            "section_name": f"{label}: mean quality per position",
+            "description": "Mean Phred quality of the bases at every read position.",
+            "plot_type": "linegraph",
+            "pconfig": {
+                "id": f"read_profile_{stage}_quality_plot",
+                "title": f"{label}: mean quality per position",
+                "xlab": "Position (nt)",
+                "ylab": "Mean Phred quality",
+                "xDecimals": False,
+            },
+            "data": {sample: profile.mean_quality()},
+        },
+        "length": {
+            "id": f"read_profile_{stage}_length",
+            "section_name": f"{label}: read length",
+            "description": "Length distribution of the reads.",
+            "plot_type": "linegraph",
+            "pconfig": {
+                "id": f"read_profile_{stage}_length_plot",
+                "title": f"{label}: read length",
+                "xlab": "Read length (nt)",
+                "ylab": "Number of reads",
+                "xDecimals": False,
+            },
+            "data": {sample: profile.length_distribution()},
+        },
+        "summary": {
+            "id": f"read_profile_{stage}_summary",
+            "section_name": f"{label}: summary",
+            "description": (
+                "Reads, mean read length, share of the most abundant sequence, share of distinct sequences "
+                "and share of adapter dimers (reads with an insert of at most a few nucleotides)."
+            ),
+            "plot_type": "table",
+            "pconfig": {"id": f"read_profile_{stage}_summary_table", "namespace": label},
+            "data": {sample: profile.summary()},
+        },
+    }
+
+
+def parse_args(argv=None):
+    """Define and immediately parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Profile read quality, length, abundant sequences and adapter dimers of FASTQ files.",
+        epilog="Example: python fastq_profile.py --sample s1 --stage raw --adapter TGGAATTCTCGGGTGCCAAGG s1.fastq.gz",
+    )
+    parser.add_argument("reads", nargs="+", type=Path, help="FASTQ files of the sample, optionally gzip compressed.")
+    parser.add_argument("--sample", required=True, help="Sample name used in the MultiQC sections and output files.")
+    parser.add_argument(
+        "--stage", default="raw", help="Label of the processing stage, e.g. raw or trimmed (default raw)."
+    )
+    parser.add_argument("--adapter", help="3' adapter sequence to detect adapter dimers with.")
+    parser.add_argument(
+        "--max-insert",
+        type=int,
+        default=3,
+        help="Reads with an insert of at most this many nucleotides before the adapter are dimers (default 3).",
+    )
+    parser.add_argument("--phred-offset", type=int, default=33, help="Phred quality offset (default 33).")
+    parser.add_argument("--top", type=int, default=50, help="Number of most abundant sequences to report (default 50).")
+    parser.add_argument(
+        "--max-distinct",
+        type=int,
+        default=2_000_000,
+        help="Stop counting new distinct sequences beyond this many to bound memory (default 2000000).",
+    )
+    parser.add_argument(
+        "-l",
+        "--log-level",
+        help="The desired log level (default WARNING).",
+        choices=("CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"),
+        default="WARNING",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Coordinate argument parsing and program execution."""
+    args = parse_args(argv)
+    logging.basicConfig(level=args.log_level, format="[%(levelname)s] %(message)s")
+    for path in args.reads:
+        if not path.is_file():
+            logger.error(f"The given input file {path} was not found!")
+            return 2
+
+    profile = ReadProfile(args.phred_offset, args.adapter, args.max_insert, args.max_distinct)
+    for path in args.reads:
+        profile.add_file(path)
+    if profile.uncounted:
+        logger.warning(
+            f"More than {args.max_distinct} distinct sequences, {profile.uncounted} reads of later ones were "
+            "not counted. The top sequences are approximate."
+        )
+
+    prefix = f"{args.sample}.{args.stage}"
+    for name, section in sections(args.sample, args.stage, profile).items():
+        write_mqc_yaml(f"{prefix}.{name}_mqc.yaml", section)
+
+    total = profile.total
+    with open(f"{prefix}.top_sequences.tsv", "w") as fout:
+        fout.write("sequence\tcount\tpercent\n")
+        for seq, count in profile.top_sequences(args.top):
+            fout.write(f"{seq.decode()}\t{count}\t{100 * count / total:.4f}\n")
+    logger.info(f"{args.sample} ({args.stage}): {profile.summary()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
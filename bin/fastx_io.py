@@ -0,0 +1,105 @@
+"""Shared FASTA/FASTQ and MultiQC input and output helpers for the scripts in bin/."""
+
+import gzip
+import json
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+GZIP_MAGIC = b"\x1f\x8b"
+BLOCK_SIZE = 4 << 20
+
+
+def is_gzipped(path):
+    with Path(path).open("rb") as fh:
+        return fh.read(2) == GZIP_MAGIC
+
+
+def open_binary(path):
+    """Open a plain or gzip compressed file for binary reading."""
+    return gzip.open(path, "rb") if is_gzipped(path) else Path(path).open("rb")
+
+
+def open_text(path):
+    """Open a plain or gzip compressed file for text reading."""
+    return gzip.open(path, "rt") if is_gzipped(path) else Path(path).open("rt")
+
+
+def read_blocks(handle, size=BLOCK_SIZE):
+    """Yield raw blocks of `size` bytes until the handle is exhausted."""
+    while True:
+        block = handle.read(size)
+        if not block:
+            return
+        yield block
+
+
+def iter_fastq(handle):
+    """
+    Yield (name, sequence, quality) tuples as bytes from a binary FASTQ
+    handle. Names exclude the leading '@'.
+    """
+    while True:
+        name = handle.readline()
+        if not name:
+            return
+        seq = handle.readline().rstrip(b"\r\n")
+        handle.readline()
+        qual = handle.readline().rstrip(b"\r\n")
+        yield name[1:].rstrip(b"\r\n"), seq, qual
+
+
+def _gzip_member(data, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+class ParallelGzipWriter:
+    """
+    Write a gzip file as a series of independently compressed members, like
+    pigz or bgzip, so compression runs on several threads. zlib releases the
+    GIL while deflating. At most `2 * threads` blocks are held in memory.
+    """
+
+    def __init__(self, path, threads=1, level=6, block_size=BLOCK_SIZE):
+        self.handle = Path(path).open("wb")
+        self.level = level
+        self.block_size = block_size
+        self.max_pending = max(1, 2 * threads)
+        self.pool = ThreadPoolExecutor(max_workers=max(1, threads))
+        self.pending = deque()
+        self.buffer = bytearray()
+        self.bytes_in = 0
+
+    def write(self, data):
+        self.buffer += data
+        self.bytes_in += len(data)
+        if len(self.buffer) >= self.block_size:
+            self._submit()
+
+    def _submit(self):
+        self.pending.append(self.pool.submit(_gzip_member, bytes(self.buffer), self.level))
+        self.buffer = bytearray()
+        while len(self.pending) >= self.max_pending:
+            self.handle.write(self.pending.popleft().result())
+
+    def close(self):
+        if self.buffer or self.bytes_in == 0:
+            self._submit()
+        while self.pending:
+            self.handle.write(self.pending.popleft().result())
+        self.pool.shutdown()
+        self.handle.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_mqc_yaml(path, content):
+    """Write MultiQC custom content to a `*_mqc.yaml` file."""
+    # JSON is a subset of YAML and takes care of quoting sample names.
+    Path(path).write_text(json.dumps(content, indent=2) + "\n")
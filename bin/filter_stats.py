@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+
+"""Summarise contamination filtering and compress the remaining reads in a single pass."""
+
+import argparse
+import logging
+import re
+import sys
+from collections import Counter
+from pathlib import Path
+
+from fastx_io import ParallelGzipWriter, open_binary, read_blocks, write_mqc_yaml
+
+logger = logging.getLogger()
+
+STATS_LINE = re.compile(r'^\s*"?(?P<name>[^":]+)"?\s*:\s*(?P<count>\d+)\s*,?\s*$')
+
+
+def count_and_compress(reads, output, threads):
+    """
+    Copy `reads` into a gzip compressed `output` and count reads and read
+    lengths on the way. The input is only read once.
+    """
+    lengths = Counter()
+    partial = b""
+    line_no = 0
+    with open_binary(reads) as fin, ParallelGzipWriter(output, threads=threads) as fout:
+        for block in read_blocks(fin):
+            fout.write(block)
+            lines = (partial + block).split(b"\n")
+            partial = lines.pop()
+            # Sequence lines are the second line of every four line record.
+            first = (1 - line_no) % 4
+            lengths.update(len(line.rstrip(b"\r")) for line in lines[first::4])
+            line_no += len(lines)
+    if partial:
+        if line_no % 4 == 1:
+            lengths[len(partial.rstrip(b"\r"))] += 1
+        line_no += 1
+    if line_no % 4:
+        logger.warning(f"{reads} has {line_no} lines, which is not a multiple of four.")
+    return sum(lengths.values()), lengths
+
+
+def parse_stats(paths):
+    """Read the `"<type>": <count>` lines written by the contaminant mapping steps."""
+    counts = {}
+    for path in sorted(paths):
+        for line in Path(path).read_text().splitlines():
+            if not line.strip():
+                continue
+            match = STATS_LINE.match(line)
+            if match is None:
+                logger.warning(f"Ignoring malformed line in {path}: {line!r}")
+                continue
+            name = match.group("name").strip()
+            counts[name] = counts.get(name, 0) + int(match.group("count"))
+    return counts
+
+
+def contamination_section(sample, counts, remaining):
+    return {
+        "id": "my_pca_section",
+        "section_name": "Contamination Filtering",
+        "description": "This plot shows the amount of reads filtered by contaminant type.",
+        "plot_type": "bargraph",
+        "pconfig": {
+            "id": "contamination_filter_plot",
+            "title": "Contamination Plot",
+            "ylab": "Number of reads",
+        },
+        "data": {sample: {**counts, "remaining reads": remaining}},
+    }
+
+
+def length_section(sample, lengths):
+    return {
+        "id": "contamination_filtered_read_length",
+        "section_name": "Read length after contamination filtering",
+        "description": "Length distribution of the reads left after contamination filtering.",
+        "plot_type": "linegraph",
+        "pconfig": {
+            "id": "contamination_filtered_read_length_plot",
+            "title": "Read length after contamination filtering",
+            "xlab": "Read length (nt)",
+            "ylab": "Number of reads",
+            "xDecimals": False,
+        },
+        "data": {sample: {length: lengths[length] for length in sorted(lengths)}},
+    }
+
+
+def parse_args(argv=None):
+    """Define and immediately parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Count, length-profile and compress the reads left after contamination filtering.",
+        epilog="Example: python filter_stats.py --sample s1 --reads s1.fastq --stats filtered.s1_*.stats --threads 6",
+    )
+    parser.add_argument("--sample", required=True, help="Sample name used in the MultiQC sections and output files.")
+    parser.add_argument(
+        "--reads",
+        required=True,
+        type=Path,
+        help="FASTQ file with the reads left after filtering, optionally gzip compressed.",
+    )
+    parser.add_argument(
+        "--stats",
+        nargs="*",
+        default=[],
+        type=Path,
+        help="Per contaminant type stats files with lines of the form '\"<type>\": <count>'.",
+    )
+    parser.add_argument("--threads", type=int, default=1, help="Number of compression threads (default 1).")
+    parser.add_argument(
+        "-l",
+        "--log-level",
+        help="The desired log level (default WARNING).",
+        choices=("CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"),
+        default="WARNING",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Coordinate argument parsing and program execution."""
+    args = parse_args(argv)
+    logging.basicConfig(level=args.log_level, format="[%(levelname)s] %(message)s")
+    if not args.reads.is_file():
+        logger.error(f"The given input file {args.reads} was not found!")
+        return 2
+
+    remaining, lengths = count_and_compress(args.reads, f"{args.sample}.filtered.fastq.gz", args.threads)
+    counts = parse_stats(args.stats)
+    logger.info(f"{args.sample}: {remaining} reads remaining, filtered {counts}")
+
+    write_mqc_yaml(f"{args.sample}.contamination_mqc.yaml", contamination_section(args.sample, counts, remaining))
+    write_mqc_yaml(f"{args.sample}.filtered_length_mqc.yaml", length_section(args.sample, lengths))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+
+"""
+Merge mirtop GFF files of disjoint sample shards into one GFF.
+
+Every shard is sorted on its own, then all shards are combined with a
+streaming k-way merge. Records that are identical apart from their
+`Expression` attribute describe the same isomiR and are joined into a single
+record whose expression lists the samples of all shards, in shard order.
+Shards without the isomiR contribute zeros.
+"""
+
+import argparse
+import heapq
+import itertools
+import logging
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+logger = logging.getLogger()
+
+COLDATA = "## COLDATA:"
+EXPRESSION = "Expression="
+
+
+class Shard:
+    def __init__(self, index, path, tmpdir):
+        self.index = index
+        self.path = Path(path)
+        self.headers = []
+        self.samples = []
+        records = []
+        with self.path.open() as fh:
+            for line in fh:
+                line = line.rstrip("\n")
+                if line.startswith("#"):
+                    if line.startswith(COLDATA):
+                        self.samples = [s.strip() for s in line[len(COLDATA) :].split(",") if s.strip()]
+                    self.headers.append(line)
+                elif line:
+                    records.append(split_record(line))
+        records.sort(key=lambda r: r[0])
+        self.sorted_path = Path(tmpdir) / f"shard_{index}.gff"
+        with self.sorted_path.open("w") as fout:
+            for key, expression in records:
+                fout.write(f"{key_to_line(key)}\t{expression}\n")
+        logger.info(f"{self.path}: {len(self.samples)} samples, {len(records)} records")
+
+    def records(self):
+        """Yield (key, shard index, expression) tuples in key order."""
+        with self.sorted_path.open() as fh:
+            for line in fh:
+                line, expression = line.rstrip("\n").rsplit("\t", 1)
+                yield line_key(line), self.index, expression.split(",")
+
+
+def line_key(line):
+    # Sort on reference, start and the remaining text, with numeric start.
+    fields = line.split("\t", 4)
+    return (fields[0], int(fields[3]) if fields[3].isdigit() else 0, line)
+
+
+def key_to_line(key):
+    return key[2]
+
+
+def split_record(line):
+    """Split a GFF record into its key (the record without expression values) and the expression."""
+    fields = line.split("\t")
+    attributes = fields[8].split("; ") if len(fields) > 8 else []
+    expression = ""
+    for i, attribute in enumerate(attributes):
+        if attribute.startswith(EXPRESSION):
+            expression = attribute[len(EXPRESSION) :]
+            attributes[i] = EXPRESSION
+            break
+    else:
+        raise ValueError(f"Record without {EXPRESSION} attribute: {line}")
+    fields[8] = "; ".join(attributes)
+    return line_key("\t".join(fields)), expression
+
+
+def merge(shards, output):
+    headers = []
+    for line in shards[0].headers:
+        if line.startswith(COLDATA):
+            samples = [sample for shard in shards for sample in shard.samples]
+            line = f"{COLDATA} {','.join(samples)}"
+        headers.append(line)
+
+    zeros = [["0"] * len(shard.samples) for shard in shards]
+    merged = 0
+    with open(output, "w") as fout:
+        for line in headers:
+            fout.write(line + "\n")
+        stream = heapq.merge(*(shard.records() for shard in shards), key=lambda r: r[0])
+        for key, group in itertools.groupby(stream, key=lambda r: r[0]):
+            expression = [None] * len(shards)
+            for _, index, values in group:
+                if expression[index] is None:
+                    expression[index] = values
+                else:
+                    expression[index] = [str(int(a) + int(b)) for a, b in zip(expression[index], values)]
+            values = ",".join(
+                v for index, shard_values in enumerate(expression) for v in (shard_values or zeros[index])
+            )
+            fout.write(key_to_line(key).replace(EXPRESSION, EXPRESSION + values, 1) + "\n")
+            merged += 1
+    logger.info(f"Wrote {merged} records for {sum(len(s.samples) for s in shards)} samples to {output}")
+
+
+def parse_args(argv=None):
+    """Define and immediately parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Merge mirtop GFF files of disjoint sample shards.",
+        epilog="Example: python merge_mirtop_gff.py shard1/mirtop.gff shard2/mirtop.gff -o mirtop.gff",
+    )
+    parser.add_argument("gff", nargs="+", type=Path, help="mirtop GFF files, one per shard, in sample order.")
+    parser.add_argument("-o", "--output", required=True, type=Path, help="Merged GFF file.")
+    parser.add_argument(
+        "-l",
+        "--log-level",
+        help="The desired log level (default WARNING).",
+        choices=("CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"),
+        default="WARNING",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Coordinate argument parsing and program execution."""
+    args = parse_args(argv)
+    logging.basicConfig(level=args.log_level, format="[%(levelname)s] %(message)s")
+    tmpdir = tempfile.mkdtemp(dir=".")
+    try:
+        shards = [Shard(i, path, tmpdir) for i, path in enumerate(args.gff)]
+        merge(shards, args.output)
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+
+"""
+Merge the miRTrace results of batches of samples into one set of results.
+
+`mirtrace-results.json` gets the per-sample results of all batches.
+`mirtrace-stats-*.tsv` tables with one column per sample are joined
+column-wise on their first column, tables with one row per sample are
+concatenated. Per-sample FASTA directories are combined by linking their
+files, and the HTML report of every batch is kept with the batch number in
+its name, as miRTrace cannot rebuild it from its results.
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+from pathlib import Path
+
+logger = logging.getLogger()
+
+RESULTS = "mirtrace-results.json"
+STATS_GLOB = "mirtrace-stats-*.tsv"
+
+
+def merge_results(batches, output):
+    merged = None
+    for batch in batches:
+        with (batch / RESULTS).open() as fh:
+            results = json.load(fh)
+        if merged is None:
+            merged = results
+            continue
+        # Per-sample entries are lists, run-wide settings are the same in every batch.
+        for key, value in results.items():
+            if isinstance(value, list) and isinstance(merged.get(key), list):
+                merged[key].extend(value)
+    with output.open("w") as fout:
+        json.dump(merged, fout, indent=2)
+    return merged
+
+
+def first_sample(batch):
+    with (batch / RESULTS).open() as fh:
+        entries = json.load(fh).get("results") or [{}]
+    return str(entries[0].get("verbosename", ""))
+
+
+def read_table(path):
+    with path.open() as fh:
+        rows = [line.rstrip("\n").split("\t") for line in fh if line.strip()]
+    return rows[0], rows[1:]
+
+
+def merge_table(paths, samples, output):
+    tables = [read_table(path) for path in paths]
+    header, _ = tables[0]
+
+    if any(name in samples for name in header[1:]):
+        # One column per sample: join on the row label, keeping first seen order.
+        columns = [header[0]]
+        labels = []
+        cells = {}
+        for batch_header, batch_rows in tables:
+            offset = len(columns) - 1
+            columns.extend(batch_header[1:])
+            for row in batch_rows:
+                if row[0] not in cells:
+                    labels.append(row[0])
+                    cells[row[0]] = {}
+                for i, value in enumerate(row[1 : len(batch_header)]):
+                    cells[row[0]][offset + i] = value
+        rows = [[label, *(cells[label].get(i, "") for i in range(len(columns) - 1))] for label in labels]
+        header = columns
+    else:
+        rows = [row for _, batch_rows in tables for row in batch_rows]
+
+    with output.open("w") as fout:
+        for row in [header, *rows]:
+            fout.write("\t".join(row) + "\n")
+
+
+def link_tree(src, dest):
+    """Link every file below `src` into `dest`, resolving the staged symlinks."""
+    for path in src.rglob("*"):
+        target = dest / path.relative_to(src)
+        if path.is_dir():
+            target.mkdir(parents=True, exist_ok=True)
+        elif not target.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.symlink(path.resolve(), target)
+        else:
+            logger.warning(f"{target} exists in more than one batch, keeping the first")
+
+
+def merge(batches, output):
+    output.mkdir(parents=True, exist_ok=True)
+    results = merge_results(batches, output / RESULTS)
+    entries = [entry for entry in results.get("results", []) if isinstance(entry, dict)]
+    samples = {entry.get("verbosename") for entry in entries} | {entry.get("filename") for entry in entries}
+
+    names = sorted({path.name for batch in batches for path in batch.glob(STATS_GLOB)})
+    for name in names:
+        merge_table([batch / name for batch in batches if (batch / name).exists()], samples, output / name)
+
+    for index, batch in enumerate(batches, start=1):
+        for path in sorted(batch.iterdir()):
+            if path.name == RESULTS or path.name in names:
+                continue
+            if path.is_dir():
+                link_tree(path, output / path.name)
+            else:
+                target = output / f"{path.stem}.batch_{index}{path.suffix}"
+                shutil.copyfile(path, target)
+    logger.info(f"Merged {len(batches)} batches with {len(entries)} samples into {output}")
+
+
+def parse_args(argv=None):
+    """Define and immediately parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Merge miRTrace output directories of sample batches.",
+        epilog="Example: python merge_mirtrace.py batch_001/mirtrace batch_002/mirtrace -o mirtrace",
+    )
+    parser.add_argument("batches", nargs="+", type=Path, help="miRTrace output directories, one per batch.")
+    parser.add_argument("-o", "--output", required=True, type=Path, help="Merged output directory.")
+    parser.add_argument(
+        "-l",
+        "--log-level",
+        help="The desired log level (default WARNING).",
+        choices=("CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"),
+        default="WARNING",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Coordinate argument parsing and program execution."""
+    args = parse_args(argv)
+    logging.basicConfig(level=args.log_level, format="[%(levelname)s] %(message)s")
+    for batch in args.batches:
+        if not (batch / RESULTS).is_file():
+            logger.error(f"The given input file {batch / RESULTS} was not found!")
+            return 2
+    # Batches arrive in completion order, put their samples back in name order.
+    merge(sorted(args.batches, key=first_sample), args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+
+"""
+Find the records of a contamination database that BLAT could align to a miRNA hairpin.
+
+BLAT indexes the non-overlapping 11-mers (tiles) of its database, here the
+hairpins, and with its default DNA settings only reports alignments with at
+least two tile hits on one target and query strand. The tiles are indexed the
+same way, and the contamination database is streamed record by record. Records
+with two or more hits on a hairpin are written as candidates for BLAT, all
+others cannot have an alignment. Records of excluded Ensembl biotypes are
+dropped first, as before BLAT.
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+import numpy as np
+from fastx_io import open_binary
+from numpy.lib.stride_tricks import sliding_window_view
+
+logger = logging.getLogger()
+
+# BLAT's default tile size and minimum number of tile hits for DNA.
+TILE_SIZE = 11
+MIN_MATCH = 2
+
+BASE_CODES = np.full(256, 4, dtype=np.int16)
+for bases, code in ((b"Aa", 0), (b"Cc", 1), (b"Gg", 2), (b"TtUu", 3)):
+    BASE_CODES[list(bases)] = code
+
+
+def kmer_codes(seq, k=TILE_SIZE, step=1):
+    """2-bit codes of the k-mers of `seq` at every `step` positions, skipping those with ambiguous bases."""
+    if len(seq) < k:
+        return np.zeros(0, dtype=np.int64)
+    windows = sliding_window_view(BASE_CODES[np.frombuffer(seq, dtype=np.uint8)], k)[::step]
+    valid = (windows < 4).all(axis=1)
+    weights = 4 ** np.arange(k - 1, -1, -1, dtype=np.int64)
+    return windows[valid].astype(np.int64) @ weights
+
+
+def reverse_complement_codes(codes, k=TILE_SIZE):
+    rc = np.zeros_like(codes)
+    for _ in range(k):
+        rc = (rc << 2) | (3 - (codes & 3))
+        codes = codes >> 2
+    return rc
+
+
+def iter_fasta_records(path):
+    """Yield (header line, sequence lines) of every record, keeping lines as they are."""
+    header, lines = None, []
+    with open_binary(path) as fin:
+        for line in fin:
+            if line.startswith(b">"):
+                if header is not None:
+                    yield header, lines
+                header, lines = line, []
+            elif header is not None:
+                lines.append(line)
+    if header is not None:
+        yield header, lines
+
+
+class TileIndex:
+    """
+    The tiles of a set of sequences, as BLAT indexes its database. Every tile
+    is also stored reverse complemented, so matching the forward k-mers of a
+    query finds the hits of both query strands.
+    """
+
+    def __init__(self, k=TILE_SIZE):
+        self.k = k
+        self.codes = []
+        self.targets = []
+        self.count = 0
+
+    def add(self, seq):
+        tiles = kmer_codes(seq, self.k, step=self.k)
+        # Targets are a sequence and a query strand.
+        self.codes += [tiles, reverse_complement_codes(tiles, self.k)]
+        self.targets += [np.full(len(tiles), 2 * self.count), np.full(len(tiles), 2 * self.count + 1)]
+        self.count += 1
+
+    def add_fasta(self, path):
+        for _, lines in iter_fasta_records(path):
+            self.add(b"".join(line.strip() for line in lines))
+        self.build()
+        return self.count
+
+    def build(self):
+        codes = np.concatenate(self.codes) if self.codes else np.zeros(0, dtype=np.int64)
+        targets = np.concatenate(self.targets) if self.targets else np.zeros(0, dtype=np.int64)
+        order = np.argsort(codes, kind="stable")
+        self.sorted_codes = codes[order]
+        self.sorted_targets = targets[order]
+        # Most query k-mers hit nothing and are ruled out with a single lookup.
+        self.bitmap = np.zeros(4**self.k, dtype=bool)
+        self.bitmap[codes] = True
+        self.codes, self.targets = [], []
+
+    def max_hits(self, seq):
+        """The most tile hits of `seq` on any one target."""
+        codes = kmer_codes(seq, self.k)
+        codes = codes[self.bitmap[codes]]
+        if not len(codes):
+            return 0
+        left = np.searchsorted(self.sorted_codes, codes, side="left")
+        right = np.searchsorted(self.sorted_codes, codes, side="right")
+        lengths = right - left
+        # Every (query position, tile) pair is a hit.
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        targets = self.sorted_targets[np.repeat(left, lengths) + offsets]
+        return int(np.bincount(targets).max())
+
+
+def excluded(header, biotypes):
+    """Like `index($6, "transcript_biotype:<biotype>")` in awk on the header line."""
+    fields = header.split()
+    return len(fields) >= 6 and any(b"transcript_biotype:" + biotype in fields[5] for biotype in biotypes)
+
+
+def screen(index, contaminants, candidates, subset=None, biotypes=(), min_match=MIN_MATCH):
+    stats = {"records": 0, "excluded": 0, "candidates": 0}
+    with open(candidates, "wb", buffering=1 << 20) as fcand:
+        fsubset = open(subset, "wb", buffering=1 << 20) if subset else None
+        try:
+            for header, lines in iter_fasta_records(contaminants):
+                stats["records"] += 1
+                if biotypes and excluded(header, biotypes):
+                    stats["excluded"] += 1
+                    continue
+                if fsubset is not None:
+                    fsubset.write(header)
+                    fsubset.writelines(lines)
+                if index.max_hits(b"".join(line.strip() for line in lines)) >= min_match:
+                    stats["candidates"] += 1
+                    fcand.write(header)
+                    fcand.writelines(lines)
+        finally:
+            if fsubset is not None:
+                fsubset.close()
+    return stats
+
+
+def parse_args(argv=None):
+    """Define and immediately parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Select the contamination database records BLAT could align to a miRNA hairpin.",
+        epilog=(
+            "Example: python mirna_kmer_screen.py --mirna hairpin.fa --contaminants cdna.fa "
+            "--exclude-biotype miRNA --subset subset.fa --candidates candidates.fa"
+        ),
+    )
+    parser.add_argument("--mirna", required=True, type=Path, help="FASTA file of miRNA hairpins.")
+    parser.add_argument("--contaminants", required=True, type=Path, help="FASTA file of the contamination database.")
+    parser.add_argument(
+        "--candidates",
+        required=True,
+        type=Path,
+        help="Output FASTA file of the records that may align to a hairpin.",
+    )
+    parser.add_argument(
+        "--subset",
+        type=Path,
+        help="Output FASTA file of all records not of an excluded biotype.",
+    )
+    parser.add_argument(
+        "--exclude-biotype",
+        action="append",
+        default=[],
+        help="Drop records with this Ensembl transcript biotype in the sixth header field, may be repeated.",
+    )
+    parser.add_argument(
+        "-l",
+        "--log-level",
+        help="The desired log level (default WARNING).",
+        choices=("CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"),
+        default="WARNING",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Coordinate argument parsing and program execution."""
+    args = parse_args(argv)
+    logging.basicConfig(level=args.log_level, format="[%(levelname)s] %(message)s")
+    for path in (args.mirna, args.contaminants):
+        if not path.is_file():
+            logger.error(f"The given input file {path} was not found!")
+            return 2
+
+    index = TileIndex()
+    hairpins = index.add_fasta(args.mirna)
+    biotypes = [biotype.encode() for biotype in args.exclude_biotype]
+    stats = screen(index, args.contaminants, args.candidates, args.subset, biotypes)
+    logger.info(
+        f"{args.contaminants}: {stats['candidates']} of {stats['records'] - stats['excluded']} records have "
+        f"{MIN_MATCH} or more tile hits on one of {hairpins} hairpins, {stats['excluded']} excluded by biotype"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+
+"""Prepare miRBase / MirGeneDB FASTA files for indexing in a single streaming pass."""
+
+import argparse
+import logging
+import re
+import sys
+from pathlib import Path
+
+from fastx_io import open_text
+
+logger = logging.getLogger()
+
+# Longest HTML token we replace is 4 characters, so at most 3 characters of a
+# token can be left dangling at the end of a chunk.
+HTML_TOKENS = [("&gt;", ">"), ("<br>", "\n"), ("</p>", ""), ("<p>", "")]
+TOKEN_OVERHANG = 3
+CHUNK_SIZE = 1 << 20
+
+NON_NUCLEOTIDE = re.compile(r"[^AUGCaugc]")
+RNA_TO_DNA = str.maketrans("Uu", "Tt")
+
+
+def logical_lines(handle):
+    """
+    Yield the lines of a FASTA file that may have been saved from the miRBase
+    HTML view, where records are separated by ``<br>`` and wrapped in ``<p>``.
+
+    The input is read in fixed size chunks so memory does not depend on how
+    the file is split into physical lines.
+    """
+    carry = ""
+    partial = ""
+    while True:
+        chunk = handle.read(CHUNK_SIZE)
+        buf = carry + chunk
+        if not chunk:
+            cut = len(buf)
+        else:
+            # Keep back a possibly incomplete token. Tokens only contain '<'
+            # or '&' as their first character.
+            cut = len(buf)
+            for i in range(max(0, len(buf) - TOKEN_OVERHANG), len(buf)):
+                if buf[i] in "<&":
+                    cut = i
+                    break
+        text, carry = buf[:cut], buf[cut:]
+        for token, replacement in HTML_TOKENS:
+            text = text.replace(token, replacement)
+
+        lines = (partial + text).split("\n")
+        partial = lines.pop()
+        yield from lines
+
+        if not chunk:
+            break
+    if partial:
+        yield partial
+
+
+def parse_records(handle):
+    """Yield (header, sequence) tuples with headers truncated at the first whitespace."""
+    header = None
+    seq = []
+    for line in logical_lines(handle):
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith(">"):
+            if header is not None:
+                yield header, "".join(seq)
+            header = line[1:].split(None, 1)[0] if len(line) > 1 else ""
+            seq = []
+        elif header is not None:
+            seq.append(line)
+    if header is not None:
+        yield header, "".join(seq)
+
+
+def species_filter(species):
+    """Build a matcher equivalent to ``seqkit grep -r --pattern '.*<species>-.*'`` for each species."""
+    pattern = re.compile("(?:{})-".format("|".join(species)))
+    return lambda header: pattern.search(header) is not None
+
+
+def clean_fasta(input_path, output_path, keep):
+    """Clean, filter, convert to DNA and unwrap a single FASTA file."""
+    kept = total = 0
+    with open_text(input_path) as fin, open(output_path, "w") as fout:
+        for header, seq in parse_records(fin):
+            total += 1
+            if not keep(header):
+                continue
+            kept += 1
+            seq = NON_NUCLEOTIDE.sub("N", seq).translate(RNA_TO_DNA)
+            fout.write(f">{header}\n{seq}\n")
+    logger.info("%s: kept %d of %d records in %s", input_path, kept, total, output_path)
+    return kept
+
+
+def parse_args(argv=None):
+    """Define and immediately parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Clean miRBase / MirGeneDB FASTA files, keep the requested species, convert to DNA and unwrap.",
+        epilog="Example: python parse_mirna_fasta.py --species hsa -i mature.fa -o mature_idx.fa -i hairpin.fa -o hairpin_idx.fa",
+    )
+    parser.add_argument(
+        "-s",
+        "--species",
+        nargs="+",
+        required=True,
+        help="Species prefix(es) to keep, e.g. 'hsa'. Records are kept if their name contains '<species>-'.",
+    )
+    parser.add_argument(
+        "-i",
+        "--input",
+        action="append",
+        required=True,
+        type=Path,
+        help="Input FASTA file, optionally gzip compressed. Can be given several times.",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        action="append",
+        required=True,
+        type=Path,
+        help="Output FASTA file, one for every --input in the same order.",
+    )
+    parser.add_argument(
+        "-l",
+        "--log-level",
+        help="The desired log level (default WARNING).",
+        choices=("CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"),
+        default="WARNING",
+    )
+    args = parser.parse_args(argv)
+    if len(args.input) != len(args.output):
+        parser.error("--input and --output must be given the same number of times.")
+    return args
+
+
+def main(argv=None):
+    """Coordinate argument parsing and program execution."""
+    args = parse_args(argv)
+    logging.basicConfig(level=args.log_level, format="[%(levelname)s] %(message)s")
+    keep = species_filter(args.species)
+    for input_path, output_path in zip(args.input, args.output):
+        if not input_path.is_file():
+            logger.error(f"The given input file {input_path} was not found!")
+            return 2
+        clean_fasta(input_path, output_path, keep)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
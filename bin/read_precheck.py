@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+"""
+Decide in a single streaming pass whether a trimmed sample is worth mapping.
+
+Reads are counted in full, distinct sequences only up to the required
+number, so memory stays bounded for any library size. The verdict is printed
+as `pass` or `fail` and written, together with its reasons, as a row of a
+MultiQC table.
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+from fastx_io import iter_fastq, open_binary, write_mqc_yaml
+
+logger = logging.getLogger()
+
+
+def precheck(paths, min_reads, min_distinct):
+    reads = 0
+    distinct = set()
+    for path in paths:
+        with open_binary(path) as fin:
+            for _, seq, _ in iter_fastq(fin):
+                reads += 1
+                if len(distinct) < min_distinct:
+                    distinct.add(seq.upper())
+
+    reasons = []
+    if reads < min_reads:
+        reasons.append(f"{reads} reads < {min_reads}")
+    if len(distinct) < min_distinct:
+        reasons.append(f"{len(distinct)} distinct sequences < {min_distinct}")
+    return {
+        "reads": reads,
+        # Counting stops at the threshold, so passing samples report it as a lower bound.
+        "distinct_sequences": len(distinct),
+        "status": "fail" if reasons else "pass",
+        "reason": "; ".join(reasons),
+    }
+
+
+def section(sample, result):
+    """MultiQC custom content table, merged over all samples by its id."""
+    return {
+        "id": "read_precheck",
+        "section_name": "Read precheck",
+        "description": (
+            "Trimmed reads and distinct sequences of every sample. Failing samples are reported here "
+            "and in the read QC sections, but not mapped or quantified."
+        ),
+        "plot_type": "table",
+        "pconfig": {"id": "read_precheck_table", "namespace": "Read precheck"},
+        "data": {sample: result},
+    }
+
+
+def parse_args(argv=None):
+    """Define and immediately parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Check the read count and sequence complexity of a trimmed sample.",
+        epilog="Example: python read_precheck.py --sample s1 --min-reads 1000 --min-distinct 100 s1.fastq.gz",
+    )
+    parser.add_argument("reads", nargs="+", type=Path, help="FASTQ files of the sample, optionally gzip compressed.")
+    parser.add_argument("--sample", required=True, help="Sample name used in the MultiQC table and output file.")
+    parser.add_argument("--min-reads", type=int, default=0, help="Fail samples with fewer reads (default 0).")
+    parser.add_argument(
+        "--min-distinct",
+        type=int,
+        default=0,
+        help="Fail samples with fewer distinct read sequences (default 0).",
+    )
+    parser.add_argument(
+        "-l",
+        "--log-level",
+        help="The desired log level (default WARNING).",
+        choices=("CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"),
+        default="WARNING",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Coordinate argument parsing and program execution."""
+    args = parse_args(argv)
+    logging.basicConfig(level=args.log_level, format="[%(levelname)s] %(message)s")
+    for path in args.reads:
+        if not path.is_file():
+            logger.error(f"The given input file {path} was not found!")
+            return 2
+
+    result = precheck(args.reads, args.min_reads, args.min_distinct)
+    write_mqc_yaml(f"{args.sample}.precheck_mqc.yaml", section(args.sample, result))
+    if result["status"] == "fail":
+        logger.warning(f"{args.sample} fails the precheck: {result['reason']}")
+    else:
+        logger.info(f"{args.sample} passes the precheck with {result['reads']} reads")
+    print(result["status"])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,419 @@
+#!/usr/bin/env python
+
+"""
+Deduplicate UMI reads, extract their UMIs and filter them by length in one pass.
+
+Every read is split into its insert and UMI with a UMI-tools `string` or
+`regex` barcode pattern, clipped and length filtered like `fastp`, and counted
+by insert and UMI. The UMIs of every insert are then grouped with one of the
+UMI-tools methods, UMIs one mismatch apart being neighbours, and one read per
+group is written: the first read with the group's most abundant UMI. Once
+more than `--max-keys` insert and UMI pairs are held, reads are spilled to
+temporary partitions by insert, so memory stays bounded for any library.
+"""
+
+import argparse
+import logging
+import sys
+import tempfile
+import zlib
+from collections import deque
+from pathlib import Path
+
+from fastx_io import ParallelGzipWriter, iter_fastq, open_binary, write_mqc_yaml
+
+try:
+    # Needed for fuzzy matching like `{s<=2}`, as used by UMI-tools.
+    import regex as re
+
+    HAS_FUZZY = True
+except ImportError:
+    import re
+
+    HAS_FUZZY = False
+
+logger = logging.getLogger()
+
+METHODS = {
+    "unique": "unique",
+    "cc": "cluster",
+    "cluster": "cluster",
+    "adj": "adjacency",
+    "adjacency": "adjacency",
+    "dir": "directional",
+    "directional": "directional",
+}
+MATCH_CACHE_SIZE = 1_000_000
+# Below this many UMIs, comparing all pairs is cheaper than masking every position.
+PAIRWISE_MAX_UMIS = 32
+
+
+class UmiExtractor:
+    """Split reads into insert and UMI the way `umi_tools extract` does for read 1."""
+
+    def __init__(self, method, pattern):
+        self.method = method
+        if method == "string":
+            if not pattern or set(pattern) - set("NXC"):
+                raise ValueError(f"String barcode patterns consist of N, X and C, not {pattern!r}")
+            self.pattern = pattern.encode()
+            self.umi_positions = [i for i, c in enumerate(pattern) if c == "N"]
+            self.keep_positions = [i for i, c in enumerate(pattern) if c == "X"]
+        elif method == "regex":
+            if not HAS_FUZZY and re.search(r"\{[^}]*[eisd]\s*<?=", pattern):
+                raise ValueError(f"Fuzzy matching in {pattern!r} needs the regex module")
+            self.regex = re.compile(pattern.encode())
+            self.cache = {}
+            groups = sorted(self.regex.groupindex)
+            self.umi_groups = [name for name in groups if name.startswith("umi_")]
+            self.removed_groups = [name for name in groups if name.startswith(("umi_", "cell_", "discard_"))]
+            if not self.umi_groups:
+                raise ValueError(f"Regex barcode pattern {pattern!r} has no umi_ group")
+        else:
+            raise ValueError(f"Unknown extract method {method}")
+
+    def extract(self, seq, qual):
+        """Return (insert, insert quality, UMI), or None if the read does not match the pattern."""
+        if self.method == "string":
+            length = len(self.pattern)
+            if len(seq) < length:
+                return None
+            umi = bytes(seq[i] for i in self.umi_positions)
+            kept = bytes(seq[i] for i in self.keep_positions)
+            kept_qual = bytes(qual[i] for i in self.keep_positions)
+            return kept + seq[length:], kept_qual + qual[length:], umi
+
+        # Duplicates are the norm in UMI libraries, so matches are cached by sequence.
+        cached = self.cache.get(seq, False)
+        if cached is False:
+            cached = self._match(seq)
+            if len(self.cache) >= MATCH_CACHE_SIZE:
+                self.cache.clear()
+            self.cache[seq] = cached
+        if cached is None:
+            return None
+        kept, umi = cached
+        return (
+            b"".join(seq[start:end] for start, end in kept),
+            b"".join(qual[start:end] for start, end in kept),
+            umi,
+        )
+
+    def _match(self, seq):
+        """The (start, end) spans of the read to keep and the UMI, or None."""
+        match = self.regex.match(seq)
+        if match is None:
+            return None
+        umi = b"".join(match.group(name) or b"" for name in self.umi_groups)
+        spans = sorted(span for span in map(match.span, self.removed_groups) if span[0] != -1)
+        kept, last = [], 0
+        for start, end in spans:
+            if start > last:
+                kept.append((last, start))
+            last = max(last, end)
+        kept.append((last, len(seq)))
+        return tuple(kept), umi
+
+
+def neighbours(umis):
+    """UMIs of equal length that differ in exactly one position, for every UMI."""
+    edges = {umi: [] for umi in umis}
+    if len(umis) <= PAIRWISE_MAX_UMIS:
+        for i, a in enumerate(umis):
+            for b in umis[i + 1 :]:
+                if len(a) == len(b) and sum(x != y for x, y in zip(a, b)) == 1:
+                    edges[a].append(b)
+                    edges[b].append(a)
+        return edges
+    # Distinct UMIs that are equal once position i is masked differ exactly there.
+    by_length = {}
+    for umi in umis:
+        by_length.setdefault(len(umi), []).append(umi)
+    for length, same_length in by_length.items():
+        for i in range(length):
+            buckets = {}
+            for umi in same_length:
+                buckets.setdefault(umi[:i] + umi[i + 1 :], []).append(umi)
+            for bucket in buckets.values():
+                for a in bucket:
+                    if len(bucket) > 1:
+                        edges[a].extend(b for b in bucket if b != a)
+    return edges
+
+
+def group_umis(counts, method):
+    """
+    Group the UMIs of one insert, returning (representative, group size in reads)
+    pairs. Representatives are the most abundant UMI of their group, as in
+    UMI-tools, and ties are broken by sequence so results are reproducible.
+    """
+    ranked = sorted(counts, key=lambda umi: (-counts[umi], umi))
+    if method == "unique" or len(ranked) == 1:
+        return [(umi, counts[umi]) for umi in ranked]
+
+    edges = neighbours(ranked)
+    assigned = set()
+    groups = []
+
+    if method == "directional":
+        # Reads of `b` are errors of `a` if `a` has at least twice as many minus one.
+        for umi in ranked:
+            if umi in assigned:
+                continue
+            assigned.add(umi)
+            size = 0
+            queue = deque([umi])
+            while queue:
+                node = queue.popleft()
+                size += counts[node]
+                for other in edges[node]:
+                    if other not in assigned and counts[node] >= 2 * counts[other] - 1:
+                        assigned.add(other)
+                        queue.append(other)
+            groups.append((umi, size))
+        return groups
+
+    for umi in ranked:
+        if umi in assigned:
+            continue
+        component = []
+        queue = deque([umi])
+        assigned.add(umi)
+        while queue:
+            node = queue.popleft()
+            component.append(node)
+            for other in edges[node]:
+                if other not in assigned:
+                    assigned.add(other)
+                    queue.append(other)
+
+        if method == "cluster":
+            groups.append((umi, sum(counts[node] for node in component)))
+            continue
+
+        # Adjacency: the fewest most abundant UMIs that, with their neighbours,
+        # cover the component lead groups of themselves and their neighbours not
+        # yet taken, as in UMI-tools' _group_adjacency. All leads are marked
+        # first, so a lead next to an earlier one still keeps its own group.
+        component.sort(key=lambda node: (-counts[node], node))
+        size = len(component)
+        covered = set()
+        for n, node in enumerate(component, start=1):
+            covered.add(node)
+            covered.update(edges[node])
+            if len(covered) == size:
+                break
+        leads = component[:n]
+        observed = set(leads)
+        for lead in leads:
+            members = [lead, *(other for other in edges[lead] if other not in observed)]
+            observed.update(members)
+            groups.append((lead, sum(counts[member] for member in members)))
+    return groups
+
+
+class UmiCounter:
+    """
+    Reads counted by insert and UMI, with the name and quality of the first read
+    of every pair. Beyond `max_keys` pairs, everything is moved to on-disk
+    partitions by insert, which are grouped one at a time.
+    """
+
+    def __init__(self, max_keys, tmpdir, partitions=64):
+        self.max_keys = max_keys
+        self.tmpdir = Path(tmpdir)
+        self.partitions = partitions
+        self.inserts = {}
+        self.keys = 0
+        self.spill = None
+
+    def add(self, insert, umi, name, qual):
+        if self.spill is not None:
+            self._write(insert, umi, 1, name, qual)
+            return
+        umis = self.inserts.get(insert)
+        if umis is None:
+            umis = self.inserts[insert] = {}
+        entry = umis.get(umi)
+        if entry is None:
+            umis[umi] = [1, name, qual]
+            self.keys += 1
+            if self.keys > self.max_keys:
+                self._start_spill()
+        else:
+            entry[0] += 1
+
+    def _write(self, insert, umi, count, name, qual):
+        handle = self.spill[zlib.crc32(insert) % self.partitions]
+        handle.write(b"%s\t%s\t%d\t%s\t%s\n" % (insert, umi, count, name, qual))
+
+    def _start_spill(self):
+        logger.info(f"More than {self.max_keys} insert and UMI pairs, spilling to {self.partitions} partitions")
+        self.spill = [
+            (self.tmpdir / f"partition_{i:03d}.tsv").open("wb", buffering=1 << 20) for i in range(self.partitions)
+        ]
+        for insert, umis in self.inserts.items():
+            for umi, (count, name, qual) in umis.items():
+                self._write(insert, umi, count, name, qual)
+        self.inserts = {}
+
+    def _partition(self, path):
+        inserts = {}
+        with path.open("rb") as fin:
+            for line in fin:
+                insert, umi, count, name, qual = line.rstrip(b"\n").split(b"\t")
+                umis = inserts.setdefault(insert, {})
+                entry = umis.get(umi)
+                if entry is None:
+                    umis[umi] = [int(count), name, qual]
+                else:
+                    entry[0] += int(count)
+        path.unlink()
+        return inserts
+
+    def groups(self):
+        """Yield the inserts with their UMIs, one partition at a time once spilled."""
+        if self.spill is None:
+            yield from self.inserts.items()
+            return
+        for handle in self.spill:
+            handle.close()
+        for handle in self.spill:
+            yield from self._partition(Path(handle.name)).items()
+
+
+def clip(seq, qual, clip_5p, clip_3p, max_length):
+    """Trim like `fastp --trim_front1 --trim_tail1 --max_len1`."""
+    end = len(seq) - clip_3p
+    if max_length and end - clip_5p > max_length:
+        end = clip_5p + max_length
+    return seq[clip_5p:end], qual[clip_5p:end]
+
+
+def umi_collapse_extract(paths, output, extractor, method, args, tmpdir):
+    stats = {"reads_in": 0, "umi_unmatched": 0, "length_filtered": 0, "reads_grouped": 0, "reads_out": 0}
+    counter = UmiCounter(args.max_keys, tmpdir)
+    for path in paths:
+        with open_binary(path) as fin:
+            for name, seq, qual in iter_fastq(fin):
+                stats["reads_in"] += 1
+                extracted = extractor.extract(seq, qual)
+                if extracted is None:
+                    stats["umi_unmatched"] += 1
+                    continue
+                insert, insert_qual, umi = extracted
+                # Reads are grouped on the insert before clipping, but clipping
+                # only depends on it, so filtering now saves the memory.
+                clipped_length = len(clip(insert, insert_qual, args.clip_5p, args.clip_3p, args.max_length)[0])
+                if clipped_length < args.min_length:
+                    stats["length_filtered"] += 1
+                    continue
+                stats["reads_grouped"] += 1
+                counter.add(insert, umi, name.split()[0], insert_qual)
+
+    with ParallelGzipWriter(output, threads=args.threads) as fout:
+        for insert, umis in counter.groups():
+            counts = {umi: entry[0] for umi, entry in umis.items()}
+            for umi, _ in group_umis(counts, method):
+                _, name, qual = umis[umi]
+                seq, qual = clip(insert, qual, args.clip_5p, args.clip_3p, args.max_length)
+                fout.write(b"@%s_%s\n%s\n+\n%s\n" % (name, umi, seq, qual))
+                stats["reads_out"] += 1
+
+    grouped = stats["reads_grouped"]
+    stats["duplication_percent"] = round(100 * (1 - stats["reads_out"] / grouped), 2) if grouped else 0.0
+    return stats
+
+
+def section(sample, stats):
+    """MultiQC custom content table, merged over all samples by its id."""
+    return {
+        "id": "umi_dedup",
+        "section_name": "UMI deduplication",
+        "description": (
+            "Reads before UMI deduplication, reads without a UMI matching the barcode pattern, reads outside "
+            "the length limits after clipping, reads grouped by insert and UMI, and deduplicated reads written."
+        ),
+        "plot_type": "table",
+        "pconfig": {"id": "umi_dedup_table", "namespace": "UMI deduplication"},
+        "data": {sample: stats},
+    }
+
+
+def parse_args(argv=None):
+    """Define and immediately parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Deduplicate reads by insert and UMI, extract the UMI and filter reads by length in one pass.",
+        epilog=(
+            "Example: python umi_collapse_extract.py --sample s1 --extract-method regex "
+            "--bc-pattern '.+(?P<discard_1>AACTGTAGGCACCATCAAT){s<=2}(?P<umi_1>.{12})(?P<discard_2>.*)' "
+            "--min-length 17 -o s1.umi_dedup.fastq.gz s1.fastp.fastq.gz"
+        ),
+    )
+    parser.add_argument(
+        "reads", nargs="+", type=Path, help="Trimmed FASTQ files of the sample, optionally gzip compressed."
+    )
+    parser.add_argument("-o", "--output", required=True, type=Path, help="Gzip compressed deduplicated FASTQ file.")
+    parser.add_argument("--sample", required=True, help="Sample name used in the MultiQC table.")
+    parser.add_argument(
+        "--extract-method",
+        choices=("string", "regex"),
+        default="string",
+        help="UMI-tools barcode pattern type (default string).",
+    )
+    parser.add_argument("--bc-pattern", required=True, help="UMI-tools barcode pattern.")
+    parser.add_argument(
+        "--method",
+        choices=sorted(METHODS),
+        default="dir",
+        help="UMI-tools grouping method (default dir).",
+    )
+    parser.add_argument("--clip-5p", type=int, default=0, help="Bases to clip from the 5' end of inserts (default 0).")
+    parser.add_argument("--clip-3p", type=int, default=0, help="Bases to clip from the 3' end of inserts (default 0).")
+    parser.add_argument("--min-length", type=int, default=0, help="Drop shorter inserts after clipping (default 0).")
+    parser.add_argument(
+        "--max-length",
+        type=int,
+        default=0,
+        help="Trim longer inserts to this length after clipping, 0 for no limit (default 0).",
+    )
+    parser.add_argument(
+        "--max-keys",
+        type=int,
+        default=20_000_000,
+        help="Insert and UMI pairs held in memory before spilling to disk (default 20000000).",
+    )
+    parser.add_argument("--threads", type=int, default=1, help="Number of compression threads (default 1).")
+    parser.add_argument(
+        "-l",
+        "--log-level",
+        help="The desired log level (default WARNING).",
+        choices=("CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"),
+        default="WARNING",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Coordinate argument parsing and program execution."""
+    args = parse_args(argv)
+    logging.basicConfig(level=args.log_level, format="[%(levelname)s] %(message)s")
+    for path in args.reads:
+        if not path.is_file():
+            logger.error(f"The given input file {path} was not found!")
+            return 2
+    try:
+        extractor = UmiExtractor(args.extract_method, args.bc_pattern)
+    except (ValueError, re.error) as e:
+        logger.error(str(e))
+        return 2
+
+    with tempfile.TemporaryDirectory(dir=".") as tmpdir:
+        stats = umi_collapse_extract(args.reads, args.output, extractor, METHODS[args.method], args, tmpdir)
+    write_mqc_yaml(f"{args.sample}.umi_dedup_mqc.yaml", section(args.sample, stats))
+    logger.info(f"{args.sample}: {stats}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -86,6 +86,12 @@ generated_parameters = {
         section_title=None,
         description='If this option is specified, intermediate FastQ and BAM files produced by UMI-tools are also saved in the results directory.',
     ),
+    'umi_single_pass': NextflowParameter(
+        type=typing.Optional[bool],
+        default=None,
+        section_title=None,
+        description='Deduplicate, extract UMIs and filter by length in one streaming pass per sample.',
+    ),
     'genome': NextflowParameter(
         type=typing.Optional[str],
         default=None,
@@ -176,6 +182,18 @@ generated_parameters = {
         section_title=None,
         description='Save aligned reads of miRNA quant subworkflow in bam format.',
     ),
+    'mirtop_shard_size': NextflowParameter(
+        type=typing.Optional[int],
+        default=None,
+        section_title=None,
+        description='Run mirtop on shards of this many samples in parallel and merge the results.',
+    ),
+    'mirtrace_batch_size': NextflowParameter(
+        type=typing.Optional[int],
+        default=None,
+        section_title=None,
+        description='Run miRTrace on batches of this many samples in parallel and merge the results.',
+    ),
     'clip_r1': NextflowParameter(
         type=typing.Optional[int],
         default=None,
@@ -230,6 +248,18 @@ generated_parameters = {
         section_title=None,
         description='Minimum number of reads required in input file to use it',
     ),
+    'precheck_min_reads': NextflowParameter(
+        type=typing.Optional[int],
+        default=0,
+        section_title=None,
+        description='Minimum number of trimmed reads for a sample to be mapped and quantified. Samples below it are only reported in MultiQC. 0 turns the check off.',
+    ),
+    'precheck_min_distinct': NextflowParameter(
+        type=typing.Optional[int],
+        default=0,
+        section_title=None,
+        description='Minimum number of distinct trimmed read sequences for a sample to be mapped and quantified. 0 turns the check off.',
+    ),
     'save_merged': NextflowParameter(
         type=typing.Optional[bool],
         default=True,
@@ -284,12 +314,24 @@ generated_parameters = {
         section_title=None,
         description='Path to an additional fasta file to be used as contamination database.',
     ),
+    'contaminant_single_pass': NextflowParameter(
+        type=typing.Optional[bool],
+        default=None,
+        section_title=None,
+        description='Align reads once against a combined index of all contamination databases.',
+    ),
     'skip_fastqc': NextflowParameter(
         type=typing.Optional[bool],
         default=None,
         section_title='Skipping pipeline steps',
         description='Skip FastQC',
     ),
+    'read_qc': NextflowParameter(
+        type=typing.Optional[str],
+        default='fastqc',
+        section_title=None,
+        description="Tool for the QC of raw and trimmed reads. Either 'fastqc' (default) or 'profile' for a lightweight profiler of quality, read length, abundant sequences and adapter dimers. Both are turned off by skip_fastqc.",
+    ),
     'skip_mirdeep': NextflowParameter(
         type=typing.Optional[bool],
         default=None,
@@ -314,5 +356,47 @@ generated_parameters = {
         section_title='Generic options',
         description='Custom MultiQC yaml file containing HTML including a methods description.',
     ),
+    'reference_cache': NextflowParameter(
+        type=typing.Optional[LatchDir],
+        default=None,
+        section_title='Reference cache',
+        description='Directory holding prebuilt miRNA, genome and contaminant indices shared across executions. References found here are reused, newly built ones are added.',
+    ),
+    'reference_cache_max_gib': NextflowParameter(
+        type=typing.Optional[int],
+        default=200,
+        section_title=None,
+        description='Size budget of the reference cache in GiB. Least recently used entries are evicted beyond it.',
+    ),
+    'resource_history': NextflowParameter(
+        type=typing.Optional[LatchDir],
+        default=None,
+        section_title='Resource sizing',
+        description='Directory holding traces of earlier executions. Process CPU and memory requests and the shared volume size are fitted against them, and this run is added.',
+    ),
+    'resume_store': NextflowParameter(
+        type=typing.Optional[LatchDir],
+        default=None,
+        section_title='Resume',
+        description='Directory keeping the Nextflow cache and task work directories of earlier executions. A rerun with the same pipeline version and parameters resumes from them instead of starting over.',
+    ),
+    'resume_store_max_gib': NextflowParameter(
+        type=typing.Optional[int],
+        default=500,
+        section_title=None,
+        description='Size budget of the resume store in GiB. Least recently used entries are evicted beyond it, and entries unused for 30 days are dropped.',
+    ),
+    'batch_inputs': NextflowParameter(
+        type=typing.Optional[typing.List[LatchFile]],
+        default=None,
+        section_title='Batching',
+        description='Further samplesheets to run in the same execution as `input`. References are built once, and the results are split back into one output directory per samplesheet.',
+    ),
+    'batch_outdirs': NextflowParameter(
+        type=typing.Optional[typing.List[LatchDir]],
+        default=None,
+        section_title=None,
+        description='Output directories of the batches, in the order of `input` followed by `batch_inputs`. Batches without one are saved below `outdir`, named after their samplesheet.',
+    ),
 }
 
@@ -1,5 +1,5 @@
 process BLAT_MIRNA {
-    tag "$fasta"
+    tag "$subset"
     label 'process_medium'
 
     conda 'bioconda::blat=36'
@@ -10,7 +10,7 @@ process BLAT_MIRNA {
     input:
     val db_type
     path mirna
-    path contaminants
+    tuple path(subset), path(candidates)
 
 
     output:
@@ -21,42 +21,20 @@ process BLAT_MIRNA {
     task.ext.when == null || task.ext.when
 
     script:
-    if ( db_type == "cdna" )
-        """
-        echo $db_type
-        awk '/^>/ { x=index(\$6, "transcript_biotype:miRNA") } { if(!x) print }' $contaminants > subset.fa
-        blat -out=blast8 $mirna subset.fa /dev/stdout | awk 'BEGIN{FS="\t"}{if(\$11 < 1e-5)print \$1;}' | uniq > mirnahit.txt
-        awk 'BEGIN { while((getline<"mirnahit.txt")>0) l[">"\$1]=1 } /^>/ {x = l[\$1]} {if(!x) print }' subset.fa  > filtered.fa
-
-        cat <<-END_VERSIONS > versions.yml
-        "${task.process}":
-            blat: \$(echo \$(blat) | grep Standalone | awk '{ if (match(\$0,/[0-9]*[0-9]/,m)) print m[0] }')
-        END_VERSIONS
-        """
-
-    else if ( db_type == "ncrna" )
-        """
-        echo $db_type
-        awk '/^>/ { x=(index(\$6, "transcript_biotype:rRNA") || index(\$6, "transcript_biotype:miRNA")) } { if(!x) print }' $contaminants > subset.fa
-        blat -out=blast8 $mirna subset.fa /dev/stdout | awk 'BEGIN{FS="\t"}{if(\$11 < 1e-5)print \$1;}' | uniq > mirnahit.txt
-        awk 'BEGIN { while((getline<"mirnahit.txt")>0) l[">"\$1]=1 } /^>/ {x = l[\$1]} {if(!x) print }' subset.fa  > filtered.fa
-
-        cat <<-END_VERSIONS > versions.yml
-        "${task.process}":
-            blat: \$(echo \$(blat) | grep Standalone | awk '{ if (match(\$0,/[0-9]*[0-9]/,m)) print m[0] }')
-        END_VERSIONS
-        """
-
+    // Only the candidates of MIRNA_KMER_SCREEN can have a hit, the rest of the subset is kept as is
+    """
+    echo $db_type
+    if [ -s $candidates ]; then
+        blat -out=blast8 $mirna $candidates /dev/stdout | awk 'BEGIN{FS="\t"}{if(\$11 < 1e-5)print \$1;}' | uniq > mirnahit.txt
     else
-        """
-        echo $db_type
-        blat -out=blast8 $mirna $contaminants /dev/stdout | awk 'BEGIN{FS="\t"}{if(\$11 < 1e-5)print \$1;}' | uniq > mirnahit.txt
-        awk 'BEGIN { while((getline<"mirnahit.txt")>0) l[">"\$1]=1 } /^>/ {x = l[\$1]} {if(!x) print }' $contaminants  > filtered.fa
-
-        cat <<-END_VERSIONS > versions.yml
-        "${task.process}":
-            blat: \$(echo \$(blat) | grep Standalone | awk '{ if (match(\$0,/[0-9]*[0-9]/,m)) print m[0] }')
-        END_VERSIONS
-        """
+        touch mirnahit.txt
+    fi
+    awk 'BEGIN { while((getline<"mirnahit.txt")>0) l[">"\$1]=1 } /^>/ {x = l[\$1]} {if(!x) print }' $subset  > filtered.fa
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        blat: \$(echo \$(blat) | grep Standalone | awk '{ if (match(\$0,/[0-9]*[0-9]/,m)) print m[0] }')
+    END_VERSIONS
+    """
 
 }
@@ -0,0 +1,36 @@
+process INDEX_CONTAMINANTS_COMBINED {
+    label 'process_medium'
+
+    conda 'bowtie2=2.4.5'
+    container "${ workflow.containerEngine == 'singularity' && !task.ext.singularity_pull_docker_container ?
+        'https://depot.galaxyproject.org/singularity/bowtie2:2.4.5--py39hd2f7db1_2' :
+        'biocontainers/bowtie2:2.4.5--py39hd2f7db1_2'}"
+
+    input:
+    tuple val(contaminant_types), path(fastas, stageAs: 'db?/*')
+
+    output:
+    path 'fasta_bidx*'  , emit: index
+    path "versions.yml" , emit: versions
+
+    when:
+    task.ext.when == null || task.ext.when
+
+    script:
+    // Prefix every reference name with its database, e.g. ">rRNA:RNA5-8SN1", so alignments can be attributed
+    def prefix_commands = [contaminant_types, fastas instanceof List ? fastas : [fastas]]
+        .transpose()
+        .collect { type, fasta -> "zcat -f ${fasta} | awk -v db=${type} '/^>/ { sub(/^>/, \">\" db \":\") } { print }' >> contaminants.fa" }
+        .join('\n    ')
+    """
+    ${prefix_commands}
+
+    bowtie2-build contaminants.fa fasta_bidx --threads ${task.cpus}
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        bowtie2: \$(echo \$(bowtie2 --version 2>&1) | sed 's/^.*bowtie2-align-s version //; s/ .*\$//')
+    END_VERSIONS
+    """
+
+}
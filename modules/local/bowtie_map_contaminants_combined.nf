@@ -0,0 +1,67 @@
+process BOWTIE_MAP_CONTAMINANTS_COMBINED {
+    tag "$meta.id"
+    label 'process_medium'
+
+    conda 'bowtie2=2.4.5'
+    container "${ workflow.containerEngine == 'singularity' && !task.ext.singularity_pull_docker_container ?
+        'https://depot.galaxyproject.org/singularity/bowtie2:2.4.5--py39hd2f7db1_2' :
+        'biocontainers/bowtie2:2.4.5--py39hd2f7db1_2' }"
+
+    input:
+    tuple val(meta), path(reads)
+    path index
+    val contaminant_types // priority order, e.g. [ 'rRNA', 'tRNA', 'cDNA' ]
+
+    output:
+    tuple val(meta), path('*.filter.unmapped.contaminant.fastq'), emit: unmapped
+    path "filtered.*.stats"                                     , emit: stats
+    path "*.contaminant_bowtie.log"                             , emit: log
+    path "versions.yml"                                         , emit: versions
+
+    when:
+    task.ext.when == null || task.ext.when
+
+    script:
+    def args = task.ext.args ?: "-a"
+    """
+    INDEX=`find -L ./ -name "*.rev.1.bt2" | sed "s/\\.rev.1.bt2\$//"`
+
+    # Align once against all databases and report every alignment (-a), so that a read with many
+    # hits in one database still shows its hit in a database of higher priority. Alignments of a
+    # read are reported consecutively, and it is attributed to the first database in priority order.
+    # Reference names without a known database prefix mean a stale or foreign index and fail the task.
+    bowtie2 \\
+        -x \$INDEX \\
+        -U ${reads} \\
+        --threads ${task.cpus} \\
+        --un ${meta.id}.combined.filter.unmapped.contaminant.fastq \\
+        --very-sensitive-local \\
+        --no-unal \\
+        --no-hd \\
+        ${args} \\
+        2> ${meta.id}.contaminant_bowtie.log \\
+    | awk -F '\\t' -v order="${contaminant_types.join(',')}" -v sample=${meta.id} '
+        BEGIN { n = split(order, db, ","); for (i = 1; i <= n; i++) { rank[db[i]] = i; count[i] = 0 } }
+        \$1 != read { if (read != "") count[best]++; read = \$1; best = n }
+        {
+            split(\$3, ref, ":")
+            if (!(ref[1] in rank)) {
+                print "Reference " \$3 " has no prefix of the databases " order > "/dev/stderr"
+                failed = 1
+                exit 1
+            }
+            if (rank[ref[1]] < best) best = rank[ref[1]]
+        }
+        END {
+            if (failed) exit 1
+            if (read != "") count[best]++
+            for (i = 1; i <= n; i++) print "\\""db[i]"\\": "count[i] > ("filtered." sample "_" db[i] ".stats")
+        }'
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        bowtie2: \$(echo \$(bowtie2 --version 2>&1) | sed 's/^.*bowtie2-align-s version //; s/ .*\$//' | tr -d '\0')
+    END_VERSIONS
+    """
+
+}
@@ -14,13 +14,45 @@ process BOWTIE_MAP_SEQ {
     output:
     tuple val(meta), path("*bam")           , emit: bam
     tuple val(meta), path('unmapped/*fq.gz'), emit: unmapped
+    path "*.scratch_usage.tsv"              , emit: scratch
     path "versions.yml"                     , emit: versions
 
     when:
     task.ext.when == null || task.ext.when
 
     script:
+    def stage = task.process.tokenize(':')[-1].toLowerCase()
+    // Reads collapsed to `seq_<rank>_x<count>` can be expanded back to one
+    // record per read, for alignments and unmapped reads independently.
+    def expand_sam = task.ext.expand_bam ?
+        "awk -F '\\t' -v OFS='\\t' '/^@/ { print; next } { n = 1; if (match(\$1, /_x[0-9]+\$/)) n = substr(\$1, RSTART + 2) + 0; name = \$1; for (i = 1; i <= n; i++) { \$1 = name \"_\" i; print } }' |" : ''
+    def expand_fastq = task.ext.expand_unmapped ?
+        "awk 'NR % 4 == 1 { name = substr(\$1, 2); n = 1; if (match(name, /_x[0-9]+\$/)) n = substr(name, RSTART + 2) + 0 } NR % 4 == 2 { seq = \$0 } NR % 4 == 0 { for (i = 1; i <= n; i++) printf \"@%s_%d\\n%s\\n+\\n%s\\n\", name, i, seq, \$0 }'" : 'cat'
     """
+    # Sample the size of the work directory until mapping is done, so the
+    # peak scratch usage of this task can be reported.
+    (
+        peak=0
+        while true; do
+            used=\$(du -sk . | cut -f1)
+            if [ "\$used" -gt "\$peak" ]; then peak=\$used; fi
+            echo \$peak > .scratch_peak_kb
+            if [ -f .mapping_done ]; then break; fi
+            sleep 5
+        done
+    ) &
+    scratch_pid=\$!
+    # Stop the sampler also when mapping fails and `set -e` ends the script early.
+    trap 'touch .mapping_done; kill \$scratch_pid 2>/dev/null || true' EXIT
+
+    # Unmapped reads are compressed while bowtie writes them. Keeping our own
+    # write end open guarantees gzip sees EOF even if bowtie never opens the file.
+    mkdir unmapped
+    mkfifo ${meta.id}_unmapped.fq
+    ( $expand_fastq < ${meta.id}_unmapped.fq | gzip -c > unmapped/${meta.id}_unmapped.fq.gz ) &
+    gzip_pid=\$!
+    exec 3> ${meta.id}_unmapped.fq
+
     INDEX=`find -L ./ -name "*.3.ebwt" | sed 's/.3.ebwt//'`
     bowtie \\
         -x \$INDEX \\
@@ -32,17 +64,16 @@ process BOWTIE_MAP_SEQ {
         --strata \\
         -e 99999 \\
         --chunkmbs 2048 \\
-        --un ${meta.id}_unmapped.fq -S > ${meta.id}.sam
+        --un ${meta.id}_unmapped.fq -S \\
+        | $expand_sam samtools view -@ ${task.cpus} -b -o ${meta.id}.bam -
 
-    samtools view -bS ${meta.id}.sam > ${meta.id}.bam
+    exec 3>&-
+    wait \$gzip_pid
+    rm ${meta.id}_unmapped.fq
 
-    if [ ! -f  "${meta.id}_unmapped.fq" ]
-    then
-        touch ${meta.id}_unmapped.fq
-    fi
-    gzip ${meta.id}_unmapped.fq
-    mkdir unmapped
-    mv  ${meta.id}_unmapped.fq.gz  unmapped/.
+    touch .mapping_done
+    wait \$scratch_pid
+    printf "sample\\tprocess\\tpeak_scratch_kb\\n${meta.id}\\t${task.process}\\t%s\\n" \$(cat .scratch_peak_kb) > ${meta.id}.${stage}.scratch_usage.tsv
 
     cat <<-END_VERSIONS > versions.yml
     "${task.process}":
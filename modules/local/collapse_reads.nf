@@ -0,0 +1,36 @@
+process COLLAPSE_READS {
+    label 'process_medium'
+    tag "$meta.id"
+
+    conda 'conda-forge::python=3.9.5'
+    container "${ workflow.containerEngine == 'singularity' && !task.ext.singularity_pull_docker_container ?
+        'https://depot.galaxyproject.org/singularity/python:3.9--1' :
+        'biocontainers/python:3.9--1' }"
+
+    input:
+    tuple val(meta), path(reads)
+
+    output:
+    tuple val(meta), path("*.collapsed.fastq.gz"), emit: collapsed
+    path "versions.yml"                          , emit: versions
+
+    when:
+    task.ext.when == null || task.ext.when
+
+    script:
+    def args = task.ext.args ?: ''
+    """
+    collapse_reads.py \\
+        --input $reads \\
+        --output ${meta.id}.collapsed.fastq.gz \\
+        --threads ${task.cpus} \\
+        --log-level INFO \\
+        $args
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        python: \$(python --version | sed 's/Python //g')
+    END_VERSIONS
+    """
+
+}
@@ -1,10 +1,10 @@
 process TABLE_MERGE {
     label 'process_medium'
 
-    conda 'conda-base::r-data.table=1.12.2'
+    conda 'conda-forge::pandas=1.5.2'
     container "${ workflow.containerEngine == 'singularity' && !task.ext.singularity_pull_docker_container ?
-        'https://depot.galaxyproject.org/singularity/r-data.table:1.12.2' :
-        'biocontainers/r-data.table:1.12.2' }"
+        'https://depot.galaxyproject.org/singularity/pandas:1.5.2' :
+        'biocontainers/pandas:1.5.2' }"
 
     input:
     path mirtop
@@ -18,11 +18,12 @@ process TABLE_MERGE {
 
     script:
     """
-    collapse_mirtop.r ${mirtop}
+    collapse_mirtop.py ${mirtop} --output mirna.tsv --log-level INFO
 
     cat <<-END_VERSIONS > versions.yml
     "${task.process}":
-        r-base: \$(echo \$(R --version 2>&1) | sed 's/^.*R version //; s/ .*\$//')
+        python: \$(python --version | sed 's/Python //g')
+        pandas: \$(python -c "import pandas; print(pandas.__version__)")
     END_VERSIONS
     """
 }
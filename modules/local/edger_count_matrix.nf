@@ -0,0 +1,31 @@
+process EDGER_COUNT_MATRIX {
+    label 'process_single'
+
+    conda 'conda-forge::pandas=1.5.2'
+    container "${ workflow.containerEngine == 'singularity' && !task.ext.singularity_pull_docker_container ?
+        'https://depot.galaxyproject.org/singularity/pandas:1.5.2' :
+        'biocontainers/pandas:1.5.2' }"
+
+    input:
+    path idxstats
+
+    output:
+    path '*_count_matrix.tsv'        , emit: matrix
+    path '*_unmapped_read_counts.txt', emit: unmapped
+    path "versions.yml"              , emit: versions
+
+    when:
+    task.ext.when == null || task.ext.when
+
+    script:
+    """
+    edger_count_matrix.py $idxstats --log-level INFO
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        python: \$(python --version | sed 's/Python //g')
+        numpy: \$(python -c "import numpy; print(numpy.__version__)")
+    END_VERSIONS
+    """
+
+}
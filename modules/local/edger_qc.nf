@@ -7,7 +7,8 @@ process EDGER_QC {
         'biocontainers/mulled-v2-419bd7f10b2b902489ac63bbaafc7db76f8e0ae1:f5ff7de321749bc7ae12f7e79a4b581497f4c8ce-0' }"
 
     input:
-    path input_files
+    path count_matrices
+    path unmapped_read_counts
 
     output:
     path '*.{txt,pdf,csv}', emit: edger_files
@@ -18,7 +19,7 @@ process EDGER_QC {
 
     script:
     """
-    edgeR_miRBase.r $input_files
+    edgeR_miRBase.r $count_matrices
 
     cat <<-END_VERSIONS > versions.yml
     "${task.process}":
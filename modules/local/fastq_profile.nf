@@ -0,0 +1,38 @@
+process FASTQ_PROFILE {
+    label 'process_single'
+    tag "$meta.id"
+
+    conda 'conda-forge::pandas=1.5.2'
+    container "${ workflow.containerEngine == 'singularity' && !task.ext.singularity_pull_docker_container ?
+        'https://depot.galaxyproject.org/singularity/pandas:1.5.2' :
+        'biocontainers/pandas:1.5.2' }"
+
+    input:
+    tuple val(meta), path(reads)
+
+    output:
+    path "*_mqc.yaml"                            , emit: mqc
+    tuple val(meta), path("*.top_sequences.tsv") , emit: top_sequences
+    path "versions.yml"                          , emit: versions
+
+    when:
+    task.ext.when == null || task.ext.when
+
+    script:
+    def args = task.ext.args ?: ''
+    """
+    fastq_profile.py \\
+        $reads \\
+        --sample ${meta.id} \\
+        --phred-offset ${params.phred_offset} \\
+        --log-level INFO \\
+        $args
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        python: \$(python --version | sed 's/Python //g')
+        numpy: \$(python -c "import numpy; print(numpy.__version__)")
+    END_VERSIONS
+    """
+
+}
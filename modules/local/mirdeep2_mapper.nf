@@ -14,26 +14,22 @@ process MIRDEEP2_MAPPER {
     path index
 
     output:
-    tuple path('*_collapsed.fa'), path('*reads_vs_refdb.arf'), emit: mirdeep2_inputs
-    path "versions.yml"                                      , emit: versions
+    tuple path('*_collapsed.fa', includeInputs: true), path('*reads_vs_refdb.arf'), emit: mirdeep2_inputs
+    path "versions.yml"                                                          , emit: versions
 
     when:
     task.ext.when == null || task.ext.when
 
     script:
     def index_base = index.toString().tokenize(' ')[0].tokenize('.')[0]
+    // Reads come collapsed from MIRDEEP2_PREPARE, so mapper.pl only runs bowtie and writes the arf
     """
     mapper.pl \\
     $reads \\
-        -e \\
-        -h \\
-        -i \\
-        -j \\
-        -m \\
+        -c \\
         -p $index_base \\
-        -s ${meta.id}_collapsed.fa \\
         -t ${meta.id}_reads_vs_refdb.arf \\
-        -o 4
+        -o $task.cpus
 
     cat <<-END_VERSIONS > versions.yml
     "${task.process}":
@@ -1,30 +1,35 @@
-process MIRDEEP2_PIGZ {
-    label 'process_low'
+process MIRDEEP2_PREPARE {
+    label 'process_single'
     tag "$meta.id"
 
-    // TODO maybe create a mulled container and uncompress within mirdeep2_mapper?
-    conda 'bioconda::bioconvert=1.1.1'
+    conda 'conda-forge::python=3.9.5'
     container "${ workflow.containerEngine == 'singularity' && !task.ext.singularity_pull_docker_container ?
-        'https://depot.galaxyproject.org/singularity/bioconvert:1.1.1--pyhdfd78af_0' :
-        'biocontainers/bioconvert:1.1.1--pyhdfd78af_0' }"
+        'https://depot.galaxyproject.org/singularity/python:3.9--1' :
+        'biocontainers/python:3.9--1' }"
 
     input:
     tuple val(meta), path(reads)
 
     output:
-    tuple val(meta), path("*.{fastq,fq}"), emit: reads
-    path "versions.yml"                  , emit: versions
+    tuple val(meta), path("*_collapsed.fa"), emit: reads
+    path "versions.yml"                    , emit: versions
 
     when:
     task.ext.when == null || task.ext.when
 
     script:
+    // Reads are collapsed once upstream, only rename and clean them the way mapper.pl -e -h -i -j -m would
     """
-    pigz -f -d -p $task.cpus $reads
+    collapse_reads.py \\
+        --input $reads \\
+        --output ${meta.id}_collapsed.fa \\
+        --collapsed-input \\
+        --format mirdeep2 \\
+        --log-level INFO
 
     cat <<-END_VERSIONS > versions.yml
     "${task.process}":
-        pigz: \$( pigz --version 2>&1 | sed 's/pigz //g' )
+        python: \$(python --version | sed 's/Python //g')
     END_VERSIONS
     """
 
@@ -0,0 +1,42 @@
+process MIRNA_KMER_SCREEN {
+    tag "$contaminants"
+    label 'process_single'
+
+    conda 'conda-forge::pandas=1.5.2'
+    container "${ workflow.containerEngine == 'singularity' && !task.ext.singularity_pull_docker_container ?
+        'https://depot.galaxyproject.org/singularity/pandas:1.5.2' :
+        'biocontainers/pandas:1.5.2' }"
+
+    input:
+    val db_type
+    path mirna
+    path contaminants
+
+    output:
+    tuple path('subset.fa'), path('candidates.fa'), emit: screened
+    path "versions.yml"                           , emit: versions
+
+    when:
+    task.ext.when == null || task.ext.when
+
+    script:
+    // Ensembl biotypes that are miRNAs themselves, or filtered by another database
+    def biotypes = db_type == "cdna" ? [ 'miRNA' ] : db_type == "ncrna" ? [ 'rRNA', 'miRNA' ] : []
+    def subset   = biotypes ? "--subset subset.fa ${biotypes.collect { "--exclude-biotype $it" }.join(' ')}" : ''
+    """
+    mirna_kmer_screen.py \\
+        --mirna $mirna \\
+        --contaminants $contaminants \\
+        --candidates candidates.fa \\
+        --log-level INFO \\
+        $subset
+    ${biotypes ? '' : "ln -s $contaminants subset.fa"}
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        python: \$(python --version | sed 's/Python //g')
+        numpy: \$(python -c "import numpy; print(numpy.__version__)")
+    END_VERSIONS
+    """
+
+}
@@ -8,10 +8,10 @@ process MIRTRACE_RUN {
 
     input:
     tuple val(adapter), val(ids), path(reads)
-    path(mirtrace_config)
 
     output:
     path "mirtrace/*"  , emit: mirtrace
+    path "mirtrace"    , emit: mirtrace_dir
     path "versions.yml", emit: versions
 
     when:
@@ -20,19 +20,22 @@ process MIRTRACE_RUN {
     script:
     // mirtrace protocol defaults to 'params.protocol' if not set
     def protocol = params.protocol == 'custom' ? '' : "--protocol $params.protocol"
+    // Leave a fifth of the task memory to the JVM itself, the heap never needs to be pinned
     def java_mem = ''
     if(task.memory){
-        tmem = task.memory.toBytes()
-        java_mem = "-Xms${tmem} -Xmx${tmem}"
+        java_mem = "-Xmx${(task.memory.toMega() * 0.8) as long}m"
     }
+    // mirtrace resolves the files in its config relative to the working directory, so list the staged names
+    def config = [ids, reads instanceof List ? reads : [reads]].transpose().collect { id, read -> "'./${read.name},${id},${adapter},${params.phred_offset}'" }
 
     """
     export mirtracejar=\$(dirname \$(which mirtrace))
+    printf '%s\\n' ${config.join(' ')} > mirtrace_config
 
     java $java_mem -jar \$mirtracejar/mirtrace.jar --mirtrace-wrapper-name mirtrace qc  \\
         --species $params.mirtrace_species \\
         $protocol \\
-        --config $mirtrace_config \\
+        --config mirtrace_config \\
         --write-fasta \\
         --output-dir mirtrace \\
         --force
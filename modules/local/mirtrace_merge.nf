@@ -0,0 +1,29 @@
+process MIRTRACE_MERGE {
+    label 'process_single'
+
+    conda 'conda-forge::python=3.9.5'
+    container "${ workflow.containerEngine == 'singularity' && !task.ext.singularity_pull_docker_container ?
+        'https://depot.galaxyproject.org/singularity/python:3.9--1' :
+        'biocontainers/python:3.9--1' }"
+
+    input:
+    path batches, stageAs: 'batch_???/mirtrace'
+
+    output:
+    path "mirtrace/*"  , emit: mirtrace
+    path "versions.yml", emit: versions
+
+    when:
+    task.ext.when == null || task.ext.when
+
+    script:
+    """
+    merge_mirtrace.py $batches --output mirtrace --log-level INFO
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        python: \$(python --version | sed 's/Python //g')
+    END_VERSIONS
+    """
+
+}
@@ -1,17 +1,19 @@
 process PARSE_FASTA_MIRNA {
-    label 'process_medium'
+    label 'process_single'
 
-    conda 'bioconda::seqkit=2.6.1'
+    conda 'conda-forge::python=3.9.5'
     container "${ workflow.containerEngine == 'singularity' && !task.ext.singularity_pull_docker_container ?
-        'https://depot.galaxyproject.org/singularity/seqkit:2.6.1--h9ee0642_0' :
-        'biocontainers/seqkit:2.6.1--h9ee0642_0' }"
+        'https://depot.galaxyproject.org/singularity/python:3.9--1' :
+        'biocontainers/python:3.9--1' }"
 
     input:
-    tuple val(meta2), path(fasta)
+    tuple val(meta2), path(mature)
+    tuple val(meta3), path(hairpin)
 
     output:
-    tuple val(meta2), path('*_igenome.fa'), emit: parsed_fasta
-    path "versions.yml"                   , emit: versions
+    tuple val(meta2), path('mature_idx.fa') , emit: mature
+    tuple val(meta3), path('hairpin_idx.fa'), emit: hairpin
+    path "versions.yml"                     , emit: versions
 
     when:
     task.ext.when == null || task.ext.when
@@ -19,23 +21,19 @@ process PARSE_FASTA_MIRNA {
     script:
     def filter_species = params.mirgenedb ? params.mirgenedb_species : params.mirtrace_species
     """
-    # Uncompress FASTA reference files if necessary
-    FASTA="$fasta"
-    if [ \${FASTA: -3} == ".gz" ]; then
-        gunzip -f \$FASTA
-        FASTA=\${FASTA%%.gz}
-    fi
-    sed 's/&gt;/>/g' \$FASTA | sed 's#<br>#\\n#g' | sed 's#</p>##g' | sed 's#<p>##g' | sed -e :a -e '/^\\n*\$/{\$d;N;};/\\n\$/ba' > \${FASTA}_html_cleaned.fa
-    # Remove spaces from miRBase FASTA files
-    sed '#^[^>]#s#[^AUGCaugc]#N#g' \${FASTA}_html_cleaned.fa > \${FASTA}_parsed.fa
-
-    sed -i 's#\s.*##' \${FASTA}_parsed.fa
-    seqkit grep -r --pattern \".*${filter_species}-.*\" \${FASTA}_parsed.fa > \${FASTA}_sps.fa
-    seqkit seq --rna2dna \${FASTA}_sps.fa > \${FASTA}_igenome.fa
+    # Strip miRBase HTML, replace non-AUGC bases with N, truncate headers,
+    # keep the species of interest, convert to DNA and unwrap, in one pass
+    parse_mirna_fasta.py \\
+        --species ${filter_species} \\
+        --input $mature \\
+        --output mature_idx.fa \\
+        --input $hairpin \\
+        --output hairpin_idx.fa \\
+        --log-level INFO
 
     cat <<-END_VERSIONS > versions.yml
     "${task.process}":
-        seqkit: \$(echo \$(seqkit 2>&1) | sed 's/^.*Version: //; s/ .*\$//')
+        python: \$(python --version | sed 's/Python //g')
     END_VERSIONS
     """
 
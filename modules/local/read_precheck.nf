@@ -0,0 +1,36 @@
+process READ_PRECHECK {
+    label 'process_single'
+    tag "$meta.id"
+
+    conda 'conda-forge::python=3.9.5'
+    container "${ workflow.containerEngine == 'singularity' && !task.ext.singularity_pull_docker_container ?
+        'https://depot.galaxyproject.org/singularity/python:3.9--1' :
+        'biocontainers/python:3.9--1' }"
+
+    input:
+    tuple val(meta), path(reads)
+
+    output:
+    tuple val(meta), env(PRECHECK), emit: status
+    path "*_mqc.yaml"              , emit: mqc
+    path "versions.yml"            , emit: versions
+
+    when:
+    task.ext.when == null || task.ext.when
+
+    script:
+    def args = task.ext.args ?: ''
+    """
+    PRECHECK=\$(read_precheck.py \\
+        $reads \\
+        --sample ${meta.id} \\
+        --log-level INFO \\
+        $args)
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        python: \$(python --version | sed 's/Python //g')
+    END_VERSIONS
+    """
+
+}
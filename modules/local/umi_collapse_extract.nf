@@ -0,0 +1,40 @@
+process UMI_COLLAPSE_EXTRACT {
+    label 'process_medium'
+    tag "$meta.id"
+
+    // UMI-tools brings Python with the regex module its fuzzy barcode patterns need
+    conda 'bioconda::umi_tools=1.1.5'
+    container "${ workflow.containerEngine == 'singularity' && !task.ext.singularity_pull_docker_container ?
+        'https://depot.galaxyproject.org/singularity/umi_tools:1.1.5--py39hf95cd2a_0' :
+        'biocontainers/umi_tools:1.1.5--py39hf95cd2a_0' }"
+
+    input:
+    tuple val(meta), path(reads)
+
+    output:
+    tuple val(meta), path("*.umi_dedup.fastq.gz"), emit: reads
+    path "*_mqc.yaml"                            , emit: mqc
+    path "versions.yml"                          , emit: versions
+
+    when:
+    task.ext.when == null || task.ext.when
+
+    script:
+    def args   = task.ext.args ?: ''
+    def prefix = task.ext.prefix ?: "${meta.id}"
+    """
+    umi_collapse_extract.py \\
+        $reads \\
+        --output ${prefix}.umi_dedup.fastq.gz \\
+        --sample ${meta.id} \\
+        --threads $task.cpus \\
+        --log-level INFO \\
+        $args
+
+    cat <<-END_VERSIONS > versions.yml
+    "${task.process}":
+        python: \$(python --version | sed 's/Python //g')
+    END_VERSIONS
+    """
+
+}
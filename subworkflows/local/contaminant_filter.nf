@@ -2,10 +2,10 @@
 // Filter contamination by rrna, trna, cdna, ncma, pirna
 //
 
-include { BLAT_MIRNA as BLAT_CDNA
-        BLAT_MIRNA as BLAT_NCRNA
-        BLAT_MIRNA as BLAT_PIRNA
-        BLAT_MIRNA as BLAT_OTHER } from '../../modules/local/blat_mirna'
+include { SCREEN_BLAT_MIRNA as BLAT_CDNA
+        SCREEN_BLAT_MIRNA as BLAT_NCRNA
+        SCREEN_BLAT_MIRNA as BLAT_PIRNA
+        SCREEN_BLAT_MIRNA as BLAT_OTHER } from './screen_blat_mirna'
 
 include { INDEX_CONTAMINANTS as INDEX_RRNA
         INDEX_CONTAMINANTS as INDEX_TRNA
@@ -21,6 +21,9 @@ include { BOWTIE_MAP_CONTAMINANTS as MAP_RRNA
         BOWTIE_MAP_CONTAMINANTS as MAP_PIRNA
         BOWTIE_MAP_CONTAMINANTS as MAP_OTHER } from '../../modules/local/bowtie_map_contaminants'
 
+include { INDEX_CONTAMINANTS_COMBINED      } from '../../modules/local/bowtie_contaminants_combined'
+include { BOWTIE_MAP_CONTAMINANTS_COMBINED } from '../../modules/local/bowtie_map_contaminants_combined'
+
 include { FILTER_STATS } from '../../modules/local/filter_stats'
 
 workflow CONTAMINANT_FILTER {
@@ -40,83 +43,164 @@ workflow CONTAMINANT_FILTER {
     ch_filter_stats = Channel.empty()
     ch_mqc_results = Channel.empty()
 
-    rrna_reads = reads
-
-    reads.set { rrna_reads }
-
-    if (params.rrna) {
-        // Index DB and filter $reads emit: $rrna_reads
-        INDEX_RRNA ( rrna )
-        ch_versions = ch_versions.mix(INDEX_RRNA.out.versions)
-        MAP_RRNA ( reads, INDEX_RRNA.out.index, 'rRNA' )
-        ch_versions = ch_versions.mix(MAP_RRNA.out.versions)
-        ch_filter_stats = ch_filter_stats.mix(MAP_RRNA.out.stats.ifEmpty(null))
-        MAP_RRNA.out.unmapped.set { rrna_reads }
-    }
-
-    rrna_reads.set { trna_reads }
-
-    if (params.trna) {
-        // Index DB and filter $rrna_reads emit: $trna_reads
-        INDEX_TRNA ( trna )
-        ch_versions = ch_versions.mix(INDEX_TRNA.out.versions)
-        MAP_TRNA ( rrna_reads, INDEX_TRNA.out.index, 'tRNA')
-        ch_versions = ch_versions.mix(MAP_TRNA.out.versions)
-        ch_filter_stats = ch_filter_stats.mix(MAP_TRNA.out.stats.ifEmpty(null))
-        MAP_TRNA.out.unmapped.set { trna_reads }
-    }
-
-    trna_reads.set { cdna_reads }
-
-
-    if (params.cdna) {
-        BLAT_CDNA ( 'cdna', mirna, cdna )
-        ch_versions = ch_versions.mix(BLAT_CDNA.out.versions)
-        INDEX_CDNA ( BLAT_CDNA.out.filtered_set )
-        ch_versions = ch_versions.mix(INDEX_CDNA.out.versions)
-        MAP_CDNA ( trna_reads, INDEX_CDNA.out.index, 'cDNA' )
-        ch_versions = ch_versions.mix(MAP_CDNA.out.versions)
-        ch_filter_stats = ch_filter_stats.mix(MAP_CDNA.out.stats.ifEmpty(null))
-        MAP_CDNA.out.unmapped.set { cdna_reads }
-    }
-
-    cdna_reads.set { ncrna_reads }
-
-    if (params.ncrna) {
-        BLAT_NCRNA ( 'ncrna', mirna, ncrna )
-        ch_versions = ch_versions.mix(BLAT_NCRNA.out.versions)
-        INDEX_NCRNA ( BLAT_NCRNA.out.filtered_set )
-        ch_versions = ch_versions.mix(INDEX_NCRNA.out.versions)
-        MAP_NCRNA ( cdna_reads, INDEX_NCRNA.out.index, 'ncRNA' )
-        ch_versions = ch_versions.mix(MAP_NCRNA.out.versions)
-        ch_filter_stats = ch_filter_stats.mix(MAP_NCRNA.out.stats.ifEmpty(null))
-        MAP_NCRNA.out.unmapped.set { ncrna_reads }
-    }
-
-    ncrna_reads.set { pirna_reads }
-
-    if (params.pirna) {
-        BLAT_PIRNA ( 'other', mirna, pirna )
-        ch_versions = ch_versions.mix(BLAT_PIRNA.out.versions)
-        INDEX_PIRNA ( BLAT_PIRNA.out.filtered_set )
-        ch_versions = ch_versions.mix(INDEX_PIRNA.out.versions)
-        MAP_PIRNA ( ncrna_reads, INDEX_PIRNA.out.index, 'piRNA' )
-        ch_versions = ch_versions.mix(MAP_PIRNA.out.versions)
-        ch_filter_stats = ch_filter_stats.mix(MAP_PIRNA.out.stats.ifEmpty(null))
-        MAP_PIRNA.out.unmapped.set { pirna_reads }
-    }
-
-    pirna_reads.set { other_cont_reads }
-
-    if (other) {
-        BLAT_OTHER ( 'other', mirna, other)
-        ch_versions = ch_versions.mix(BLAT_OTHER.out.versions)
-        INDEX_OTHER ( BLAT_OTHER.out.filtered_set )
-        ch_versions = ch_versions.mix(INDEX_OTHER.out.versions)
-        MAP_OTHER ( ncrna_reads, INDEX_OTHER.out.index, 'other' )
-        ch_versions = ch_versions.mix(MAP_OTHER.out.versions)
-        ch_filter_stats = ch_filter_stats.mix(MAP_OTHER.out.stats.ifEmpty(null))
-        MAP_OTHER.out.unmapped.set { other_cont_reads }
+    // Databases in the order in which reads are attributed to them
+    def contaminant_dbs = [
+        rRNA : params.rrna,
+        tRNA : params.trna,
+        cDNA : params.cdna,
+        ncRNA: params.ncrna,
+        piRNA: params.pirna,
+        other: other
+    ].findAll { it.value }.keySet() as List
+
+    if (params.contaminant_single_pass && contaminant_dbs) {
+        // One bowtie2 index over all databases, one alignment pass per sample
+        combined_index = prebuilt_contaminant_index('combined')
+        if (combined_index == null) {
+            ch_contaminant_fasta = Channel.empty()
+            if (params.rrna) {
+                ch_contaminant_fasta = ch_contaminant_fasta.mix(Channel.of([ 'rRNA', file(rrna, checkIfExists: true) ]))
+            }
+            if (params.trna) {
+                ch_contaminant_fasta = ch_contaminant_fasta.mix(Channel.of([ 'tRNA', file(trna, checkIfExists: true) ]))
+            }
+            if (params.cdna) {
+                BLAT_CDNA ( 'cdna', mirna, cdna )
+                ch_versions = ch_versions.mix(BLAT_CDNA.out.versions)
+                ch_contaminant_fasta = ch_contaminant_fasta.mix(BLAT_CDNA.out.filtered_set.map { [ 'cDNA', it ] })
+            }
+            if (params.ncrna) {
+                BLAT_NCRNA ( 'ncrna', mirna, ncrna )
+                ch_versions = ch_versions.mix(BLAT_NCRNA.out.versions)
+                ch_contaminant_fasta = ch_contaminant_fasta.mix(BLAT_NCRNA.out.filtered_set.map { [ 'ncRNA', it ] })
+            }
+            if (params.pirna) {
+                BLAT_PIRNA ( 'other', mirna, pirna )
+                ch_versions = ch_versions.mix(BLAT_PIRNA.out.versions)
+                ch_contaminant_fasta = ch_contaminant_fasta.mix(BLAT_PIRNA.out.filtered_set.map { [ 'piRNA', it ] })
+            }
+            if (other) {
+                BLAT_OTHER ( 'other', mirna, other )
+                ch_versions = ch_versions.mix(BLAT_OTHER.out.versions)
+                ch_contaminant_fasta = ch_contaminant_fasta.mix(BLAT_OTHER.out.filtered_set.map { [ 'other', it ] })
+            }
+
+            INDEX_CONTAMINANTS_COMBINED (
+                ch_contaminant_fasta
+                    .toSortedList { a, b -> contaminant_dbs.indexOf(a[0]) <=> contaminant_dbs.indexOf(b[0]) }
+                    .map { it.transpose() }
+            )
+            ch_versions = ch_versions.mix(INDEX_CONTAMINANTS_COMBINED.out.versions)
+            combined_index = INDEX_CONTAMINANTS_COMBINED.out.index
+        }
+
+        BOWTIE_MAP_CONTAMINANTS_COMBINED ( reads, combined_index, contaminant_dbs )
+        ch_versions = ch_versions.mix(BOWTIE_MAP_CONTAMINANTS_COMBINED.out.versions)
+        ch_filter_stats = ch_filter_stats.mix(BOWTIE_MAP_CONTAMINANTS_COMBINED.out.stats)
+        BOWTIE_MAP_CONTAMINANTS_COMBINED.out.unmapped.set { other_cont_reads }
+    } else {
+        rrna_reads = reads
+
+        reads.set { rrna_reads }
+
+        if (params.rrna) {
+            // Index DB and filter $reads emit: $rrna_reads
+            rrna_index = prebuilt_contaminant_index('rrna')
+            if (rrna_index == null) {
+                INDEX_RRNA ( rrna )
+                ch_versions = ch_versions.mix(INDEX_RRNA.out.versions)
+                rrna_index = INDEX_RRNA.out.index
+            }
+            MAP_RRNA ( reads, rrna_index, 'rRNA' )
+            ch_versions = ch_versions.mix(MAP_RRNA.out.versions)
+            ch_filter_stats = ch_filter_stats.mix(MAP_RRNA.out.stats.ifEmpty(null))
+            MAP_RRNA.out.unmapped.set { rrna_reads }
+        }
+
+        rrna_reads.set { trna_reads }
+
+        if (params.trna) {
+            // Index DB and filter $rrna_reads emit: $trna_reads
+            trna_index = prebuilt_contaminant_index('trna')
+            if (trna_index == null) {
+                INDEX_TRNA ( trna )
+                ch_versions = ch_versions.mix(INDEX_TRNA.out.versions)
+                trna_index = INDEX_TRNA.out.index
+            }
+            MAP_TRNA ( rrna_reads, trna_index, 'tRNA')
+            ch_versions = ch_versions.mix(MAP_TRNA.out.versions)
+            ch_filter_stats = ch_filter_stats.mix(MAP_TRNA.out.stats.ifEmpty(null))
+            MAP_TRNA.out.unmapped.set { trna_reads }
+        }
+
+        trna_reads.set { cdna_reads }
+
+
+        if (params.cdna) {
+            cdna_index = prebuilt_contaminant_index('cdna')
+            if (cdna_index == null) {
+                BLAT_CDNA ( 'cdna', mirna, cdna )
+                ch_versions = ch_versions.mix(BLAT_CDNA.out.versions)
+                INDEX_CDNA ( BLAT_CDNA.out.filtered_set )
+                ch_versions = ch_versions.mix(INDEX_CDNA.out.versions)
+                cdna_index = INDEX_CDNA.out.index
+            }
+            MAP_CDNA ( trna_reads, cdna_index, 'cDNA' )
+            ch_versions = ch_versions.mix(MAP_CDNA.out.versions)
+            ch_filter_stats = ch_filter_stats.mix(MAP_CDNA.out.stats.ifEmpty(null))
+            MAP_CDNA.out.unmapped.set { cdna_reads }
+        }
+
+        cdna_reads.set { ncrna_reads }
+
+        if (params.ncrna) {
+            ncrna_index = prebuilt_contaminant_index('ncrna')
+            if (ncrna_index == null) {
+                BLAT_NCRNA ( 'ncrna', mirna, ncrna )
+                ch_versions = ch_versions.mix(BLAT_NCRNA.out.versions)
+                INDEX_NCRNA ( BLAT_NCRNA.out.filtered_set )
+                ch_versions = ch_versions.mix(INDEX_NCRNA.out.versions)
+                ncrna_index = INDEX_NCRNA.out.index
+            }
+            MAP_NCRNA ( cdna_reads, ncrna_index, 'ncRNA' )
+            ch_versions = ch_versions.mix(MAP_NCRNA.out.versions)
+            ch_filter_stats = ch_filter_stats.mix(MAP_NCRNA.out.stats.ifEmpty(null))
+            MAP_NCRNA.out.unmapped.set { ncrna_reads }
+        }
+
+        ncrna_reads.set { pirna_reads }
+
+        if (params.pirna) {
+            pirna_index = prebuilt_contaminant_index('pirna')
+            if (pirna_index == null) {
+                BLAT_PIRNA ( 'other', mirna, pirna )
+                ch_versions = ch_versions.mix(BLAT_PIRNA.out.versions)
+                INDEX_PIRNA ( BLAT_PIRNA.out.filtered_set )
+                ch_versions = ch_versions.mix(INDEX_PIRNA.out.versions)
+                pirna_index = INDEX_PIRNA.out.index
+            }
+            MAP_PIRNA ( ncrna_reads, pirna_index, 'piRNA' )
+            ch_versions = ch_versions.mix(MAP_PIRNA.out.versions)
+            ch_filter_stats = ch_filter_stats.mix(MAP_PIRNA.out.stats.ifEmpty(null))
+            MAP_PIRNA.out.unmapped.set { pirna_reads }
+        }
+
+        pirna_reads.set { other_cont_reads }
+
+        if (other) {
+            other_index = prebuilt_contaminant_index('other')
+            if (other_index == null) {
+                BLAT_OTHER ( 'other', mirna, other )
+                ch_versions = ch_versions.mix(BLAT_OTHER.out.versions)
+                INDEX_OTHER ( BLAT_OTHER.out.filtered_set )
+                ch_versions = ch_versions.mix(INDEX_OTHER.out.versions)
+                other_index = INDEX_OTHER.out.index
+            }
+            MAP_OTHER ( pirna_reads, other_index, 'other' )
+            ch_versions = ch_versions.mix(MAP_OTHER.out.versions)
+            ch_filter_stats = ch_filter_stats.mix(MAP_OTHER.out.stats.ifEmpty(null))
+            MAP_OTHER.out.unmapped.set { other_cont_reads }
+        }
     }
 
     FILTER_STATS ( other_cont_reads, ch_filter_stats.collect() )
@@ -126,3 +210,14 @@ workflow CONTAMINANT_FILTER {
     versions = ch_versions.mix(FILTER_STATS.out.versions)
     filter_stats = FILTER_STATS.out.stats
 }
+
+//
+// Bowtie 2 index of a contamination database from --contaminant_index, if one was provided
+//
+def prebuilt_contaminant_index(db_type) {
+    if (!params.contaminant_index) {
+        return null
+    }
+    def index_dir = file("${params.contaminant_index}/${db_type}")
+    return index_dir.exists() ? Channel.fromPath("${index_dir}/fasta_bidx*", checkIfExists: true).collect() : null
+}
@@ -2,13 +2,13 @@
 // Quantify mirna with bowtie and mirtop
 //
 
-include { MIRDEEP2_PIGZ   } from '../../modules/local/mirdeep2_prepare'
-include { MIRDEEP2_MAPPER } from '../../modules/local/mirdeep2_mapper'
-include { MIRDEEP2_RUN    } from '../../modules/local/mirdeep2_run'
+include { MIRDEEP2_PREPARE } from '../../modules/local/mirdeep2_prepare'
+include { MIRDEEP2_MAPPER  } from '../../modules/local/mirdeep2_mapper'
+include { MIRDEEP2_RUN     } from '../../modules/local/mirdeep2_run'
 
 workflow MIRDEEP2 {
     take:
-    reads        // channel: [ val(meta), [ reads ] ]
+    reads        // channel: [ val(meta), [ collapsed reads ] ]
     fasta
     index
     hairpin
@@ -17,10 +17,10 @@ workflow MIRDEEP2 {
     main:
     ch_versions = Channel.empty()
 
-    MIRDEEP2_PIGZ ( reads )
-    ch_versions = ch_versions.mix(MIRDEEP2_PIGZ.out.versions.first())
+    MIRDEEP2_PREPARE ( reads )
+    ch_versions = ch_versions.mix(MIRDEEP2_PREPARE.out.versions.first())
 
-    MIRDEEP2_MAPPER ( MIRDEEP2_PIGZ.out.reads, index )
+    MIRDEEP2_MAPPER ( MIRDEEP2_PREPARE.out.reads, index )
     ch_versions = ch_versions.mix(MIRDEEP2_MAPPER.out.versions.first())
 
     MIRDEEP2_RUN ( fasta, MIRDEEP2_MAPPER.out.mirdeep2_inputs, hairpin, mature )
@@ -2,11 +2,7 @@
 // Quantify mirna with bowtie and mirtop
 //
 
-include {   PARSE_FASTA_MIRNA  as PARSE_MATURE
-            PARSE_FASTA_MIRNA  as PARSE_HAIRPIN      } from '../../modules/local/parse_fasta_mirna'
-
-include {   FORMAT_FASTA_MIRNA  as FORMAT_MATURE
-            FORMAT_FASTA_MIRNA  as FORMAT_HAIRPIN    } from '../../modules/local/format_fasta_mirna'
+include {   PARSE_FASTA_MIRNA                    } from '../../modules/local/parse_fasta_mirna'
 
 include {   INDEX_MIRNA  as INDEX_MATURE
             INDEX_MIRNA  as INDEX_HAIRPIN            } from '../../modules/local/bowtie_mirna'
@@ -18,9 +14,12 @@ include {   BOWTIE_MAP_SEQ  as BOWTIE_MAP_MATURE
 include {   BAM_SORT_STATS_SAMTOOLS as BAM_STATS_MATURE
             BAM_SORT_STATS_SAMTOOLS as BAM_STATS_HAIRPIN   } from '../nf-core/bam_sort_stats_samtools'
 
-include { SEQCLUSTER_SEQUENCES } from '../../modules/local/seqcluster_collapse.nf'
+include { COLLAPSE_READS       } from '../../modules/local/collapse_reads.nf'
 include { MIRTOP_QUANT         } from '../../modules/local/mirtop_quant.nf'
+include { MIRTOP_GFF           } from '../../modules/local/mirtop_gff.nf'
+include { MIRTOP_MERGE         } from '../../modules/local/mirtop_merge.nf'
 include { TABLE_MERGE          } from '../../modules/local/datatable_merge.nf'
+include { EDGER_COUNT_MATRIX   } from '../../modules/local/edger_count_matrix.nf'
 include { EDGER_QC             } from '../../modules/local/edger_qc.nf'
 
 workflow MIRNA_QUANT {
@@ -33,16 +32,43 @@ workflow MIRNA_QUANT {
     main:
     ch_versions = Channel.empty()
 
-    PARSE_MATURE ( mature ).parsed_fasta.set { mirna_parsed }
-    ch_versions = ch_versions.mix(PARSE_MATURE.out.versions)
-
-    FORMAT_MATURE ( mirna_parsed )
-    ch_versions = ch_versions.mix(FORMAT_MATURE.out.versions)
+    if (params.mirna_index) {
+        // Prebuilt references, e.g. restored from a reference cache
+        Channel.fromPath("${params.mirna_index}/mature/*_idx.fa", checkIfExists: true)
+            .map { [ [:], it ] }
+            .first()
+            .set { mature_formatted }
+        Channel.fromPath("${params.mirna_index}/mature/fasta_bidx*", checkIfExists: true)
+            .collect()
+            .set { mature_bowtie }
+        Channel.fromPath("${params.mirna_index}/hairpin/*_idx.fa", checkIfExists: true)
+            .map { [ [:], it ] }
+            .first()
+            .set { hairpin_formatted }
+        Channel.fromPath("${params.mirna_index}/hairpin/fasta_bidx*", checkIfExists: true)
+            .collect()
+            .set { hairpin_bowtie }
+    } else {
+        PARSE_FASTA_MIRNA ( mature, hairpin )
+        PARSE_FASTA_MIRNA.out.mature.set { mature_formatted }
+        PARSE_FASTA_MIRNA.out.hairpin.set { hairpin_formatted }
+        ch_versions = ch_versions.mix(PARSE_FASTA_MIRNA.out.versions)
+
+        INDEX_MATURE ( mature_formatted ).index.set { mature_bowtie }
+        ch_versions = ch_versions.mix(INDEX_MATURE.out.versions)
+
+        INDEX_HAIRPIN ( hairpin_formatted ).index.set { hairpin_bowtie }
+        ch_versions = ch_versions.mix(INDEX_HAIRPIN.out.versions)
+    }
 
-    INDEX_MATURE ( FORMAT_MATURE.out.formatted_fasta ).index.set { mature_bowtie }
-    ch_versions = ch_versions.mix(INDEX_MATURE.out.versions)
+    //
+    // Collapse every sample once. All bowtie stages below align unique
+    // sequences, and only expand them back to reads where counts matter.
+    //
+    COLLAPSE_READS ( reads ).collapsed.set { reads_collapsed }
+    ch_versions = ch_versions.mix(COLLAPSE_READS.out.versions)
 
-    reads
+    reads_collapsed
         .map { add_suffix(it, "mature") }
         .dump (tag:'msux')
         .set { reads_mirna }
@@ -55,22 +81,13 @@ workflow MIRNA_QUANT {
         .dump (tag:'hsux')
         .set { reads_hairpin }
 
-    BAM_STATS_MATURE ( BOWTIE_MAP_MATURE.out.bam, FORMAT_MATURE.out.formatted_fasta )
+    BAM_STATS_MATURE ( BOWTIE_MAP_MATURE.out.bam, mature_formatted )
     ch_versions = ch_versions.mix(BAM_STATS_MATURE.out.versions)
 
-    PARSE_HAIRPIN ( hairpin ).parsed_fasta.set { hairpin_parsed }
-    ch_versions = ch_versions.mix(PARSE_HAIRPIN.out.versions)
-
-    FORMAT_HAIRPIN ( hairpin_parsed )
-    ch_versions = ch_versions.mix(FORMAT_HAIRPIN.out.versions)
-
-    INDEX_HAIRPIN ( FORMAT_HAIRPIN.out.formatted_fasta ).index.set { hairpin_bowtie }
-    ch_versions = ch_versions.mix(INDEX_HAIRPIN.out.versions)
-
     BOWTIE_MAP_HAIRPIN ( reads_hairpin, hairpin_bowtie.collect() )
     ch_versions = ch_versions.mix(BOWTIE_MAP_HAIRPIN.out.versions)
 
-    BAM_STATS_HAIRPIN ( BOWTIE_MAP_HAIRPIN.out.bam, FORMAT_HAIRPIN.out.formatted_fasta )
+    BAM_STATS_HAIRPIN ( BOWTIE_MAP_HAIRPIN.out.bam, hairpin_formatted )
     ch_versions = ch_versions.mix(BAM_STATS_HAIRPIN.out.versions)
 
     BAM_STATS_MATURE.out.idxstats.collect{it[1]}
@@ -80,27 +97,52 @@ workflow MIRNA_QUANT {
         .collect()
         .set { edger_input }
 
-    EDGER_QC ( edger_input )
-    ch_versions.mix(EDGER_QC.out.versions)
+    EDGER_COUNT_MATRIX ( edger_input )
+    ch_versions = ch_versions.mix(EDGER_COUNT_MATRIX.out.versions)
+
+    EDGER_QC ( EDGER_COUNT_MATRIX.out.matrix, EDGER_COUNT_MATRIX.out.unmapped )
+    ch_versions = ch_versions.mix(EDGER_QC.out.versions)
 
-    reads
+    reads_collapsed
         .map { add_suffix(it, "seqcluster") }
         .dump (tag:'ssux')
         .set { reads_seqcluster }
 
-    SEQCLUSTER_SEQUENCES ( reads_seqcluster ).collapsed.set { reads_collapsed }
-    ch_versions = ch_versions.mix(SEQCLUSTER_SEQUENCES.out.versions)
-
-    BOWTIE_MAP_SEQCLUSTER ( reads_collapsed, hairpin_bowtie.collect() )
+    BOWTIE_MAP_SEQCLUSTER ( reads_seqcluster, hairpin_bowtie.collect() )
     ch_versions = ch_versions.mix(BOWTIE_MAP_SEQCLUSTER.out.versions)
 
     ch_mirtop_logs = Channel.empty()
     if (params.mirtrace_species){
-        MIRTOP_QUANT ( BOWTIE_MAP_SEQCLUSTER.out.bam.collect{it[1]}, FORMAT_HAIRPIN.out.formatted_fasta.collect{it[1]}, gtf )
-        ch_mirtop_logs = MIRTOP_QUANT.out.logs
-        ch_versions = ch_versions.mix(MIRTOP_QUANT.out.versions)
-
-        TABLE_MERGE ( MIRTOP_QUANT.out.mirtop_table )
+        if (params.mirtop_shard_size) {
+            //
+            // Run mirtop gff on shards of samples in parallel and merge their GFFs
+            //
+            BOWTIE_MAP_SEQCLUSTER.out.bam
+                .map { it[1] }
+                .toSortedList { a, b -> a.name <=> b.name }
+                .flatMap { bams -> bams.collate(params.mirtop_shard_size as int).withIndex().collect { shard, index -> [ index, shard ] } }
+                .set { ch_mirtop_shards }
+
+            MIRTOP_GFF ( ch_mirtop_shards, hairpin_formatted.collect{it[1]}, gtf )
+            ch_versions = ch_versions.mix(MIRTOP_GFF.out.versions.first())
+
+            MIRTOP_GFF.out.mirtop_gff
+                .toSortedList { a, b -> a[0] <=> b[0] }
+                .map { shards -> shards.collect { it[1] } }
+                .set { ch_mirtop_gffs }
+
+            MIRTOP_MERGE ( ch_mirtop_gffs, hairpin_formatted.collect{it[1]}, gtf )
+            ch_mirtop_logs = MIRTOP_MERGE.out.logs
+            ch_mirtop_table = MIRTOP_MERGE.out.mirtop_table
+            ch_versions = ch_versions.mix(MIRTOP_MERGE.out.versions)
+        } else {
+            MIRTOP_QUANT ( BOWTIE_MAP_SEQCLUSTER.out.bam.collect{it[1]}, hairpin_formatted.collect{it[1]}, gtf )
+            ch_mirtop_logs = MIRTOP_QUANT.out.logs
+            ch_mirtop_table = MIRTOP_QUANT.out.mirtop_table
+            ch_versions = ch_versions.mix(MIRTOP_QUANT.out.versions)
+        }
+
+        TABLE_MERGE ( ch_mirtop_table )
         ch_versions = ch_versions.mix(TABLE_MERGE.out.versions)
     }
     BOWTIE_MAP_HAIRPIN.out.unmapped
@@ -109,9 +151,10 @@ workflow MIRNA_QUANT {
         .set { reads_genome }
 
     emit:
-    fasta_mature        = FORMAT_MATURE.out.formatted_fasta
-    fasta_hairpin       = FORMAT_HAIRPIN.out.formatted_fasta
+    fasta_mature        = mature_formatted
+    fasta_hairpin       = hairpin_formatted
     unmapped            = reads_genome
+    collapsed           = reads_collapsed
     mature_stats        = BAM_STATS_MATURE.out.stats
     hairpin_stats       = BAM_STATS_HAIRPIN.out.stats
     mirtop_logs         = ch_mirtop_logs
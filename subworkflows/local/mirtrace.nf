@@ -2,7 +2,8 @@
 // Quantify mirna with bowtie and mirtop
 //
 
-include { MIRTRACE_RUN } from '../../modules/local/mirtrace'
+include { MIRTRACE_RUN   } from '../../modules/local/mirtrace'
+include { MIRTRACE_MERGE } from '../../modules/local/mirtrace_merge'
 
 workflow MIRTRACE {
     take:
@@ -10,20 +11,35 @@ workflow MIRTRACE {
 
     main:
 
-    //Staging the files as path() but then getting the filenames for the config file that mirtrace needs
-    //Directly using val(reads) as in previous versions is not reliable as staging between work directories is not 100% reliable if not explicitly defined via nextflow itself
-    //mirtrace is a bit peculiar in parsing these config files, so looked it up in the source how its done. this way should work
-    ch_mirtrace_config =
-    reads.map { adapter, ids, reads -> [adapter, ids,reads]}
-    .transpose()
-    .collectFile { adapter, id, path -> "./${path.getFileName().toString()},${id},${adapter},${params.phred_offset}\n" } // operations need a channel, so, should be outside the module
+    ch_versions = Channel.empty()
 
-    MIRTRACE_RUN (
-        reads,
-        ch_mirtrace_config
-    )
+    //MIRTRACE_RUN writes the mirtrace config itself from the staged file names, as mirtrace is a bit peculiar in parsing these config files
+    if (params.mirtrace_batch_size) {
+        //
+        // Run mirtrace on batches of samples sharing an adapter in parallel and merge the results
+        //
+        reads
+            .flatMap { adapter, ids, files ->
+                [ids, files].transpose()
+                    .sort { it[0] }
+                    .collate(params.mirtrace_batch_size as int)
+                    .collect { batch -> [ adapter, batch.collect { it[0] }, batch.collect { it[1] } ] }
+            }
+            .set { ch_mirtrace_batches }
+
+        MIRTRACE_RUN ( ch_mirtrace_batches )
+        ch_versions = ch_versions.mix(MIRTRACE_RUN.out.versions.first())
+
+        MIRTRACE_MERGE ( MIRTRACE_RUN.out.mirtrace_dir.collect() )
+        ch_mirtrace = MIRTRACE_MERGE.out.mirtrace
+        ch_versions = ch_versions.mix(MIRTRACE_MERGE.out.versions)
+    } else {
+        MIRTRACE_RUN ( reads )
+        ch_mirtrace = MIRTRACE_RUN.out.mirtrace
+        ch_versions = ch_versions.mix(MIRTRACE_RUN.out.versions)
+    }
 
     emit:
-    results    = MIRTRACE_RUN.out.mirtrace
-    versions   = MIRTRACE_RUN.out.versions
+    results    = ch_mirtrace
+    versions   = ch_versions
 }
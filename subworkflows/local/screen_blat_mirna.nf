@@ -0,0 +1,22 @@
+//
+// Remove the records of a contamination database that align to miRNA hairpins
+//
+
+include { MIRNA_KMER_SCREEN } from '../../modules/local/mirna_kmer_screen'
+include { BLAT_MIRNA        } from '../../modules/local/blat_mirna'
+
+workflow SCREEN_BLAT_MIRNA {
+    take:
+    db_type      // string: cdna, ncrna or other
+    mirna        // file: hairpin FASTA
+    contaminants // file: contamination database FASTA
+
+    main:
+    // BLAT only needs to check the records sharing hairpin tiles
+    MIRNA_KMER_SCREEN ( db_type, mirna, contaminants )
+    BLAT_MIRNA ( db_type, mirna, MIRNA_KMER_SCREEN.out.screened )
+
+    emit:
+    filtered_set = BLAT_MIRNA.out.filtered_set // channel: filtered.fa
+    versions     = MIRNA_KMER_SCREEN.out.versions.mix(BLAT_MIRNA.out.versions)
+}
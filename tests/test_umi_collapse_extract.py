@@ -0,0 +1,41 @@
+"""Grouping of bin/umi_collapse_extract.py against UMI-tools."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "bin"))
+
+from umi_collapse_extract import group_umis  # noqa: E402
+
+# AAAT is one mismatch from both AAAA and AATT, which are two apart.
+CHAIN = {b"AAAA": 10, b"AAAT": 9, b"AATT": 8}
+
+# Groups UMI-tools 1.1.5 returns for CHAIN, lead UMI first.
+UMI_TOOLS_CHAIN = {
+    "unique": [[b"AAAA"], [b"AAAT"], [b"AATT"]],
+    "cluster": [[b"AAAA", b"AAAT", b"AATT"]],
+    "adjacency": [[b"AAAA"], [b"AAAT", b"AATT"]],
+    "directional": [[b"AAAA"], [b"AAAT"], [b"AATT"]],
+}
+
+
+def as_sizes(groups, counts):
+    return sorted((group[0], sum(counts[umi] for umi in group)) for group in groups)
+
+
+@pytest.mark.parametrize("method", sorted(UMI_TOOLS_CHAIN))
+def test_chain_matches_umi_tools(method):
+    assert sorted(group_umis(CHAIN, method)) == as_sizes(UMI_TOOLS_CHAIN[method], CHAIN)
+
+
+def test_adjacency_keeps_every_read():
+    assert sum(size for _, size in group_umis(CHAIN, "adjacency")) == sum(CHAIN.values())
+
+
+@pytest.mark.parametrize("method", sorted(UMI_TOOLS_CHAIN))
+def test_chain_matches_installed_umi_tools(method):
+    network = pytest.importorskip("umi_tools.network")
+    groups = network.UMIClusterer(cluster_method=method)(CHAIN, threshold=1)
+    assert sorted(group_umis(CHAIN, method)) == as_sizes(groups, CHAIN)
@@ -0,0 +1,159 @@
+import csv
+import os
+import re
+import shutil
+import typing
+from dataclasses import dataclass, field
+from pathlib import Path
+
+# Joins batch and sample names in the combined samplesheet. Sample names
+# cannot contain whitespace, so this never clashes with a real separator.
+separator = "__"
+
+table_delimiters = {".tsv": "\t", ".txt": "\t", ".csv": ","}
+# Larger tables are copied to every batch unsplit.
+max_table_bytes = 1024**3
+
+
+@dataclass
+class Batch:
+    name: str
+    samplesheet: Path
+    outdir: typing.Optional[str] = None
+    # combined sample name -> sample name in the batch's own samplesheet
+    samples: typing.Dict[str, str] = field(default_factory=dict)
+
+
+def batch_names(samplesheets: typing.List[Path]) -> typing.List[str]:
+    """Names derived from the samplesheet file names, made unique and path safe."""
+    names = []
+    for i, samplesheet in enumerate(samplesheets, start=1):
+        name = re.sub(r"[^A-Za-z0-9_-]+", "_", samplesheet.stem).strip("_") or f"batch_{i}"
+        name = name.replace(separator, "_")
+        if name in names:
+            name = f"{name}_{i}"
+        names.append(name)
+    return names
+
+
+def merge_samplesheets(
+    samplesheets: typing.List[Path],
+    outdirs: typing.List[typing.Optional[str]],
+    dest: Path,
+) -> typing.List[Batch]:
+    """Write one samplesheet with the samples of all batches, prefixed with their batch name."""
+    batches = [
+        Batch(name=name, samplesheet=samplesheet, outdir=outdir)
+        for name, samplesheet, outdir in zip(batch_names(samplesheets), samplesheets, outdirs)
+    ]
+
+    columns: typing.List[str] = []
+    rows = []
+    for batch in batches:
+        with open(batch.samplesheet, newline="") as f:
+            reader = csv.DictReader(f)
+            for column in reader.fieldnames or []:
+                if column not in columns:
+                    columns.append(column)
+            for row in reader:
+                sample = row["sample"].strip()
+                combined = f"{batch.name}{separator}{sample}"
+                batch.samples[combined] = sample
+                rows.append({**row, "sample": combined})
+
+    with open(dest, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns, restval="")
+        writer.writeheader()
+        writer.writerows(rows)
+    return batches
+
+
+def match_sample(text: str, names: typing.Iterable[str]) -> typing.Optional[str]:
+    """The longest of `names` that `text` starts with, followed by the end or a separator."""
+    best = None
+    for name in names:
+        if text.startswith(name) and (len(text) == len(name) or not text[len(name)].isalnum()):
+            if best is None or len(name) > len(best):
+                best = name
+    return best
+
+
+def rename(text: str, samples: typing.Dict[str, str]) -> str:
+    for combined in sorted(samples, key=len, reverse=True):
+        text = text.replace(combined, samples[combined])
+    return text
+
+
+def link_or_copy(src: Path, dest: Path) -> None:
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copy2(src, dest)
+
+
+def split_table(src: Path, batches: typing.List[Batch], dests: typing.Dict[str, Path]) -> bool:
+    """Write the columns (or rows) of every batch's samples to that batch's copy of a table.
+
+    Columns and rows that belong to no sample are kept for every batch.
+    Returns False if `src` is not a table with any sample column or row.
+    """
+    delimiter = table_delimiters.get(src.suffix)
+    if delimiter is None or src.stat().st_size > max_table_bytes:
+        return False
+    try:
+        with open(src, newline="") as f:
+            rows = list(csv.reader(f, delimiter=delimiter))
+    except (UnicodeDecodeError, csv.Error):
+        return False
+    if not rows:
+        return False
+
+    owner = {combined: batch.name for batch in batches for combined in batch.samples}
+    column_owner = [owner.get(match_sample(column.strip('"'), owner) or "") for column in rows[0]]
+    row_owner = [owner.get(match_sample(row[0].strip('"'), owner) or "") if row else None for row in rows[1:]]
+    if not any(column_owner) and not any(row_owner):
+        return False
+
+    for batch in batches:
+        keep_columns = [i for i, name in enumerate(column_owner) if name in (None, batch.name)]
+        dest = dests[batch.name]
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        with open(dest, "w", newline="") as f:
+            writer = csv.writer(f, delimiter=delimiter, lineterminator="\n")
+            for row, name in zip(rows, [None, *row_owner]):
+                if name not in (None, batch.name):
+                    continue
+                writer.writerow([rename(row[i], batch.samples) for i in keep_columns if i < len(row)])
+    return True
+
+
+def split_outputs(results: Path, batches: typing.List[Batch], dest: Path) -> typing.Dict[str, Path]:
+    """Split the published results of a combined run into one results tree per batch.
+
+    Files of a single sample go to that sample's batch. Tables with a column
+    or row per sample are split, and every other file, such as the MultiQC
+    report, is given to every batch as is. Combined sample names are turned
+    back into the batch's own names in paths and split tables.
+    """
+    owner = {combined: batch for batch in batches for combined in batch.samples}
+    roots = {batch.name: dest / batch.name for batch in batches}
+
+    for src in sorted(p for p in results.rglob("*") if p.is_file()):
+        relative = src.relative_to(results)
+        sample = None
+        for part in relative.parts:
+            sample = match_sample(part, owner)
+            if sample is not None:
+                break
+
+        if sample is not None:
+            batch = owner[sample]
+            link_or_copy(src, roots[batch.name] / rename(str(relative), batch.samples))
+            continue
+
+        dests = {batch.name: roots[batch.name] / relative for batch in batches}
+        if not split_table(src, batches, dests):
+            for path in dests.values():
+                link_or_copy(src, path)
+    return roots
@@ -3,7 +3,6 @@ from enum import Enum
 import os
 import subprocess
 import requests
-import shutil
 from pathlib import Path
 import typing
 import typing_extensions
@@ -21,24 +20,71 @@ from flytekit.core.annotation import FlyteAnnotation
 
 from latch_cli.services.register.utils import import_module_by_path
 
+from wf.batching import batch_names, merge_samplesheets, split_outputs
+from wf.reference_cache import ReferenceCache, open_backend, override_flags, reference_keys
+from wf.resume_store import ResumeStore, resume_key
+from wf.resource_profile import ResourceHistory, fit_models, nxf_opts, pvc_size_gib, render_config, samplesheet_sizes, trace_name
+from wf.staging import stage_launch_tree
+from wf.telemetry import print_summary, summary_name, timeline_name, write_summary
+
 meta = Path("latch_metadata") / "__init__.py"
 import_module_by_path(meta)
 import latch_metadata
 
+def load_resource_models(resource_history: typing.Optional[LatchDir], scratch: Path):
+    if resource_history is None:
+        return None, {}
+
+    history = ResourceHistory(open_backend(resource_history.remote_path or str(resource_history.path)))
+    runs = history.load(scratch)
+    models = fit_models(runs)
+    print(f"Fitted resource models for {len(models)} processes from {len(runs)} earlier runs")
+    return history, models
+
+
+def open_resume_store(resume_store: typing.Optional[LatchDir], max_gib: typing.Optional[int]) -> typing.Optional[ResumeStore]:
+    if resume_store is None:
+        return None
+
+    return ResumeStore(
+        open_backend(resume_store.remote_path or str(resume_store.path)),
+        max_bytes=(max_gib or 500) * 1024**3,
+    )
+
+
+def batch_samplesheets(input: LatchFile, batch_inputs: typing.Optional[typing.List[LatchFile]]) -> typing.List[Path]:
+    return [Path(sheet.local_path) for sheet in [input, *(batch_inputs or [])]]
+
+
 @custom_task(cpu=0.25, memory=0.5, storage_gib=1)
-def initialize() -> str:
+def initialize(input: LatchFile, batch_inputs: typing.Optional[typing.List[LatchFile]], resource_history: typing.Optional[LatchDir], resume_store: typing.Optional[LatchDir], resume_store_max_gib: typing.Optional[int]) -> str:
     token = os.environ.get("FLYTE_INTERNAL_EXECUTION_ID")
     if token is None:
         raise RuntimeError("failed to get execution token")
 
     headers = {"Authorization": f"Latch-Execution-Token {token}"}
 
-    print("Provisioning shared storage volume... ", end="")
+    # Sample names only need to be unique within a batch. Sizes are only
+    # needed by the models, so the FASTQs are not looked up without history.
+    sample_sizes = {}
+    if resource_history is not None:
+        sample_sizes = {
+            (i, sample): size
+            for i, samplesheet in enumerate(batch_samplesheets(input, batch_inputs))
+            for sample, size in samplesheet_sizes(samplesheet).items()
+        }
+    _, models = load_resource_models(resource_history, Path("resource_history"))
+    storage_gib = pvc_size_gib(models, sample_sizes)
+    resume = open_resume_store(resume_store, resume_store_max_gib)
+    if resume is not None:
+        storage_gib += resume.reserve_gib()
+
+    print(f"Provisioning shared storage volume of {storage_gib} GiB for {len(sample_sizes)} samples... ", end="")
     resp = requests.post(
         "http://nf-dispatcher-service.flyte.svc.cluster.local/provision-storage",
         headers=headers,
         json={
-            "storage_gib": 100,
+            "storage_gib": storage_gib,
         }
     )
     resp.raise_for_status()
@@ -52,32 +98,36 @@ def initialize() -> str:
 
 
 @nextflow_runtime_task(cpu=4, memory=8, storage_gib=100)
-def nextflow_runtime(pvc_name: str, input: LatchFile, outdir: typing_extensions.Annotated[LatchDir, FlyteAnnotation({'output': True})], email: typing.Optional[str], multiqc_title: typing.Optional[str], with_umi: typing.Optional[bool], umitools_bc_pattern: typing.Optional[str], umi_discard_read: typing.Optional[int], save_umi_intermeds: typing.Optional[bool], genome: typing.Optional[str], mirgenedb: typing.Optional[bool], mirtrace_species: typing.Optional[str], mirgenedb_species: typing.Optional[str], fasta: typing.Optional[LatchFile], mirna_gtf: typing.Optional[str], mirgenedb_gff: typing.Optional[str], mirgenedb_mature: typing.Optional[str], mirgenedb_hairpin: typing.Optional[str], bowtie_index: typing.Optional[str], save_reference: typing.Optional[bool], save_aligned: typing.Optional[bool], clip_r1: typing.Optional[int], three_prime_clip_r1: typing.Optional[int], save_trimmed_fail: typing.Optional[bool], fastp_known_mirna_adapters: typing.Optional[LatchFile], filter_contamination: typing.Optional[bool], rrna: typing.Optional[LatchFile], trna: typing.Optional[LatchFile], cdna: typing.Optional[LatchFile], ncrna: typing.Optional[LatchFile], pirna: typing.Optional[LatchFile], other_contamination: typing.Optional[LatchFile], skip_fastqc: typing.Optional[bool], skip_mirdeep: typing.Optional[bool], skip_multiqc: typing.Optional[bool], skip_fastp: typing.Optional[bool], multiqc_methods_description: typing.Optional[str], protocol: typing.Optional[str], umitools_extract_method: typing.Optional[str], umitools_method: typing.Optional[str], skip_umi_extract_before_dedup: typing.Optional[bool], mature: typing.Optional[str], hairpin: typing.Optional[str], save_aligned_mirna_quant: typing.Optional[bool], three_prime_adapter: typing.Optional[str], trim_fastq: typing.Optional[bool], fastp_min_length: typing.Optional[int], fastp_max_length: typing.Optional[int], min_trimmed_reads: typing.Optional[int], save_merged: typing.Optional[bool], phred_offset: typing.Optional[int]) -> None:
+def nextflow_runtime(pvc_name: str, input: LatchFile, outdir: typing_extensions.Annotated[LatchDir, FlyteAnnotation({'output': True})], email: typing.Optional[str], multiqc_title: typing.Optional[str], with_umi: typing.Optional[bool], umitools_bc_pattern: typing.Optional[str], umi_discard_read: typing.Optional[int], save_umi_intermeds: typing.Optional[bool], umi_single_pass: typing.Optional[bool], genome: typing.Optional[str], mirgenedb: typing.Optional[bool], mirtrace_species: typing.Optional[str], mirgenedb_species: typing.Optional[str], fasta: typing.Optional[LatchFile], mirna_gtf: typing.Optional[str], mirgenedb_gff: typing.Optional[str], mirgenedb_mature: typing.Optional[str], mirgenedb_hairpin: typing.Optional[str], bowtie_index: typing.Optional[str], save_reference: typing.Optional[bool], save_aligned: typing.Optional[bool], clip_r1: typing.Optional[int], three_prime_clip_r1: typing.Optional[int], save_trimmed_fail: typing.Optional[bool], fastp_known_mirna_adapters: typing.Optional[LatchFile], filter_contamination: typing.Optional[bool], rrna: typing.Optional[LatchFile], trna: typing.Optional[LatchFile], cdna: typing.Optional[LatchFile], ncrna: typing.Optional[LatchFile], pirna: typing.Optional[LatchFile], other_contamination: typing.Optional[LatchFile], contaminant_single_pass: typing.Optional[bool], mirtop_shard_size: typing.Optional[int], mirtrace_batch_size: typing.Optional[int], skip_fastqc: typing.Optional[bool], skip_mirdeep: typing.Optional[bool], skip_multiqc: typing.Optional[bool], skip_fastp: typing.Optional[bool], multiqc_methods_description: typing.Optional[str], protocol: typing.Optional[str], umitools_extract_method: typing.Optional[str], umitools_method: typing.Optional[str], skip_umi_extract_before_dedup: typing.Optional[bool], mature: typing.Optional[str], hairpin: typing.Optional[str], save_aligned_mirna_quant: typing.Optional[bool], three_prime_adapter: typing.Optional[str], trim_fastq: typing.Optional[bool], fastp_min_length: typing.Optional[int], fastp_max_length: typing.Optional[int], min_trimmed_reads: typing.Optional[int], precheck_min_reads: typing.Optional[int], precheck_min_distinct: typing.Optional[int], save_merged: typing.Optional[bool], phred_offset: typing.Optional[int], read_qc: typing.Optional[str], reference_cache: typing.Optional[LatchDir], reference_cache_max_gib: typing.Optional[int], resource_history: typing.Optional[LatchDir], resume_store: typing.Optional[LatchDir], resume_store_max_gib: typing.Optional[int], batch_inputs: typing.Optional[typing.List[LatchFile]], batch_outdirs: typing.Optional[typing.List[LatchDir]]) -> None:
+    history = None
+    trace_file = None
+    resume = None
     try:
         shared_dir = Path("/nf-workdir")
 
+        batches = []
+        input_sheet = Path(input.local_path)
+        if batch_inputs:
+            samplesheets = batch_samplesheets(input, batch_inputs)
+            if len(batch_outdirs or []) > len(samplesheets):
+                raise ValueError(f"{len(batch_outdirs)} batch output directories given for {len(samplesheets)} samplesheets")
+            outdirs = [d.remote_path for d in batch_outdirs or []]
+            outdirs += [urljoins(outdir.remote_path, name) for name in batch_names(samplesheets)[len(outdirs):]]
+            input_sheet = shared_dir / "batch_samplesheet.csv"
+            batches = merge_samplesheets(samplesheets, outdirs, input_sheet)
+            print(f"Running {len(batches)} batches with {sum(len(b.samples) for b in batches)} samples in one execution")
 
-
-        ignore_list = [
-            "latch",
-            ".latch",
-            "nextflow",
-            ".nextflow",
-            "work",
-            "results",
-            "miniconda",
-            "anaconda3",
-            "mambaforge",
-        ]
-
-        shutil.copytree(
-            Path("/root"),
-            shared_dir,
-            ignore=lambda src, names: ignore_list,
-            ignore_dangling_symlinks=True,
-            dirs_exist_ok=True,
+        sample_sizes = samplesheet_sizes(input_sheet) if resource_history is not None else {}
+        history, models = load_resource_models(resource_history, Path("resource_history"))
+        trace_file = shared_dir / trace_name
+        (shared_dir / "resources.config").write_text(
+            render_config(models, sample_sizes, trace_file)
         )
 
+        print("Staging pipeline files... ", end="", flush=True)
+        stats = stage_launch_tree(Path("/root"), shared_dir)
+        print(f"Done. {stats.files} files, {stats.bytes} bytes in {stats.seconds:.2f}s")
+
         cmd = [
             "/root/nextflow",
             "run",
@@ -88,6 +138,10 @@ def nextflow_runtime(pvc_name: str, input: LatchFile, outdir: typing_extensions.
             "docker",
             "-c",
             "latch.config",
+            "-c",
+            "resources.config",
+            "-with-timeline",
+            str(shared_dir / timeline_name),
                 *get_flag('input', input),
                 *get_flag('protocol', protocol),
                 *get_flag('outdir', outdir),
@@ -100,6 +154,7 @@ def nextflow_runtime(pvc_name: str, input: LatchFile, outdir: typing_extensions.
                 *get_flag('umitools_bc_pattern', umitools_bc_pattern),
                 *get_flag('umi_discard_read', umi_discard_read),
                 *get_flag('save_umi_intermeds', save_umi_intermeds),
+                *get_flag('umi_single_pass', umi_single_pass),
                 *get_flag('genome', genome),
                 *get_flag('mirgenedb', mirgenedb),
                 *get_flag('mirtrace_species', mirtrace_species),
@@ -124,6 +179,8 @@ def nextflow_runtime(pvc_name: str, input: LatchFile, outdir: typing_extensions.
                 *get_flag('save_trimmed_fail', save_trimmed_fail),
                 *get_flag('fastp_known_mirna_adapters', fastp_known_mirna_adapters),
                 *get_flag('min_trimmed_reads', min_trimmed_reads),
+                *get_flag('precheck_min_reads', precheck_min_reads),
+                *get_flag('precheck_min_distinct', precheck_min_distinct),
                 *get_flag('save_merged', save_merged),
                 *get_flag('phred_offset', phred_offset),
                 *get_flag('filter_contamination', filter_contamination),
@@ -133,13 +190,83 @@ def nextflow_runtime(pvc_name: str, input: LatchFile, outdir: typing_extensions.
                 *get_flag('ncrna', ncrna),
                 *get_flag('pirna', pirna),
                 *get_flag('other_contamination', other_contamination),
+                *get_flag('contaminant_single_pass', contaminant_single_pass),
+                *get_flag('mirtop_shard_size', mirtop_shard_size),
+                *get_flag('mirtrace_batch_size', mirtrace_batch_size),
                 *get_flag('skip_fastqc', skip_fastqc),
+                *get_flag('read_qc', read_qc),
                 *get_flag('skip_mirdeep', skip_mirdeep),
                 *get_flag('skip_multiqc', skip_multiqc),
                 *get_flag('skip_fastp', skip_fastp),
                 *get_flag('multiqc_methods_description', multiqc_methods_description)
         ]
 
+        ref_cache = None
+        ref_keys = {}
+        ref_misses = {}
+        if reference_cache is not None:
+            ref_cache = ReferenceCache(
+                open_backend(reference_cache.remote_path or str(reference_cache.path)),
+                max_bytes=(reference_cache_max_gib or 200) * 1024**3,
+            )
+            ref_keys = reference_keys(
+                shared_dir,
+                mature=mirgenedb_mature if mirgenedb else mature,
+                hairpin=mirgenedb_hairpin if mirgenedb else hairpin,
+                species=mirgenedb_species if mirgenedb else mirtrace_species,
+                genome=genome,
+                mirgenedb=bool(mirgenedb),
+                fasta=fasta.remote_path if fasta is not None and bowtie_index is None else None,
+                contaminants={
+                    db_type: db.remote_path if filter_contamination and db is not None else None
+                    for db_type, db in [
+                        ("rrna", rrna),
+                        ("trna", trna),
+                        ("cdna", cdna),
+                        ("ncrna", ncrna),
+                        ("pirna", pirna),
+                        ("other", other_contamination),
+                    ]
+                },
+                contaminants_combined=bool(contaminant_single_pass),
+            )
+
+            references_dir = shared_dir / "references"
+            overrides = {}
+            for component, key in ref_keys.items():
+                dest = references_dir / component
+                if not ref_cache.get(key, dest):
+                    print(f"Reference cache miss: {component} ({key})")
+                    ref_misses[component] = key
+                    continue
+
+                print(f"Reference cache hit: {component} ({key})")
+                if component == "mirna":
+                    overrides["mirna_index"] = str(dest)
+                elif component == "genome":
+                    overrides["fasta"] = str(dest / "genome.edited.fa")
+                    overrides["bowtie_index"] = f"{dest}/"
+                else:
+                    overrides["contaminant_index"] = str(references_dir / "contaminants")
+
+            if ref_misses:
+                overrides["reference_cache_outdir"] = str(shared_dir / "reference_cache_outdir")
+            cmd = override_flags(cmd, overrides)
+
+        if batches:
+            cmd = override_flags(cmd, {"input": str(input_sheet), "outdir": str(shared_dir / "batch_results")})
+
+        resume = open_resume_store(resume_store, resume_store_max_gib)
+        if resume is not None:
+            # After all overrides, so that the key sees the parameters Nextflow is run with
+            resume_entry = resume_key(shared_dir, cmd, input_sheet)
+            resume.gc()
+            if resume.restore(resume_entry, shared_dir):
+                print(f"Resuming from stored execution ({resume_entry})")
+                cmd.insert(3, "-resume")
+            else:
+                print(f"No stored execution to resume ({resume_entry})")
+
         print("Launching Nextflow Runtime")
         print(' '.join(cmd))
         print(flush=True)
@@ -147,7 +274,7 @@ def nextflow_runtime(pvc_name: str, input: LatchFile, outdir: typing_extensions.
         env = {
             **os.environ,
             "NXF_HOME": "/root/.nextflow",
-            "NXF_OPTS": "-Xms2048M -Xmx8G -XX:ActiveProcessorCount=4",
+            "NXF_OPTS": nxf_opts(models, sample_sizes),
             "K8S_STORAGE_CLAIM_NAME": pvc_name,
             "NXF_DISABLE_CHECK_LATEST": "true",
         }
@@ -157,6 +284,17 @@ def nextflow_runtime(pvc_name: str, input: LatchFile, outdir: typing_extensions.
             check=True,
             cwd=str(shared_dir),
         )
+
+        for component, key in ref_misses.items():
+            built = shared_dir / "reference_cache_outdir" / component
+            if built.is_dir() and ref_cache.put(key, built, component):
+                print(f"Stored {component} in reference cache ({key})")
+
+        if batches:
+            roots = split_outputs(shared_dir / "batch_results", batches, shared_dir / "batch_outputs")
+            for batch in batches:
+                print(f"Uploading results of batch {batch.name} ({len(batch.samples)} samples) to {batch.outdir}")
+                LPath(batch.outdir).upload_from(roots[batch.name])
     finally:
         print()
 
@@ -170,16 +308,39 @@ def nextflow_runtime(pvc_name: str, input: LatchFile, outdir: typing_extensions.
                 print(f"Uploading .nextflow.log to {remote.path}")
                 remote.upload_from(nextflow_log)
 
+                if trace_file is not None and trace_file.exists():
+                    try:
+                        summary = write_summary(trace_file, shared_dir / summary_name)
+                        print_summary(summary)
+                        for local in (shared_dir / summary_name, shared_dir / timeline_name, trace_file):
+                            if local.exists():
+                                remote = LPath(urljoins("latch:///your_log_dir/nf_nf_core_smrnaseq", name, local.name))
+                                print(f"Uploading {local.name} to {remote.path}")
+                                remote.upload_from(local)
+                    except Exception as e:
+                        print(f"Failed to summarize the execution trace: {e}")
+
+                if resume is not None and trace_file is not None and trace_file.exists():
+                    print(f"Saving Nextflow cache and work directories for resume ({resume_entry})")
+                    try:
+                        resume.save(resume_entry, shared_dir, trace_file)
+                    except Exception as e:
+                        print(f"Failed to save the resume entry: {e}")
+
+                if history is not None and trace_file is not None and trace_file.exists():
+                    print(f"Adding trace to resource history ({name})")
+                    history.add(name, trace_file, sample_sizes, Path("resource_history"))
+
 
 
 @workflow(metadata._nextflow_metadata)
-def nf_nf_core_smrnaseq(input: LatchFile, outdir: typing_extensions.Annotated[LatchDir, FlyteAnnotation({'output': True})], email: typing.Optional[str], multiqc_title: typing.Optional[str], with_umi: typing.Optional[bool], umitools_bc_pattern: typing.Optional[str], umi_discard_read: typing.Optional[int], save_umi_intermeds: typing.Optional[bool], genome: typing.Optional[str], mirgenedb: typing.Optional[bool], mirtrace_species: typing.Optional[str], mirgenedb_species: typing.Optional[str], fasta: typing.Optional[LatchFile], mirna_gtf: typing.Optional[str], mirgenedb_gff: typing.Optional[str], mirgenedb_mature: typing.Optional[str], mirgenedb_hairpin: typing.Optional[str], bowtie_index: typing.Optional[str], save_reference: typing.Optional[bool], save_aligned: typing.Optional[bool], clip_r1: typing.Optional[int], three_prime_clip_r1: typing.Optional[int], save_trimmed_fail: typing.Optional[bool], fastp_known_mirna_adapters: typing.Optional[LatchFile], filter_contamination: typing.Optional[bool], rrna: typing.Optional[LatchFile], trna: typing.Optional[LatchFile], cdna: typing.Optional[LatchFile], ncrna: typing.Optional[LatchFile], pirna: typing.Optional[LatchFile], other_contamination: typing.Optional[LatchFile], skip_fastqc: typing.Optional[bool], skip_mirdeep: typing.Optional[bool], skip_multiqc: typing.Optional[bool], skip_fastp: typing.Optional[bool], multiqc_methods_description: typing.Optional[str], protocol: typing.Optional[str] = 'illumina', umitools_extract_method: typing.Optional[str] = 'string', umitools_method: typing.Optional[str] = 'dir', skip_umi_extract_before_dedup: typing.Optional[bool] = True, mature: typing.Optional[str] = 'https://mirbase.org/download/mature.fa', hairpin: typing.Optional[str] = 'https://mirbase.org/download/hairpin.fa', save_aligned_mirna_quant: typing.Optional[bool] = True, three_prime_adapter: typing.Optional[str] = 'AGATCGGAAGAGCACACGTCTGAACTCCAGTCA', trim_fastq: typing.Optional[bool] = True, fastp_min_length: typing.Optional[int] = 17, fastp_max_length: typing.Optional[int] = 100, min_trimmed_reads: typing.Optional[int] = 10, save_merged: typing.Optional[bool] = True, phred_offset: typing.Optional[int] = 33) -> None:
+def nf_nf_core_smrnaseq(input: LatchFile, outdir: typing_extensions.Annotated[LatchDir, FlyteAnnotation({'output': True})], email: typing.Optional[str], multiqc_title: typing.Optional[str], with_umi: typing.Optional[bool], umitools_bc_pattern: typing.Optional[str], umi_discard_read: typing.Optional[int], save_umi_intermeds: typing.Optional[bool], umi_single_pass: typing.Optional[bool], genome: typing.Optional[str], mirgenedb: typing.Optional[bool], mirtrace_species: typing.Optional[str], mirgenedb_species: typing.Optional[str], fasta: typing.Optional[LatchFile], mirna_gtf: typing.Optional[str], mirgenedb_gff: typing.Optional[str], mirgenedb_mature: typing.Optional[str], mirgenedb_hairpin: typing.Optional[str], bowtie_index: typing.Optional[str], save_reference: typing.Optional[bool], save_aligned: typing.Optional[bool], clip_r1: typing.Optional[int], three_prime_clip_r1: typing.Optional[int], save_trimmed_fail: typing.Optional[bool], fastp_known_mirna_adapters: typing.Optional[LatchFile], filter_contamination: typing.Optional[bool], rrna: typing.Optional[LatchFile], trna: typing.Optional[LatchFile], cdna: typing.Optional[LatchFile], ncrna: typing.Optional[LatchFile], pirna: typing.Optional[LatchFile], other_contamination: typing.Optional[LatchFile], contaminant_single_pass: typing.Optional[bool], mirtop_shard_size: typing.Optional[int], mirtrace_batch_size: typing.Optional[int], skip_fastqc: typing.Optional[bool], skip_mirdeep: typing.Optional[bool], skip_multiqc: typing.Optional[bool], skip_fastp: typing.Optional[bool], multiqc_methods_description: typing.Optional[str], protocol: typing.Optional[str] = 'illumina', umitools_extract_method: typing.Optional[str] = 'string', umitools_method: typing.Optional[str] = 'dir', skip_umi_extract_before_dedup: typing.Optional[bool] = True, mature: typing.Optional[str] = 'https://mirbase.org/download/mature.fa', hairpin: typing.Optional[str] = 'https://mirbase.org/download/hairpin.fa', save_aligned_mirna_quant: typing.Optional[bool] = True, three_prime_adapter: typing.Optional[str] = 'AGATCGGAAGAGCACACGTCTGAACTCCAGTCA', trim_fastq: typing.Optional[bool] = True, fastp_min_length: typing.Optional[int] = 17, fastp_max_length: typing.Optional[int] = 100, min_trimmed_reads: typing.Optional[int] = 10, precheck_min_reads: typing.Optional[int] = 0, precheck_min_distinct: typing.Optional[int] = 0, save_merged: typing.Optional[bool] = True, phred_offset: typing.Optional[int] = 33, read_qc: typing.Optional[str] = 'fastqc', reference_cache: typing.Optional[LatchDir] = None, reference_cache_max_gib: typing.Optional[int] = 200, resource_history: typing.Optional[LatchDir] = None, resume_store: typing.Optional[LatchDir] = None, resume_store_max_gib: typing.Optional[int] = 500, batch_inputs: typing.Optional[typing.List[LatchFile]] = None, batch_outdirs: typing.Optional[typing.List[LatchDir]] = None) -> None:
     """
     nf-core/smrnaseq
 
     Sample Description
     """
 
-    pvc_name: str = initialize()
-    nextflow_runtime(pvc_name=pvc_name, input=input, protocol=protocol, outdir=outdir, email=email, multiqc_title=multiqc_title, with_umi=with_umi, umitools_extract_method=umitools_extract_method, umitools_method=umitools_method, skip_umi_extract_before_dedup=skip_umi_extract_before_dedup, umitools_bc_pattern=umitools_bc_pattern, umi_discard_read=umi_discard_read, save_umi_intermeds=save_umi_intermeds, genome=genome, mirgenedb=mirgenedb, mirtrace_species=mirtrace_species, mirgenedb_species=mirgenedb_species, fasta=fasta, mirna_gtf=mirna_gtf, mirgenedb_gff=mirgenedb_gff, mature=mature, mirgenedb_mature=mirgenedb_mature, hairpin=hairpin, mirgenedb_hairpin=mirgenedb_hairpin, bowtie_index=bowtie_index, save_reference=save_reference, save_aligned=save_aligned, save_aligned_mirna_quant=save_aligned_mirna_quant, clip_r1=clip_r1, three_prime_clip_r1=three_prime_clip_r1, three_prime_adapter=three_prime_adapter, trim_fastq=trim_fastq, fastp_min_length=fastp_min_length, fastp_max_length=fastp_max_length, save_trimmed_fail=save_trimmed_fail, fastp_known_mirna_adapters=fastp_known_mirna_adapters, min_trimmed_reads=min_trimmed_reads, save_merged=save_merged, phred_offset=phred_offset, filter_contamination=filter_contamination, rrna=rrna, trna=trna, cdna=cdna, ncrna=ncrna, pirna=pirna, other_contamination=other_contamination, skip_fastqc=skip_fastqc, skip_mirdeep=skip_mirdeep, skip_multiqc=skip_multiqc, skip_fastp=skip_fastp, multiqc_methods_description=multiqc_methods_description)
+    pvc_name: str = initialize(input=input, batch_inputs=batch_inputs, resource_history=resource_history, resume_store=resume_store, resume_store_max_gib=resume_store_max_gib)
+    nextflow_runtime(pvc_name=pvc_name, input=input, protocol=protocol, outdir=outdir, email=email, multiqc_title=multiqc_title, with_umi=with_umi, umitools_extract_method=umitools_extract_method, umitools_method=umitools_method, skip_umi_extract_before_dedup=skip_umi_extract_before_dedup, umitools_bc_pattern=umitools_bc_pattern, umi_discard_read=umi_discard_read, save_umi_intermeds=save_umi_intermeds, umi_single_pass=umi_single_pass, genome=genome, mirgenedb=mirgenedb, mirtrace_species=mirtrace_species, mirgenedb_species=mirgenedb_species, fasta=fasta, mirna_gtf=mirna_gtf, mirgenedb_gff=mirgenedb_gff, mature=mature, mirgenedb_mature=mirgenedb_mature, hairpin=hairpin, mirgenedb_hairpin=mirgenedb_hairpin, bowtie_index=bowtie_index, save_reference=save_reference, save_aligned=save_aligned, save_aligned_mirna_quant=save_aligned_mirna_quant, clip_r1=clip_r1, three_prime_clip_r1=three_prime_clip_r1, three_prime_adapter=three_prime_adapter, trim_fastq=trim_fastq, fastp_min_length=fastp_min_length, fastp_max_length=fastp_max_length, save_trimmed_fail=save_trimmed_fail, fastp_known_mirna_adapters=fastp_known_mirna_adapters, min_trimmed_reads=min_trimmed_reads, precheck_min_reads=precheck_min_reads, precheck_min_distinct=precheck_min_distinct, save_merged=save_merged, phred_offset=phred_offset, read_qc=read_qc, filter_contamination=filter_contamination, rrna=rrna, trna=trna, cdna=cdna, ncrna=ncrna, pirna=pirna, other_contamination=other_contamination, contaminant_single_pass=contaminant_single_pass, mirtop_shard_size=mirtop_shard_size, mirtrace_batch_size=mirtrace_batch_size, skip_fastqc=skip_fastqc, skip_mirdeep=skip_mirdeep, skip_multiqc=skip_multiqc, skip_fastp=skip_fastp, multiqc_methods_description=multiqc_methods_description, reference_cache=reference_cache, reference_cache_max_gib=reference_cache_max_gib, resource_history=resource_history, resume_store=resume_store, resume_store_max_gib=resume_store_max_gib, batch_inputs=batch_inputs, batch_outdirs=batch_outdirs)
 
@@ -0,0 +1,289 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import typing
+from pathlib import Path
+
+import requests
+
+index_name = "index.json"
+
+# Module sources that build each cached component. Their content is part of
+# the cache key, so a tool version bump or script change invalidates entries.
+component_modules = {
+    "mirna": [
+        "modules/local/parse_fasta_mirna.nf",
+        "bin/parse_mirna_fasta.py",
+        "modules/local/bowtie_mirna.nf",
+    ],
+    "genome": [
+        "modules/local/bowtie_genome.nf",
+    ],
+    "contaminants": [
+        "modules/local/mirna_kmer_screen.nf",
+        "bin/mirna_kmer_screen.py",
+        "modules/local/blat_mirna.nf",
+        "modules/local/bowtie_contaminants.nf",
+        "modules/local/bowtie_contaminants_combined.nf",
+    ],
+}
+
+# Contaminant databases that are cleaned of miRNA hairpins with BLAT first
+blat_filtered_types = {"cdna", "ncrna", "pirna", "other"}
+
+
+def dir_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+class LocalDirectoryBackend:
+    """Keeps every entry as a plain directory below `root`."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def load_index(self) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+        try:
+            return json.loads((self.root / index_name).read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def save_index(self, index: typing.Dict[str, typing.Dict[str, typing.Any]]) -> None:
+        tmp = self.root / f".{index_name}.tmp"
+        tmp.write_text(json.dumps(index, indent=2, sort_keys=True))
+        os.replace(tmp, self.root / index_name)
+
+    def fetch(self, key: str, dest: Path) -> bool:
+        src = self.root / key
+        if not src.is_dir():
+            return False
+        shutil.copytree(src, dest, dirs_exist_ok=True)
+        return True
+
+    def store(self, key: str, src: Path) -> None:
+        tmp = self.root / f".{key}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        shutil.copytree(src, tmp)
+        shutil.rmtree(self.root / key, ignore_errors=True)
+        os.replace(tmp, self.root / key)
+
+    def delete(self, key: str) -> None:
+        shutil.rmtree(self.root / key, ignore_errors=True)
+
+
+class LatchBackend:
+    """Keeps every entry as a directory below a `latch://` location."""
+
+    def __init__(self, root: str):
+        from latch.ldata.path import LPath
+
+        self.root = LPath(root.rstrip("/"))
+
+    def load_index(self) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+        try:
+            local = (self.root / index_name).download()
+            return json.loads(local.read_text())
+        except Exception:
+            return {}
+
+    def save_index(self, index: typing.Dict[str, typing.Dict[str, typing.Any]]) -> None:
+        local = Path(".reference_cache_index.json")
+        local.write_text(json.dumps(index, indent=2, sort_keys=True))
+        (self.root / index_name).upload_from(local)
+
+    def fetch(self, key: str, dest: Path) -> bool:
+        try:
+            (self.root / key).download(dest)
+        except Exception as e:
+            print(f"Failed to fetch reference cache entry {key}: {e}")
+            return False
+        return True
+
+    def store(self, key: str, src: Path) -> None:
+        (self.root / key).upload_from(src)
+
+    def delete(self, key: str) -> None:
+        try:
+            (self.root / key).rmr()
+        except Exception as e:
+            print(f"Failed to delete reference cache entry {key}: {e}")
+
+
+def open_backend(location: str):
+    if location.startswith("latch://"):
+        return LatchBackend(location)
+    if location.startswith("file://"):
+        location = location[len("file://") :]
+    return LocalDirectoryBackend(Path(location))
+
+
+class ReferenceCache:
+    """Content-addressed store of prebuilt references with LRU eviction.
+
+    The index maps each key to its size and last use time. Entries are
+    evicted least-recently-used first whenever storing a new entry would
+    exceed `max_bytes`.
+    """
+
+    def __init__(self, backend, max_bytes: int):
+        self.backend = backend
+        self.max_bytes = max_bytes
+
+    def get(self, key: str, dest: Path) -> bool:
+        index = self.backend.load_index()
+        if key not in index:
+            return False
+
+        if not self.backend.fetch(key, dest):
+            del index[key]
+            self.backend.save_index(index)
+            return False
+
+        index[key]["last_used"] = time.time()
+        self.backend.save_index(index)
+        return True
+
+    def put(self, key: str, src: Path, component: str) -> bool:
+        index = self.backend.load_index()
+        if key in index:
+            return False
+
+        size = dir_size(src)
+        if size == 0 or size > self.max_bytes:
+            return False
+
+        for victim in self.eviction_order(index, size):
+            self.backend.delete(victim)
+            del index[victim]
+
+        self.backend.store(key, src)
+        index[key] = {
+            "component": component,
+            "size": size,
+            "created": time.time(),
+            "last_used": time.time(),
+        }
+        self.backend.save_index(index)
+        return True
+
+    def eviction_order(self, index: typing.Dict[str, typing.Dict[str, typing.Any]], incoming: int) -> typing.List[str]:
+        used = sum(e["size"] for e in index.values())
+        victims = []
+        for key, entry in sorted(index.items(), key=lambda kv: kv[1]["last_used"]):
+            if used + incoming <= self.max_bytes:
+                break
+            victims.append(key)
+            used -= entry["size"]
+        return victims
+
+
+def file_checksum(location: str) -> str:
+    """sha256 of a local file, an http(s) URL or a `latch://` file."""
+    h = hashlib.sha256()
+
+    if location.startswith("http://") or location.startswith("https://"):
+        with requests.get(location, stream=True) as resp:
+            resp.raise_for_status()
+            for block in resp.iter_content(chunk_size=1 << 20):
+                h.update(block)
+        return h.hexdigest()
+
+    if location.startswith("latch://"):
+        from latch.ldata.path import LPath
+
+        location = str(LPath(location).download())
+
+    with open(location, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def component_key(pipeline_root: Path, component: str, parts: typing.Dict[str, typing.Any]) -> str:
+    h = hashlib.sha256()
+    h.update(component.encode())
+    for module in component_modules[component.split("/")[0]]:
+        h.update((pipeline_root / module).read_bytes())
+    h.update(json.dumps(parts, sort_keys=True).encode())
+    return f"{component.replace('/', '_')}-{h.hexdigest()[:32]}"
+
+
+def reference_keys(
+    pipeline_root: Path,
+    *,
+    mature: typing.Optional[str],
+    hairpin: typing.Optional[str],
+    species: typing.Optional[str],
+    genome: typing.Optional[str],
+    mirgenedb: bool,
+    fasta: typing.Optional[str],
+    contaminants: typing.Dict[str, typing.Optional[str]],
+    contaminants_combined: bool = False,
+) -> typing.Dict[str, str]:
+    """Cache key for every reference component that this run would build.
+
+    Components whose inputs cannot be pinned down before launch (e.g. a
+    species only resolved from iGenomes) are left out and always built.
+    """
+    keys = {}
+    checksums: typing.Dict[str, str] = {}
+
+    def checksum(location: str) -> str:
+        if location not in checksums:
+            checksums[location] = file_checksum(location)
+        return checksums[location]
+
+    if mature is not None and hairpin is not None and (species is not None or genome is not None):
+        keys["mirna"] = component_key(
+            pipeline_root,
+            "mirna",
+            {
+                "mature": checksum(mature),
+                "hairpin": checksum(hairpin),
+                "species": species,
+                "genome": genome,
+                "mirgenedb": mirgenedb,
+            },
+        )
+
+    if fasta is not None:
+        keys["genome"] = component_key(pipeline_root, "genome", {"fasta": checksum(fasta)})
+
+    dbs = {db_type: db for db_type, db in contaminants.items() if db is not None}
+    if any(db_type in blat_filtered_types for db_type in dbs) and hairpin is None:
+        dbs = {db_type: db for db_type, db in dbs.items() if db_type not in blat_filtered_types}
+
+    if contaminants_combined and dbs:
+        parts = {db_type: checksum(db) for db_type, db in dbs.items()}
+        if dbs.keys() & blat_filtered_types:
+            parts["hairpin"] = checksum(hairpin)
+        keys["contaminants/combined"] = component_key(pipeline_root, "contaminants/combined", parts)
+    else:
+        for db_type, db in dbs.items():
+            parts = {"db": checksum(db)}
+            if db_type in blat_filtered_types:
+                parts["hairpin"] = checksum(hairpin)
+            keys[f"contaminants/{db_type}"] = component_key(pipeline_root, f"contaminants/{db_type}", parts)
+
+    return keys
+
+
+def override_flags(cmd: typing.List[str], overrides: typing.Dict[str, str]) -> typing.List[str]:
+    """Replace (or add) `--name value` pairs in a Nextflow command line."""
+    out = []
+    skip = False
+    for i, arg in enumerate(cmd):
+        if skip:
+            skip = False
+            continue
+        if arg.startswith("--") and arg[2:] in overrides:
+            skip = i + 1 < len(cmd) and not cmd[i + 1].startswith("--")
+            continue
+        out.append(arg)
+
+    for name, value in overrides.items():
+        out.extend([f"--{name}", value])
+    return out
@@ -0,0 +1,330 @@
+import csv
+import json
+import math
+import os
+import re
+import shutil
+import time
+import typing
+from dataclasses import dataclass
+from pathlib import Path
+
+import requests
+
+# Trace written by every run and read back by later runs. `raw` keeps memory
+# in bytes, times in milliseconds and %cpu as a plain number.
+trace_name = "resource_trace.txt"
+trace_fields = [
+    "task_id",
+    "hash",
+    "name",
+    "process",
+    "tag",
+    "status",
+    "exit",
+    "cpus",
+    "memory",
+    "%cpu",
+    "peak_rss",
+    "rchar",
+    "wchar",
+    "realtime",
+    "duration",
+    "submit",
+    "start",
+    "complete",
+]
+run_record_name = "run.json"
+
+gib = 1024**3
+
+# Without history the PVC and the Nextflow head keep the sizes used before
+# resource profiling. With history the PVC holds a fixed amount for references
+# and containers on top of what the modelled processes are expected to write.
+default_storage_gib = 100
+default_nxf_opts = "-Xms2048M -Xmx8G -XX:ActiveProcessorCount=4"
+disk_base_gib = 20
+min_disk_gib = 20
+max_disk_gib = 4000
+disk_headroom = 1.25
+
+memory_headroom = 1.25
+min_memory_gib = 1
+cpu_headroom = 1.25
+# Fewer points than this and a process keeps its label defaults.
+min_points = 3
+
+
+def parse_number(value: str) -> typing.Optional[float]:
+    value = value.strip().rstrip("%")
+    if value in ("", "-"):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def read_trace(path: Path) -> typing.List[typing.Dict[str, str]]:
+    with open(path, newline="") as f:
+        return list(csv.DictReader(f, delimiter="\t"))
+
+
+def file_size(location: str) -> typing.Optional[int]:
+    """Size in bytes of a local, http(s) or `latch://` file, None if unknown."""
+    try:
+        if location.startswith("latch://"):
+            from latch.ldata.path import LPath
+
+            return LPath(location).size()
+        if location.startswith("http://") or location.startswith("https://"):
+            resp = requests.head(location, allow_redirects=True)
+            resp.raise_for_status()
+            return int(resp.headers["Content-Length"])
+        return os.stat(location).st_size
+    except Exception as e:
+        print(f"Could not determine the size of {location}: {e}")
+        return None
+
+
+def samplesheet_sizes(samplesheet: Path) -> typing.Dict[str, int]:
+    """Compressed FASTQ bytes per sample. Rows of the same sample are added up."""
+    sizes: typing.Dict[str, int] = {}
+    with open(samplesheet, newline="") as f:
+        for row in csv.DictReader(f):
+            sample = row["sample"].strip()
+            for column in ("fastq_1", "fastq_2"):
+                location = (row.get(column) or "").strip()
+                if location:
+                    sizes[sample] = sizes.get(sample, 0) + (file_size(location) or 0)
+    return sizes
+
+
+def task_sample(tag: str, samples: typing.Iterable[str]) -> typing.Optional[str]:
+    """The sample a task tag such as `s1_mature_hairpin` belongs to, if any."""
+    best = None
+    for sample in samples:
+        if re.match(re.escape(sample) + r"(?:$|[_.])", tag) and (best is None or len(sample) > len(best)):
+            best = sample
+    return best
+
+
+@dataclass
+class Fit:
+    intercept: float
+    slope: float
+
+    def __call__(self, x: float) -> float:
+        return self.intercept + self.slope * x
+
+
+def fit_upper(points: typing.List[typing.Tuple[float, float]]) -> Fit:
+    """Least squares line shifted up so that no observed point lies above it."""
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    slope = 0.0 if var_x == 0 else sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x
+    slope = max(slope, 0.0)
+    intercept = mean_y - slope * mean_x
+    intercept += max(0.0, max(y - (intercept + slope * x) for x, y in points))
+    return Fit(intercept, slope)
+
+
+@dataclass
+class ProcessModel:
+    process: str
+    per_sample: bool
+    memory: Fit
+    disk: Fit
+    cpus: int
+
+    def predict_memory_gib(self, x: float) -> int:
+        return max(min_memory_gib, math.ceil(self.memory(x) * memory_headroom / gib))
+
+    def predict_disk_bytes(self, x: float) -> float:
+        return self.disk(x)
+
+
+@dataclass
+class RunRecord:
+    sample_sizes: typing.Dict[str, int]
+    trace: typing.List[typing.Dict[str, str]]
+
+    @property
+    def total_input(self) -> int:
+        return sum(self.sample_sizes.values())
+
+
+def fit_models(runs: typing.List[RunRecord]) -> typing.Dict[str, ProcessModel]:
+    """Fit memory, disk and CPU models for every process seen in `runs`.
+
+    Tasks tagged with a sample are modelled against that sample's input size,
+    all other tasks (reference indexing, steps behind a `collect()`) against
+    the total input size of their run. Reference sizes are not recorded, so
+    the models of indexing processes only hold for references similar to
+    those of the history; a much larger genome relies on retries instead.
+    """
+    tasks: typing.Dict[str, typing.List[typing.Tuple[RunRecord, typing.Dict[str, str]]]] = {}
+    for run in runs:
+        for task in run.trace:
+            if task.get("status") not in ("COMPLETED", "CACHED"):
+                continue
+            process = task.get("process") or task["name"].split(" (")[0]
+            tasks.setdefault(process, []).append((run, task))
+
+    models = {}
+    for process, entries in tasks.items():
+        with_sample = [task_sample(task.get("tag") or "", run.sample_sizes) for run, task in entries]
+        per_sample = sum(s is not None for s in with_sample) > len(entries) / 2
+
+        memory_points = []
+        disk_points = []
+        cpu_used = []
+        cpu_requested = []
+        for (run, task), sample in zip(entries, with_sample):
+            if per_sample and sample is None:
+                continue
+            x = run.sample_sizes[sample] if per_sample else run.total_input
+            rss = parse_number(task.get("peak_rss", ""))
+            written = parse_number(task.get("wchar", ""))
+            if rss is not None:
+                memory_points.append((x, rss))
+            if written is not None:
+                disk_points.append((x, written))
+            used = parse_number(task.get("%cpu", ""))
+            requested = parse_number(task.get("cpus", ""))
+            if used is not None and requested is not None:
+                cpu_used.append(used / 100)
+                cpu_requested.append(requested)
+
+        if len(memory_points) < min_points or not cpu_used:
+            continue
+
+        # Tools are started with task.cpus threads, so never ask for more
+        # than was requested before: usage could not have exceeded it.
+        cpus = max(1, min(int(max(cpu_requested)), math.ceil(max(cpu_used) * cpu_headroom)))
+        models[process] = ProcessModel(
+            process=process,
+            per_sample=per_sample,
+            memory=fit_upper(memory_points),
+            disk=fit_upper(disk_points) if disk_points else Fit(0.0, 0.0),
+            cpus=cpus,
+        )
+    return models
+
+
+def render_config(
+    models: typing.Dict[str, ProcessModel],
+    sample_sizes: typing.Dict[str, int],
+    trace_file: Path,
+) -> str:
+    """Nextflow config with fitted requests for every modelled process.
+
+    Memory is sized for the largest sample (or the whole run) with headroom,
+    and retries grow it by half instead of doubling it. Both requests are
+    capped by `params.max_memory` and `params.max_cpus` as in conf/base.config.
+    """
+    largest = max(sample_sizes.values(), default=0)
+    total = sum(sample_sizes.values())
+
+    lines = [
+        "// Generated by wf/resource_profile.py from the traces of earlier runs",
+        "trace {",
+        "    enabled   = true",
+        "    overwrite = true",
+        "    raw       = true",
+        f"    file      = '{trace_file}'",
+        f"    fields    = '{','.join(trace_fields)}'",
+        "}",
+        "",
+        "// check_max() of nextflow.config is not visible from a config given with -c",
+        "def check_max(obj, type) {",
+        "    if (type == 'memory') return [obj, params.max_memory as nextflow.util.MemoryUnit].min()",
+        "    if (type == 'cpus') return Math.min(obj, params.max_cpus as int)",
+        "    return obj",
+        "}",
+        "",
+        "process {",
+    ]
+    for process, model in sorted(models.items()):
+        memory = model.predict_memory_gib(largest if model.per_sample else total)
+        lines += [
+            f"    withName: '{process}' {{",
+            f"        cpus   = {{ check_max( {model.cpus}, 'cpus' ) }}",
+            f"        memory = {{ check_max( {memory}.GB * (1 + 0.5 * (task.attempt - 1)), 'memory' ) }}",
+            "    }",
+        ]
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def pvc_size_gib(models: typing.Dict[str, ProcessModel], sample_sizes: typing.Dict[str, int]) -> int:
+    """Shared volume size for a run over `sample_sizes`.
+
+    Without history, the fixed default. With history, the bytes every
+    modelled process is expected to write, summed over its tasks.
+    """
+    if not models:
+        return default_storage_gib
+    total = sum(sample_sizes.values())
+    expected = disk_base_gib * gib
+    for model in models.values():
+        if model.per_sample:
+            expected += sum(model.predict_disk_bytes(size) for size in sample_sizes.values())
+        else:
+            expected += model.predict_disk_bytes(total)
+    expected *= disk_headroom
+    return int(min(max_disk_gib, max(min_disk_gib, math.ceil(expected / gib))))
+
+
+def nxf_opts(models: typing.Dict[str, ProcessModel], sample_sizes: typing.Dict[str, int], max_heap_gib: int = 6) -> str:
+    """JVM options for the Nextflow head process.
+
+    Without history, the fixed default. With history, a heap growing with the number of samples.
+    """
+    if not models:
+        return default_nxf_opts
+    heap = min(max_heap_gib, 2 + len(sample_sizes) // 100)
+    return f"-Xms1024M -Xmx{heap}G -XX:ActiveProcessorCount=4"
+
+
+class ResourceHistory:
+    """Run records of earlier executions, kept in a reference cache style backend.
+
+    Every entry is a directory with the run's trace and a `run.json` holding
+    the input size of every sample. Only the newest `max_runs` are kept.
+    """
+
+    def __init__(self, backend, max_runs: int = 50):
+        self.backend = backend
+        self.max_runs = max_runs
+
+    def load(self, dest: Path) -> typing.List[RunRecord]:
+        runs = []
+        index = self.backend.load_index()
+        for key in sorted(index, key=lambda k: index[k]["created"], reverse=True)[: self.max_runs]:
+            local = dest / key
+            if not self.backend.fetch(key, local):
+                continue
+            try:
+                record = json.loads((local / run_record_name).read_text())
+                runs.append(RunRecord(record["sample_sizes"], read_trace(local / trace_name)))
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Skipping unreadable resource history entry {key}: {e}")
+        return runs
+
+    def add(self, key: str, trace_file: Path, sample_sizes: typing.Dict[str, int], scratch: Path) -> None:
+        entry = scratch / key
+        shutil.rmtree(entry, ignore_errors=True)
+        entry.mkdir(parents=True)
+        shutil.copy(trace_file, entry / trace_name)
+        (entry / run_record_name).write_text(json.dumps({"sample_sizes": sample_sizes}, indent=2))
+        self.backend.store(key, entry)
+
+        index = self.backend.load_index()
+        index[key] = {"component": "resource_history", "size": 0, "created": time.time(), "last_used": time.time()}
+        for old in sorted(index, key=lambda k: index[k]["created"], reverse=True)[self.max_runs :]:
+            self.backend.delete(old)
+            del index[old]
+        self.backend.save_index(index)
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import math
+import re
+import shutil
+import tarfile
+import time
+import typing
+from pathlib import Path
+
+from wf.reference_cache import ReferenceCache
+from wf.resource_profile import read_trace
+
+archive_name = "resume.tar"
+
+# Parameters that only decide where results go, not what is computed.
+# Runs that differ in them share resume entries.
+ignored_params = {"outdir", "email", "multiqc_title"}
+
+# Entries not used for this long are dropped before every restore.
+max_entry_age_seconds = 30 * 24 * 60 * 60
+
+work_dir_pattern = re.compile(r"^[0-9a-f]{2}$")
+
+
+def tree_size(path: Path) -> int:
+    """Bytes below `path`, counting symlinks as links rather than their targets."""
+    if not path.exists():
+        return 0
+    return sum(p.lstat().st_size for p in path.rglob("*") if p.is_symlink() or p.is_file())
+
+
+def pipeline_version(pipeline_root: Path) -> str:
+    match = re.search(r"^\s*version\s*=\s*'([^']+)'", (pipeline_root / "nextflow.config").read_text(), re.MULTILINE)
+    return match.group(1) if match else "unknown"
+
+
+def resume_key(pipeline_root: Path, cmd: typing.List[str], samplesheet: typing.Optional[Path] = None) -> str:
+    """Store key of a run: the pipeline version and a hash of its `--name value` parameters.
+
+    The samplesheet contents are hashed too, as the combined samplesheet of a
+    batched run is always written to the same path.
+    """
+    params = {}
+    for i, arg in enumerate(cmd):
+        if not arg.startswith("--"):
+            continue
+        name = arg[2:]
+        value = cmd[i + 1] if i + 1 < len(cmd) and not cmd[i + 1].startswith("--") else None
+        if name not in ignored_params:
+            params[name] = value
+    h = hashlib.sha256(json.dumps(params, sort_keys=True).encode())
+    if samplesheet is not None:
+        h.update(samplesheet.read_bytes())
+    return f"{pipeline_version(pipeline_root)}-{h.hexdigest()[:32]}"
+
+
+def reusable_task_dirs(work_dir: Path, trace_file: Path) -> typing.List[Path]:
+    """Work directories of every task that completed or was itself reused in this run.
+
+    The trace `hash` is an abbreviated `ab/cdef12` form of the directory name.
+    """
+    prefixes: typing.Dict[str, typing.List[str]] = {}
+    for task in read_trace(trace_file):
+        if task.get("status") not in ("COMPLETED", "CACHED") or "/" not in task.get("hash", ""):
+            continue
+        bucket, prefix = task["hash"].split("/", 1)
+        prefixes.setdefault(bucket, []).append(prefix)
+
+    dirs = []
+    for bucket, wanted in sorted(prefixes.items()):
+        bucket_dir = work_dir / bucket
+        if not work_dir_pattern.match(bucket) or not bucket_dir.is_dir():
+            continue
+        for task_dir in bucket_dir.iterdir():
+            if any(task_dir.name.startswith(prefix) for prefix in wanted):
+                dirs.append(task_dir)
+    return dirs
+
+
+class ResumeStore:
+    """Nextflow cache and task work directories of earlier runs, one entry per key.
+
+    Every entry is a single tar archive, so the symlinks Nextflow stages
+    inputs with survive any backend. Size is bounded like the reference cache:
+    least recently used entries are evicted to make room, and entries unused
+    for `max_age_seconds` are dropped by `gc`.
+    """
+
+    def __init__(self, backend, max_bytes: int, max_age_seconds: float = max_entry_age_seconds):
+        self.backend = backend
+        self.cache = ReferenceCache(backend, max_bytes)
+        self.max_age_seconds = max_age_seconds
+
+    def gc(self) -> None:
+        index = self.backend.load_index()
+        now = time.time()
+        expired = [key for key, entry in index.items() if now - entry["last_used"] > self.max_age_seconds]
+        for key in expired:
+            print(f"Evicting resume entry {key}, unused for {(now - index[key]['last_used']) / 86400:.0f} days")
+            self.backend.delete(key)
+            del index[key]
+        if expired:
+            self.backend.save_index(index)
+
+    def reserve_gib(self) -> int:
+        """Room for one archive next to the work directory, sized after the largest stored entry.
+
+        A restore keeps the downloaded archive until it is extracted, and a
+        save writes the new archive before uploading it, both on the volume.
+        """
+        return math.ceil(max((entry["size"] for entry in self.backend.load_index().values()), default=0) / 1024**3)
+
+    def restore(self, key: str, work_dir: Path) -> bool:
+        entry = self.backend.load_index().get(key)
+        if entry is None:
+            return False
+        free = shutil.disk_usage(work_dir).free
+        if 2 * entry["size"] > free:
+            print(f"Not restoring resume entry {key}: it needs {2 * entry['size']} bytes unpacked, {free} free")
+            return False
+
+        scratch = work_dir / ".resume_restore"
+        shutil.rmtree(scratch, ignore_errors=True)
+        try:
+            if not self.cache.get(key, scratch):
+                return False
+            with tarfile.open(scratch / archive_name) as tar:
+                # Inputs are staged as absolute symlinks into other task
+                # directories, which the default extraction filter refuses.
+                if hasattr(tarfile, "fully_trusted_filter"):
+                    tar.extractall(work_dir, filter="fully_trusted")
+                else:
+                    tar.extractall(work_dir)
+            return True
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    def save(self, key: str, work_dir: Path, trace_file: Path) -> bool:
+        task_dirs = reusable_task_dirs(work_dir, trace_file)
+        size = tree_size(work_dir / ".nextflow") + sum(tree_size(d) for d in task_dirs)
+        if size > self.cache.max_bytes:
+            print(f"Not saving resume entry {key}: {size} bytes exceed the store size")
+            return False
+        free = shutil.disk_usage(work_dir).free
+        if size > free:
+            print(f"Not saving resume entry {key}: {size} bytes do not fit on the volume, {free} free")
+            return False
+
+        scratch = work_dir / ".resume_save"
+        shutil.rmtree(scratch, ignore_errors=True)
+        scratch.mkdir()
+        try:
+            with tarfile.open(scratch / archive_name, "w") as tar:
+                tar.add(work_dir / ".nextflow", ".nextflow")
+                for task_dir in task_dirs:
+                    tar.add(task_dir, str(task_dir.relative_to(work_dir)))
+
+            # Replace the entry this run was resumed from.
+            index = self.backend.load_index()
+            if key in index:
+                self.backend.delete(key)
+                del index[key]
+                self.backend.save_index(index)
+            return self.cache.put(key, scratch, "resume")
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
@@ -0,0 +1,74 @@
+import os
+import shutil
+import time
+import typing
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+# Everything Nextflow needs to launch the pipeline from the shared volume.
+# Docs, images, build logs and the Latch wrapper itself are never staged.
+pipeline_files = [
+    "main.nf",
+    "nextflow.config",
+    "nextflow_schema.json",
+    "latch.config",
+    "modules.json",
+]
+pipeline_dirs = [
+    "workflows",
+    "modules",
+    "subworkflows",
+    "conf",
+    "bin",
+    "assets",
+]
+ignored_dir_names = {
+    "tests",
+    "__pycache__",
+}
+
+
+@dataclass
+class StagingStats:
+    files: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+
+
+def iter_pipeline_files(src: Path) -> typing.Iterator[Path]:
+    for name in pipeline_files:
+        p = src / name
+        if p.is_file():
+            yield p
+
+    for name in pipeline_dirs:
+        for root, dirs, files in os.walk(src / name):
+            dirs[:] = sorted(d for d in dirs if d not in ignored_dir_names)
+            for f in sorted(files):
+                p = Path(root) / f
+                if p.is_file():
+                    yield p
+
+
+def copy_file(src: Path, dest: Path) -> int:
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copy2(src, dest)
+    return dest.stat().st_size
+
+
+def stage_launch_tree(src: Path, dest: Path, workers: int = 8) -> StagingStats:
+    """Copy the pipeline files under `src` to `dest`, several files at a time.
+
+    `dest` is the shared volume, which is provisioned fresh for every
+    execution and lives on another device than `src`, so every file is
+    copied; only the filtering keeps the copy small.
+    """
+    start = time.monotonic()
+    dest.mkdir(parents=True, exist_ok=True)
+
+    paths = list(iter_pipeline_files(src))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        copied = sum(pool.map(lambda p: copy_file(p, dest / p.relative_to(src)), paths))
+
+    return StagingStats(files=len(paths), bytes=copied, seconds=time.monotonic() - start)
@@ -0,0 +1,218 @@
+import bisect
+import json
+import typing
+from dataclasses import dataclass
+from pathlib import Path
+
+from wf.resource_profile import parse_number, read_trace
+
+timeline_name = "execution_timeline.html"
+summary_name = "run_summary.json"
+
+# Nextflow polls for finished tasks every few seconds, so a task submitted up
+# to this long after another one completed may still have been waiting on it.
+poll_tolerance_ms = 5000
+
+
+@dataclass
+class Task:
+    name: str
+    process: str
+    tag: str
+    status: str
+    cpus: float
+    cpu_percent: float
+    peak_rss: float
+    rchar: float
+    wchar: float
+    realtime: float
+    submit: float
+    start: float
+    complete: float
+
+
+def load_tasks(trace_file: Path) -> typing.List[Task]:
+    """Tasks of a raw trace that ran in this execution. Cached tasks are left out."""
+    tasks = []
+    for row in read_trace(trace_file):
+        if row.get("status") not in ("COMPLETED", "FAILED", "ABORTED"):
+            continue
+
+        def number(field: str) -> float:
+            value = parse_number(row.get(field, ""))
+            return 0.0 if value is None else value
+
+        tasks.append(
+            Task(
+                name=row.get("name", ""),
+                process=row.get("process") or row.get("name", "").split(" (")[0],
+                tag=row.get("tag") or "",
+                status=row["status"],
+                cpus=number("cpus"),
+                cpu_percent=number("%cpu"),
+                peak_rss=number("peak_rss"),
+                rchar=number("rchar"),
+                wchar=number("wchar"),
+                realtime=number("realtime"),
+                submit=number("submit"),
+                start=number("start"),
+                complete=number("complete"),
+            )
+        )
+    return tasks
+
+
+def process_summary(tasks: typing.List[Task]) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+    """Per-process wall time, CPU efficiency, peak RSS and I/O.
+
+    CPU efficiency is the CPU time used over the CPU time requested, both
+    weighted by task run time.
+    """
+    by_process: typing.Dict[str, typing.List[Task]] = {}
+    for task in tasks:
+        by_process.setdefault(task.process, []).append(task)
+
+    summary = {}
+    for process, group in sorted(by_process.items()):
+        used = sum(t.cpu_percent / 100 * t.realtime for t in group)
+        requested = sum(t.cpus * t.realtime for t in group)
+        timed = [t for t in group if t.start and t.complete]
+        summary[process] = {
+            "tasks": len(group),
+            "failed": sum(t.status != "COMPLETED" for t in group),
+            "realtime_total_s": round(sum(t.realtime for t in group) / 1000, 3),
+            "realtime_max_s": round(max(t.realtime for t in group) / 1000, 3),
+            "wall_span_s": round((max(t.complete for t in timed) - min(t.start for t in timed)) / 1000, 3)
+            if timed
+            else None,
+            "cpu_efficiency": round(used / requested, 3) if requested else None,
+            "peak_rss_bytes": int(max(t.peak_rss for t in group)),
+            "rchar_bytes": int(sum(t.rchar for t in group)),
+            "wchar_bytes": int(sum(t.wchar for t in group)),
+        }
+    return summary
+
+
+def same_tag(a: str, b: str) -> bool:
+    """Whether two task tags, such as `s1` and `s1_mature_hairpin`, belong to the same sample."""
+    if not a or not b:
+        return False
+    short, long = sorted((a, b), key=len)
+    return long == short or long.startswith(short + "_") or long.startswith(short + ".")
+
+
+def critical_path(tasks: typing.List[Task]) -> typing.Dict[str, typing.Any]:
+    """Chain of tasks that determined when the run finished.
+
+    The trace has no task dependencies, so they are inferred from timing:
+    starting at the last task to complete, the predecessor of every task is
+    the one of the same sample that completed last before it was submitted,
+    or any task that did if there is none.
+    """
+    timed = sorted((t for t in tasks if t.submit and t.complete), key=lambda t: t.complete)
+    if not timed:
+        return {"duration_s": 0, "tasks": []}
+
+    completes = [t.complete for t in timed]
+    index = len(timed) - 1
+    path = [timed[index]]
+    while True:
+        current = timed[index]
+        limit = min(current.submit + poll_tolerance_ms, current.complete - 1)
+        index = bisect.bisect_right(completes, limit, hi=index) - 1
+        if index < 0:
+            break
+        if current.tag:
+            same_sample = next((i for i in range(index, -1, -1) if same_tag(timed[i].tag, current.tag)), None)
+            if same_sample is not None:
+                index = same_sample
+        path.append(timed[index])
+    path.reverse()
+
+    return {
+        "duration_s": round((path[-1].complete - path[0].submit) / 1000, 3),
+        "tasks": [
+            {
+                "name": t.name,
+                "process": t.process,
+                "queued_s": round(max(0.0, t.start - t.submit) / 1000, 3),
+                "realtime_s": round(t.realtime / 1000, 3),
+            }
+            for t in path
+        ],
+    }
+
+
+def collect_barriers(tasks: typing.List[Task]) -> typing.List[typing.Dict[str, typing.Any]]:
+    """Processes that ran once, only after every task of a per-sample process had finished.
+
+    That is how a process fed by `collect()` looks in the trace. `waited_s` is
+    how long the first finished sample sat waiting for the last one.
+    """
+    by_process: typing.Dict[str, typing.List[Task]] = {}
+    for task in tasks:
+        if task.submit and task.complete:
+            by_process.setdefault(task.process, []).append(task)
+
+    fan_out = {p: group for p, group in by_process.items() if len(group) > 1}
+    barriers = []
+    for process, group in sorted(by_process.items(), key=lambda item: item[1][0].submit):
+        if len(group) != 1:
+            continue
+        task = group[0]
+        gates = [
+            (max(t.complete for t in upstream), p)
+            for p, upstream in fan_out.items()
+            if max(t.complete for t in upstream) <= task.submit + poll_tolerance_ms
+        ]
+        if not gates:
+            continue
+        _, gate = max(gates)
+        barriers.append(
+            {
+                "process": process,
+                "waited_on": gate,
+                "fan_in": len(fan_out[gate]),
+                "waited_s": round((task.submit - min(t.complete for t in fan_out[gate])) / 1000, 3),
+                "realtime_s": round(task.realtime / 1000, 3),
+            }
+        )
+    return barriers
+
+
+def summarize(trace_file: Path) -> typing.Dict[str, typing.Any]:
+    tasks = load_tasks(trace_file)
+    timed = [t for t in tasks if t.submit and t.complete]
+    return {
+        "tasks": len(tasks),
+        "failed": sum(t.status != "COMPLETED" for t in tasks),
+        "wall_time_s": round((max(t.complete for t in timed) - min(t.submit for t in timed)) / 1000, 3) if timed else 0,
+        "cpu_hours": round(sum(t.cpu_percent / 100 * t.realtime for t in tasks) / 3.6e6, 3),
+        "processes": process_summary(tasks),
+        "critical_path": critical_path(tasks),
+        "collect_barriers": collect_barriers(tasks),
+    }
+
+
+def write_summary(trace_file: Path, dest: Path) -> typing.Dict[str, typing.Any]:
+    summary = summarize(trace_file)
+    dest.write_text(json.dumps(summary, indent=2))
+    return summary
+
+
+def print_summary(summary: typing.Dict[str, typing.Any], top: int = 10) -> None:
+    print(f"{summary['tasks']} tasks ({summary['failed']} failed) in {summary['wall_time_s']:.0f}s wall time")
+    busiest = sorted(summary["processes"].items(), key=lambda item: -item[1]["realtime_total_s"])[:top]
+    for process, stats in busiest:
+        efficiency = "-" if stats["cpu_efficiency"] is None else f"{stats['cpu_efficiency']:.0%}"
+        print(
+            f"  {process.split(':')[-1]:<32} {stats['tasks']:>5} tasks {stats['realtime_total_s']:>10.0f}s "
+            f"cpu {efficiency:>5} rss {stats['peak_rss_bytes'] / 1024**3:>6.1f} GiB"
+        )
+    path = summary["critical_path"]
+    print(f"Critical path: {path['duration_s']:.0f}s over {len(path['tasks'])} tasks")
+    for barrier in summary["collect_barriers"]:
+        print(
+            f"  {barrier['process'].split(':')[-1]} waited {barrier['waited_s']:.0f}s on all "
+            f"{barrier['fan_in']} tasks of {barrier['waited_on'].split(':')[-1]}"
+        )
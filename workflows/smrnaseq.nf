@@ -7,6 +7,8 @@ include { CAT_FASTQ                        } from '../modules/nf-core/cat/fastq/
 include { CONTAMINANT_FILTER               } from '../subworkflows/local/contaminant_filter'
 include { FASTQC                           } from '../modules/nf-core/fastqc/main'
 include { FASTQ_FASTQC_UMITOOLS_FASTP      } from '../subworkflows/nf-core/fastq_fastqc_umitools_fastp'
+include { FASTQ_PROFILE as FASTQ_PROFILE_RAW  } from '../modules/local/fastq_profile'
+include { FASTQ_PROFILE as FASTQ_PROFILE_TRIM } from '../modules/local/fastq_profile'
 include { FASTP as FASTP_LENGTH_FILTER     } from '../modules/nf-core/fastp'
 include { GENOME_QUANT                     } from '../subworkflows/local/genome_quant'
 include { INDEX_GENOME                     } from '../modules/local/bowtie_genome'
@@ -14,7 +16,9 @@ include { MIRNA_QUANT                      } from '../subworkflows/local/mirna_q
 include { MIRDEEP2                         } from '../subworkflows/local/mirdeep2'
 include { MIRTRACE                         } from '../subworkflows/local/mirtrace'
 include { MULTIQC                          } from '../modules/nf-core/multiqc/main'
+include { READ_PRECHECK                    } from '../modules/local/read_precheck'
 include { UMICOLLAPSE as UMICOLLAPSE_FASTQ } from '../modules/nf-core/umicollapse/main'
+include { UMI_COLLAPSE_EXTRACT             } from '../modules/local/umi_collapse_extract'
 include { UMITOOLS_EXTRACT                 } from '../modules/nf-core/umitools/extract/main'
 include { UNTARFILES as UNTAR_BOWTIE_INDEX } from '../modules/nf-core/untarfiles'
 include { paramsSummaryMap                 } from 'plugin/nf-validation'
@@ -96,7 +100,7 @@ workflow NFCORE_SMRNASEQ {
     //
     FASTQ_FASTQC_UMITOOLS_FASTP (
         ch_cat_fastq,
-        params.skip_fastqc,
+        params.skip_fastqc || params.read_qc == 'profile',
         params.with_umi,
         params.skip_umi_extract_before_dedup,
         params.umi_discard_read,
@@ -108,6 +112,17 @@ workflow NFCORE_SMRNASEQ {
     )
     ch_versions = ch_versions.mix(FASTQ_FASTQC_UMITOOLS_FASTP.out.versions)
 
+    //
+    // MODULE: Profile raw and trimmed reads in place of FastQC
+    //
+    ch_read_profiles = Channel.empty()
+    if (!params.skip_fastqc && params.read_qc == 'profile') {
+        FASTQ_PROFILE_RAW ( ch_cat_fastq )
+        FASTQ_PROFILE_TRIM ( FASTQ_FASTQC_UMITOOLS_FASTP.out.reads )
+        ch_read_profiles = FASTQ_PROFILE_RAW.out.mqc.mix(FASTQ_PROFILE_TRIM.out.mqc)
+        ch_versions = ch_versions.mix(FASTQ_PROFILE_RAW.out.versions.first())
+    }
+
     ch_fasta = params.fasta ? file(params.fasta): []
     ch_reads_for_mirna = FASTQ_FASTQC_UMITOOLS_FASTP.out.reads
 
@@ -137,11 +152,19 @@ workflow NFCORE_SMRNASEQ {
     // This involves running on the sequencing adapter trimmed remnants of the entire reads
     // consisting of sequence + common sequence "miRNA adapter" + UMI
     // once collapsing happened, we will use umitools extract to get rid of the common miRNA sequence + the UMI to have only plain collapsed reads without any other clutter
-    if (params.with_umi) {
+    // With umi_single_pass, all three steps are done by one streaming pass per sample
+    ch_umi_dedup_logs = Channel.empty()
+    if (params.with_umi && params.umi_single_pass) {
+        UMI_COLLAPSE_EXTRACT ( ch_reads_for_mirna )
+        ch_versions = ch_versions.mix(UMI_COLLAPSE_EXTRACT.out.versions.first())
+        ch_umi_dedup_logs = UMI_COLLAPSE_EXTRACT.out.mqc
+        ch_reads_for_mirna = UMI_COLLAPSE_EXTRACT.out.reads
+    } else if (params.with_umi) {
         ch_fastq = Channel.value('fastq')
         ch_input_for_collapse = ch_reads_for_mirna.map{ meta, reads -> [meta, reads, []]} //Needs to be done to add a []
         UMICOLLAPSE_FASTQ(ch_input_for_collapse, ch_fastq)
         ch_versions = ch_versions.mix(UMICOLLAPSE_FASTQ.out.versions)
+        ch_umi_dedup_logs = UMICOLLAPSE_FASTQ.out.log.map { it[1] }
         UMITOOLS_EXTRACT(UMICOLLAPSE_FASTQ.out.fastq)
 
         // Filter out sequences smaller than params.fastp_min_length
@@ -156,6 +179,21 @@ workflow NFCORE_SMRNASEQ {
         ch_reads_for_mirna = FASTP_LENGTH_FILTER.out.reads
     }
 
+    //
+    // MODULE: Keep samples with too few or too uniform reads to the read QC reports
+    //
+    ch_precheck = Channel.empty()
+    if (params.precheck_min_reads || params.precheck_min_distinct) {
+        READ_PRECHECK ( ch_reads_for_mirna )
+        ch_precheck = READ_PRECHECK.out.mqc
+        ch_versions = ch_versions.mix(READ_PRECHECK.out.versions.first())
+
+        ch_reads_for_mirna = ch_reads_for_mirna
+            .join( READ_PRECHECK.out.status )
+            .filter { meta, reads, status -> status == 'pass' }
+            .map { meta, reads, status -> [ meta, reads ] }
+    }
+
     //
     // MODULE: mirtrace QC
     //
@@ -216,7 +254,7 @@ workflow NFCORE_SMRNASEQ {
 
         if (!params.skip_mirdeep) {
             MIRDEEP2 (
-                ch_reads_for_mirna,
+                MIRNA_QUANT.out.collapsed,
                 GENOME_QUANT.out.fasta,
                 GENOME_QUANT.out.index.collect(),
                 hairpin_clean,
@@ -246,10 +284,10 @@ workflow NFCORE_SMRNASEQ {
         ch_multiqc_files = ch_multiqc_files.mix(ch_workflow_summary.collectFile(name: 'workflow_summary_mqc.yaml'))
         ch_multiqc_files = ch_multiqc_files.mix(FASTQ_FASTQC_UMITOOLS_FASTP.out.fastqc_raw_zip.collect{it[1]}.ifEmpty([]))
         ch_multiqc_files = ch_multiqc_files.mix(FASTQ_FASTQC_UMITOOLS_FASTP.out.fastqc_trim_zip.collect{it[1]}.ifEmpty([]))
+        ch_multiqc_files = ch_multiqc_files.mix(ch_read_profiles.collect().ifEmpty([]))
         ch_multiqc_files = ch_multiqc_files.mix(FASTQ_FASTQC_UMITOOLS_FASTP.out.trim_json.collect{it[1]}.ifEmpty([]))
-        if(params.with_umi) {
-            ch_multiqc_files = ch_multiqc_files.mix(UMICOLLAPSE_FASTQ.out.log.collect{it[1]}.ifEmpty([]))
-        }
+        ch_multiqc_files = ch_multiqc_files.mix(ch_precheck.collect().ifEmpty([]))
+        ch_multiqc_files = ch_multiqc_files.mix(ch_umi_dedup_logs.collect().ifEmpty([]))
         ch_multiqc_files = ch_multiqc_files.mix(contamination_stats.collect().ifEmpty([]))
         ch_multiqc_files = ch_multiqc_files.mix(genome_stats.collect({it[1]}).ifEmpty([]))
         ch_multiqc_files = ch_multiqc_files.mix(MIRNA_QUANT.out.mature_stats.collect({it[1]}).ifEmpty([]))